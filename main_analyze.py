@@ -0,0 +1,6 @@
+"""Run headless raid analyzer"""
+
+from sv_live_map_core.util.raid_analyzer import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+"""Run emulated sys-botbase"""
+
+from sv_live_map_core.nxreader.sysbot_emulator import main
+
+if __name__ == "__main__":
+    main()
@@ -33,6 +33,9 @@ class NotConnectedException(Exception):
 class TeraRaidRoutine(BaseRoutine):
     """Routine for automating dateskipping of tera raids"""
 
+    # seconds to wait for a date skip to change the raid seed
+    RAID_BLOCK_CHANGE_TIMEOUT = 1
+
     def __init__(self) -> None:
         super().__init__()
         self.filters: list[RaidFilter] = []
@@ -92,6 +95,11 @@ class TeraRaidRoutine(BaseRoutine):
                     raid_block,
                 ) = self.read_raids(total_raid_count, total_reset_count, last_seed)
 
+                # skip did not take effect, nothing new to compare
+                if raid_block is None:
+                    self.date_skip_routine.execute(self.reader)
+                    continue
+
                 target_found = False
 
                 for raid in raid_block.raids:
@@ -112,8 +120,10 @@ class TeraRaidRoutine(BaseRoutine):
                         for webhook in self.webhooks:
                             self.send_raid_webhook(raid, webhook)
                 if target_found:
-                    # render map if target found
-                    self.parent_application.read_all_raids(True)
+                    # render map of the already read raids if target found
+                    self.parent_application.render_thread = (
+                        self.parent_application.render_raids(raid_block)
+                    )
                     # wait until rendering is done
                     while self.parent_application.render_thread is not None:
                         self.reader.pause(0.2)
@@ -139,19 +149,22 @@ class TeraRaidRoutine(BaseRoutine):
 
     def read_raids(
         self, total_raid_count: int, total_reset_count: int, last_seed: int
-    ) -> tuple[int, int, int, RaidBlock]:
-        """Read and parse raids"""
-        raid_block = self.parent_application.read_all_raids(
-            self.settings.get("MapRender", False)
-        )
-        if raid_block.current_seed != last_seed:
-            last_seed = raid_block.current_seed
-            total_reset_count += 1
-            total_raid_count += 69
-        else:
+    ) -> tuple[int, int, int, RaidBlock | None]:
+        """Read and parse raids, None if the raid seed did not change"""
+        # only the header is read until the date skip is confirmed
+        if last_seed is not None and not self.reader.wait_for_raid_block_change(
+            last_seed, self.RAID_BLOCK_CHANGE_TIMEOUT
+        ):
             self.send_webhook_log(
                 "Raid seed is a duplicate of the previous day, unsuccessful skip"
             )
+            return total_raid_count, total_reset_count, last_seed, None
+        raid_block = self.parent_application.read_all_raids(
+            self.settings.get("MapRender", False)
+        )
+        last_seed = raid_block.current_seed
+        total_reset_count += 1
+        total_raid_count += 69
         print(
             f"Raid Block Processsed: {total_reset_count=} "
             f"{total_raid_count=} "
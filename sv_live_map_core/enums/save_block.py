@@ -26,7 +26,13 @@ class SCTypeCode(IntEnum):
     def byte_size(self) -> int:
         """Size of type in bytes"""
         match self:
-            case SCTypeCode.BOOL_FALSE | SCTypeCode.BOOL_TRUE | SCTypeCode.U8 | SCTypeCode.I8:
+            case (
+                SCTypeCode.BOOL_FALSE
+                | SCTypeCode.BOOL_TRUE
+                | SCTypeCode.BOOL_ARRAY
+                | SCTypeCode.U8
+                | SCTypeCode.I8
+            ):
                 return 1
             case SCTypeCode.U16 | SCTypeCode.I16:
                 return 2
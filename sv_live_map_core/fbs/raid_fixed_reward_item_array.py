@@ -1,7 +1,15 @@
 """Array of RaidFixedRewardItem"""
 
 from __future__ import annotations
-from ..enums import Item, RaidRewardItemSubjectType, RaidRewardItemCategoryType
+from functools import cached_property
+from ..enums import (
+    Item,
+    RaidRewardItemSubjectType,
+    RaidRewardItemCategoryType,
+    SandwichLevel,
+    Species,
+    TeraType,
+)
 from .flatbuffer_object import (
     U64,
     I8,
@@ -19,7 +27,7 @@ class RaidFixedRewardItemArray(FlatBufferObject):
             RaidFixedRewardItem
         ] = self.read_init_object_array(RaidFixedRewardItem)
 
-    @property
+    @cached_property
     def reward_item_dict(self) -> dict[int, tuple[RaidFixedRewardItemInfo]]:
         """Grab reward item table as a dict"""
         return {
@@ -27,6 +35,14 @@ class RaidFixedRewardItemArray(FlatBufferObject):
             for table in self.raid_fixed_reward_items
         }
 
+    @cached_property
+    def compiled_reward_dict(self) -> dict[int, CompiledFixedRewardTable]:
+        """Grab precompiled reward item tables as a dict"""
+        return {
+            table_name: CompiledFixedRewardTable(reward_items)
+            for table_name, reward_items in self.reward_item_dict.items()
+        }
+
 
 class RaidFixedRewardItem(FlatBufferObject):
     """Table containing RaidFixedRewardItemInfo"""
@@ -81,3 +97,52 @@ class RaidFixedRewardItemInfo(FlatBufferObject):
         self.subject_type = self.read_init_int_enum(I32, RaidRewardItemSubjectType)
         self.item_id = self.read_init_int_enum(I32, Item)
         self.num = self.read_init_int(I8)
+
+
+class CompiledFixedRewardTable:
+    """Guaranteed raid drops of a single table with outputs pre-resolved"""
+
+    def __init__(self, reward_items: tuple[RaidFixedRewardItemInfo]):
+        # (item_id, category, num, subject_type) for items that produce a reward
+        self.entries: list[
+            tuple[Item, RaidRewardItemCategoryType, int, RaidRewardItemSubjectType]
+        ] = []
+        for item_info in reward_items:
+            if item_info.item_id not in (None, Item.NONE):
+                category = None
+            elif item_info.category not in (None, RaidRewardItemCategoryType.ITEM):
+                category = item_info.category
+            else:
+                continue
+            self.entries.append(
+                (
+                    item_info.item_id,
+                    category,
+                    item_info.num,
+                    item_info.subject_type or RaidRewardItemSubjectType.ALL,
+                )
+            )
+        self._rewards: dict[
+            tuple[Species, TeraType],
+            tuple[tuple[Item, int, RaidRewardItemSubjectType, SandwichLevel]],
+        ] = {}
+
+    def rewards(
+        self, species: Species, tera_type: TeraType
+    ) -> tuple[tuple[Item, int, RaidRewardItemSubjectType, SandwichLevel]]:
+        """Guaranteed rewards for a raid of species and tera_type"""
+        key = (species, tera_type)
+        if (rewards := self._rewards.get(key)) is None:
+            rewards = tuple(
+                (
+                    item_id
+                    if category is None
+                    else category.to_item_id(species, tera_type),
+                    num,
+                    subject_type,
+                    SandwichLevel.NONE,
+                )
+                for item_id, category, num, subject_type in self.entries
+            )
+            self._rewards[key] = rewards
+        return rewards
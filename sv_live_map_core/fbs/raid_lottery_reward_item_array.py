@@ -1,7 +1,10 @@
 """Array of RaidLotteryRewardItem"""
 
 from __future__ import annotations
-from ..enums import Item, RaidRewardItemCategoryType
+from bisect import bisect_right
+from functools import cached_property
+from itertools import accumulate
+from ..enums import Item, RaidRewardItemCategoryType, Species, TeraType
 from .flatbuffer_object import (
     U64,
     I8,
@@ -19,7 +22,7 @@ class RaidLotteryRewardItemArray(FlatBufferObject):
             RaidLotteryRewardItem
         ] = self.read_init_object_array(RaidLotteryRewardItem)
 
-    @property
+    @cached_property
     def reward_item_dict(self) -> dict[int, tuple[RaidLotteryRewardItemInfo]]:
         """Grab reward item table as a dict"""
         return {
@@ -27,6 +30,14 @@ class RaidLotteryRewardItemArray(FlatBufferObject):
             for table in self.raid_lottery_reward_items
         }
 
+    @cached_property
+    def compiled_reward_dict(self) -> dict[int, CompiledLotteryRewardTable]:
+        """Grab precompiled reward item tables as a dict"""
+        return {
+            table_name: CompiledLotteryRewardTable(reward_items)
+            for table_name, reward_items in self.reward_item_dict.items()
+        }
+
 
 class RaidLotteryRewardItem(FlatBufferObject):
     """Table containing RaidLotteryRewardItemInfo"""
@@ -174,3 +185,49 @@ class RaidLotteryRewardItemInfo(FlatBufferObject):
         self.num: int = self.read_init_int(I8)
         self.rate: int = self.read_init_int(I32)
         self.rare_item_flag: bool = self.read_init_int_enum(I8, bool)
+
+
+class CompiledLotteryRewardTable:
+    """Random raid drops of a single table with cumulative rates"""
+
+    def __init__(self, reward_items: tuple[RaidLotteryRewardItemInfo]):
+        self.cumulative_rates: list[int] = list(
+            accumulate(item_info.rate or 0 for item_info in reward_items)
+        )
+        self.lot_sum: int = self.cumulative_rates[-1] if self.cumulative_rates else 0
+        # (item_id, category, num) or None for items that produce no reward
+        self.entries: list[tuple[Item, RaidRewardItemCategoryType, int] | None] = []
+        for item_info in reward_items:
+            if item_info.item_id not in (None, Item.NONE):
+                self.entries.append((item_info.item_id, None, item_info.num))
+            elif item_info.category not in (None, RaidRewardItemCategoryType.ITEM):
+                self.entries.append((None, item_info.category, item_info.num))
+            else:
+                self.entries.append(None)
+        self._outputs: dict[
+            tuple[Species, TeraType], list[tuple[Item, int] | None]
+        ] = {}
+
+    def outputs(
+        self, species: Species, tera_type: TeraType
+    ) -> list[tuple[Item, int] | None]:
+        """Resolved (item, num) of each entry for a raid of species and tera_type"""
+        key = (species, tera_type)
+        if (outputs := self._outputs.get(key)) is None:
+            outputs = [
+                None
+                if entry is None
+                else (
+                    entry[0]
+                    if entry[1] is None
+                    else entry[1].to_item_id(species, tera_type),
+                    entry[2],
+                )
+                for entry in self.entries
+            ]
+            self._outputs[key] = outputs
+        return outputs
+
+    def select(self, item_rand: int) -> int:
+        """Index of the entry that item_rand lands on"""
+        return bisect_right(self.cumulative_rates, item_rand)
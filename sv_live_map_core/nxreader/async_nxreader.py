@@ -0,0 +1,304 @@
+"""asyncio client to read information from sys-botbase"""
+
+import asyncio
+import binascii
+from typing import Self
+from .nxreader import NXReader, SocketError
+from ..enums import Button
+
+
+class AsyncNXReader:
+    """asyncio client with the command surface of NXReader
+
+    A single worker task owns the connection and sends queued commands one
+    at a time, so position polling, raid block reads and clickSeq waits can
+    share one connection without interleaving on the socket.
+    Only socket connections are supported"""
+
+    def __init__(
+        self,
+        ip_address: str,
+        port: int = 6000,
+        multi_peek: bool = True,
+        timeout: float = 1,
+    ) -> None:
+        self.ip_address = ip_address
+        self.port = port
+        # older versions of sys-botbase do not support multi peeks
+        self.multi_peek = multi_peek
+        # default time to wait for a response
+        self.timeout = timeout
+        self.ls_lastx: int = 0
+        self.ls_lasty: int = 0
+        self.rs_lastx: int = 0
+        self.rs_lasty: int = 0
+        # absolute addresses of dereferenced pointer chains
+        self._pointer_cache: dict[tuple[int], int] = {}
+        self._stream_reader: asyncio.StreamReader = None
+        self._stream_writer: asyncio.StreamWriter = None
+        # (command, response size, raw response, timeout, future)
+        self._queue: asyncio.Queue = None
+        self._worker: asyncio.Task = None
+
+    async def connect(self) -> Self:
+        """Connect to sys-botbase and start the request worker"""
+        self._stream_reader, self._stream_writer = await asyncio.wait_for(
+            asyncio.open_connection(self.ip_address, self.port), self.timeout
+        )
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._work())
+        print("Connected")
+        await self.send_command("configure echoCommands 0")
+        return self
+
+    async def __aenter__(self) -> Self:
+        return await self.connect()
+
+    async def __aexit__(self, *_) -> None:
+        await self.close()
+
+    async def _work(self) -> None:
+        """Send queued commands in order and resolve each caller's response"""
+        while True:
+            command, size, raw, timeout, future = await self._queue.get()
+            if future.cancelled():
+                continue
+            try:
+                self._stream_writer.write(f"{command}\r\n".encode())
+                await self._stream_writer.drain()
+                response = None
+                if size is not None:
+                    response = await asyncio.wait_for(
+                        self._read_response(size, raw),
+                        self.timeout if timeout is None else timeout,
+                    )
+            # pylint: disable=broad-except
+            except Exception as error:
+                if not future.cancelled():
+                    future.set_exception(error)
+                # the stream can no longer be trusted to be in sync
+                self._fail_pending(SocketError(f"Connection lost after {error!r}"))
+                self._stream_writer.close()
+                return
+            if not future.cancelled():
+                future.set_result(response)
+
+    async def _read_response(self, size: int, raw: bool) -> bytes:
+        """Read a response of size bytes"""
+        try:
+            if raw:
+                return await self._stream_reader.readexactly(size)
+            # * 2 because the data is sent as a hex string
+            # + 1 because it ends in \n
+            return binascii.unhexlify(
+                (await self._stream_reader.readexactly(size * 2 + 1))[:-1]
+            )
+        except asyncio.IncompleteReadError as error:
+            raise SocketError("Socket shut down on the switch's side.") from error
+
+    def _fail_pending(self, error: Exception) -> None:
+        """Fail every request still waiting in the queue"""
+        while not self._queue.empty():
+            *_, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(error)
+
+    async def request(
+        self,
+        command: str,
+        size: int = None,
+        raw: bool = False,
+        timeout: float = None,
+    ) -> bytes | None:
+        """Queue a command and await its response of size bytes
+
+        Hex responses are decoded unless raw, commands without a size have no
+        response and resolve once sent"""
+        if self._worker is None or self._worker.done():
+            raise SocketError("Not connected")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((command, size, raw, timeout, future))
+        return await future
+
+    async def send_command(self, content: str) -> None:
+        """Send a command to sys-botbase on the switch"""
+        await self.request(content)
+
+    async def close(self) -> None:
+        """Close connection to switch"""
+        print("Exiting...")
+        if self._worker is not None and not self._worker.done():
+            await self.detach()
+            await self.pause(0.5)
+            self._worker.cancel()
+            self._fail_pending(SocketError("Connection closed"))
+        if self._stream_writer is not None:
+            self._stream_writer.close()
+            await self._stream_writer.wait_closed()
+        print("Disconnected")
+
+    async def detach(self) -> None:
+        """Detach controller from switch"""
+        await self.send_command("detachController")
+
+    async def execute_click_seq(self, command: str, assumed_time: float) -> bool:
+        """Send a clickSeq command and await its 'done' output"""
+        return (
+            await self.request(command, 5, raw=True, timeout=assumed_time * 1.5 + 1)
+            == b"done\n"
+        )
+
+    async def click(self, button: Button) -> None:
+        """Press and release button"""
+        await self.send_command(f"click {button.value}")
+
+    async def press(self, button: Button) -> None:
+        """Press and hold button"""
+        await self.send_command(f"press {button.value}")
+
+    async def release(self, button: Button) -> None:
+        """Release held button"""
+        await self.send_command(f"release {button.value}")
+
+    async def manual_click(
+        self, button: Button, delay: float = 0.1, init_count: int = 1
+    ):
+        """Manually press and release button"""
+        for _ in range(init_count):
+            await self.press(button)
+        await self.pause(delay)
+        await self.release(button)
+
+    async def touch_hold(self, x_val: int, y_val: int, delay_ms: int) -> None:
+        """Hold the touch screen at (x, y) for delay ms"""
+        await self.send_command(f"touchHold {x_val} {y_val} {delay_ms}")
+
+    async def move_stick(self, stick: str, x_val: int, y_val: int) -> None:
+        """Move stick to position"""
+        await self.send_command(f"setStick {stick} 0x{x_val:X} 0x{y_val:X}")
+
+    async def move_left_stick(self, x_val: int = None, y_val: int = None) -> None:
+        """Move the left stick to position"""
+        if x_val is not None:
+            self.ls_lastx = x_val
+        if y_val is not None:
+            self.ls_lasty = y_val
+        await self.move_stick("LEFT", self.ls_lastx, self.ls_lasty)
+
+    async def move_right_stick(self, x_val: int = None, y_val: int = None) -> None:
+        """Move the right stick to position"""
+        if x_val is not None:
+            self.rs_lastx = x_val
+        if y_val is not None:
+            self.rs_lasty = y_val
+        await self.move_stick("RIGHT", self.rs_lastx, self.rs_lasty)
+
+    async def read(self, address: int, size: int) -> bytes:
+        """Read bytes from heap"""
+        return await self.request(f"peek 0x{address:X} 0x{size:X}", size)
+
+    async def read_int(self, address: int, size: int) -> int:
+        """Read integer from heap"""
+        return int.from_bytes(await self.read(address, size), "little")
+
+    async def read_absolute(self, address: int, size: int) -> bytes:
+        """Read bytes from absolute address"""
+        return await self.request(f"peekAbsolute 0x{address:X} 0x{size:X}", size)
+
+    async def read_absolute_int(self, address: int, size: int) -> int:
+        """Read integer from absolute address"""
+        return int.from_bytes(await self.read_absolute(address, size), "little")
+
+    async def write(self, address: int, data: str) -> None:
+        """Write data to heap"""
+        await self.send_command(f"poke 0x{address:X} 0x{data}")
+
+    async def read_main(self, address: int, size: int) -> bytes:
+        """Read bytes from main"""
+        return await self.request(f"peekMain 0x{address:X} 0x{size:X}", size)
+
+    async def read_main_int(self, address: int, size: int) -> int:
+        """Read integer from main"""
+        return int.from_bytes(await self.read_main(address, size), "little")
+
+    async def write_main(self, address, data) -> None:
+        """Write data to main"""
+        await self.send_command(f"pokeMain 0x{address:X} 0x{data}")
+
+    async def resolve_pointers(self, pointers: list[str]) -> None:
+        """Resolve and cache the chains of pointers"""
+        chains = list(
+            dict.fromkeys(
+                chain
+                for chain, _ in map(NXReader.parse_pointer, pointers)
+                if chain not in self._pointer_cache
+            )
+        )
+        responses = await asyncio.gather(
+            *(
+                self.request(
+                    f'pointerAll {" ".join(f"0x{jump:X}" for jump in (*chain, 0))}',
+                    8,
+                )
+                for chain in chains
+            )
+        )
+        for chain, response in zip(chains, responses):
+            # sent as a big-endian hex string, chains that could not be
+            # followed are cached as 0 until cleared
+            self._pointer_cache[chain] = int.from_bytes(response, "big")
+
+    async def resolve_pointer(self, pointer: str) -> int:
+        """Resolve pointer to an absolute address, 0 if it could not be followed"""
+        chain, offset = NXReader.parse_pointer(pointer)
+        if chain not in self._pointer_cache:
+            await self.resolve_pointers([pointer])
+        if (base := self._pointer_cache[chain]) == 0:
+            return 0
+        return base + offset
+
+    def clear_pointer_cache(self, pointer: str = None) -> None:
+        """Forget resolved pointers, see NXReader.clear_pointer_cache"""
+        if pointer is None:
+            self._pointer_cache.clear()
+            return
+        self._pointer_cache.pop(NXReader.parse_pointer(pointer)[0], None)
+
+    async def read_pointer(self, pointer: str, size: int) -> bytes:
+        """Read bytes from pointer"""
+        if address := await self.resolve_pointer(pointer):
+            return await self.read_absolute(address, size)
+        return await self.request(NXReader.pointer_peek_command(pointer, size), size)
+
+    async def read_pointer_int(self, pointer: str, size: int) -> int:
+        """Read integer from pointer"""
+        return int.from_bytes(await self.read_pointer(pointer, size), "little")
+
+    async def read_multi(
+        self, requests: list[tuple[str, int | str, int]]
+    ) -> list[bytes]:
+        """Read several regions, see NXReader.read_multi"""
+        await self.resolve_pointers(
+            [address for kind, address, _ in requests if kind == "pointer"]
+        )
+        resolved = []
+        for kind, address, size in requests:
+            if kind == "pointer" and (absolute := await self.resolve_pointer(address)):
+                kind, address = "absolute", absolute
+            resolved.append((kind, address, size))
+        commands = NXReader.build_multi_commands(resolved, self.multi_peek)
+        responses = await asyncio.gather(
+            *(self.request(command, size) for command, size, _ in commands)
+        )
+        return NXReader.split_multi_responses(commands, responses, len(requests))
+
+    async def write_pointer(self, pointer: str, data: str) -> None:
+        """Write data to pointer"""
+        jumps = pointer.replace("[", "").replace("main", "").split("]")
+        command = f'pointerPoke 0x{data} 0x{" 0x".join(jump.replace("+", "") for jump in jumps)}'
+        await self.send_command(command)
+
+    @staticmethod
+    async def pause(duration: float):
+        """Pause connection to switch"""
+        await asyncio.sleep(duration)
@@ -1,9 +1,12 @@
 """Simplified class to read information from sys-botbase
    https://github.com/Lincoln-LM/PyNXReader"""
 
+import array
+import contextlib
 import struct
 import socket
 import binascii
+from functools import partial
 from time import sleep
 from math import ceil
 import libusb_package
@@ -11,6 +14,7 @@ import usb.core
 import usb.util
 import usb.backend.libusb1
 from ..enums import Button
+from .session_replay import SessionEvent, SessionRecorder, SessionReplay
 
 LIBUSB1_BACKEND = usb.backend.libusb1.get_backend(
     find_library=libusb_package.find_library
@@ -27,53 +31,101 @@ class SocketError(Exception):
     """Error to be raised for socket connections"""
 
 
+class FramingError(SocketError):
+    """Error to be raised when a response does not match its command"""
+
+
 class NXReader:
     """Simplified class to read information from sys-botbase"""
 
+    # commands for single and multi region reads of each address kind
+    PEEK_COMMANDS = {
+        "heap": ("peek", "peekMulti"),
+        "absolute": ("peekAbsolute", "peekAbsoluteMulti"),
+        "main": ("peekMain", "peekMainMulti"),
+    }
+    # max regions to read with a single multi peek
+    MULTI_PEEK_LIMIT = 16
+    # size of the marker read used to resynchronize the response stream,
+    # chosen to not match any other read
+    SYNC_SIZE = 0x1F3
+
     def __init__(
-        self, ip_address: str = None, port: int = 6000, usb_connection: bool = False
+        self,
+        ip_address: str = None,
+        port: int = 6000,
+        usb_connection: bool = False,
+        multi_peek: bool = True,
+        usb_endpoints: tuple = None,
+        replay: SessionReplay = None,
     ) -> None:
-        assert usb_connection or ip_address is not None
+        assert usb_connection or ip_address is not None or replay is not None
         self.usb_connection = usb_connection
-        if self.usb_connection:
-            # nintendo switch vendor and product
-            self.global_dev = usb.core.find(
-                idVendor=0x057E, idProduct=0x3000, backend=LIBUSB1_BACKEND
-            )
-            if self.global_dev is None:
-                raise USBError("Unable to find switch usb connection")
-            self.global_dev.set_configuration()
-            descriptor = self.global_dev.get_active_configuration()[(0, 0)]
-            self.global_out = usb.util.find_descriptor(
-                descriptor,
-                custom_match=lambda e: (
-                    usb.util.endpoint_direction(e.bEndpointAddress)
-                    == usb.util.ENDPOINT_OUT
-                ),
-            )
-            self.global_in = usb.util.find_descriptor(
-                descriptor,
-                custom_match=lambda e: (
-                    usb.util.endpoint_direction(e.bEndpointAddress)
-                    == usb.util.ENDPOINT_IN
-                ),
-            )
-        else:
-            self.socket: socket.socket = socket.socket(
-                socket.AF_INET, socket.SOCK_STREAM
-            )
-            self.socket.settimeout(1)
-            self.socket.connect((ip_address, port))
+        # older versions of sys-botbase do not support multi peeks, probed
+        # once connected
+        self.multi_peek = multi_peek
+        self.global_dev = None
+        # recorded session played back instead of a connection
+        self.replay = replay
+        self.recorder: SessionRecorder = None
+        if self.replay is None:
+            if self.usb_connection and usb_endpoints is not None:
+                # (out, in) endpoints of an already opened device
+                self.global_out, self.global_in = usb_endpoints
+            elif self.usb_connection:
+                # nintendo switch vendor and product
+                self.global_dev = usb.core.find(
+                    idVendor=0x057E, idProduct=0x3000, backend=LIBUSB1_BACKEND
+                )
+                if self.global_dev is None:
+                    raise USBError("Unable to find switch usb connection")
+                self.global_dev.set_configuration()
+                descriptor = self.global_dev.get_active_configuration()[(0, 0)]
+                self.global_out = usb.util.find_descriptor(
+                    descriptor,
+                    custom_match=lambda e: (
+                        usb.util.endpoint_direction(e.bEndpointAddress)
+                        == usb.util.ENDPOINT_OUT
+                    ),
+                )
+                self.global_in = usb.util.find_descriptor(
+                    descriptor,
+                    custom_match=lambda e: (
+                        usb.util.endpoint_direction(e.bEndpointAddress)
+                        == usb.util.ENDPOINT_IN
+                    ),
+                )
+            else:
+                self.socket: socket.socket = socket.socket(
+                    socket.AF_INET, socket.SOCK_STREAM
+                )
+                self.socket.settimeout(1)
+                self.socket.connect((ip_address, port))
         print("Connected")
         self.ls_lastx: int = 0
         self.ls_lasty: int = 0
         self.rs_lastx: int = 0
         self.rs_lasty: int = 0
-        self._configure()
+        # absolute addresses of dereferenced pointer chains
+        self._pointer_cache: dict[tuple[int], int] = {}
+        # commands queued for send_queued: (command, response size or None)
+        self._queued_commands: list[tuple[str, int | None]] = []
+        # receive buffers reused between responses
+        self._recv_buffer = bytearray(0x1000)
+        self._usb_chunk = array.array("B", bytes(4080))
+        # recordings start after the connection is configured
+        if self.replay is None:
+            self._configure()
+            if self.multi_peek:
+                self.multi_peek = self.probe_multi_peek()
 
     def send_command(self, content: str) -> None:
         """Send a command to sys-botbase on the switch"""
-        if self.usb_connection:
+        if self.recorder is not None:
+            self.recorder.record(SessionEvent.COMMAND, content.encode())
+        if self.replay is not None:
+            self.replay.send_command(content)
+        elif self.usb_connection:
             self.global_out.write(struct.pack("<I", len(content) + 2))
             self.global_out.write(content)
         else:
@@ -83,86 +135,195 @@ class NXReader:
     def _configure(self) -> None:
         self.send_command("configure echoCommands 0")
 
+    def probe_multi_peek(self) -> bool:
+        """Check whether sys-botbase supports multi peeks with a one region read
+
+        Builds without them do not respond at all"""
+        self.send_command("peekMainMulti 0x0 0x4")
+        if self.usb_connection:
+            try:
+                size = int(
+                    struct.unpack("<L", self.global_in.read(4, timeout=1000).tobytes())[
+                        0
+                    ]
+                )
+            except usb.core.USBTimeoutError:
+                print("WARNING: sys-botbase does not support multi peeks")
+                return False
+            self._read_chunks(size, 4080, self._usb_read_into)
+            return True
+        try:
+            self._recv(4)
+        except FramingError:
+            print("WARNING: sys-botbase does not support multi peeks")
+            self.resync()
+            return False
+        return True
+
     def detach(self) -> None:
         """Detach controller from switch"""
         self.send_command("detachController")
 
+    def start_recording(self, path: str) -> None:
+        """Record commands, responses and timing to path for SessionReplay"""
+        self.stop_recording()
+        self.recorder = SessionRecorder(path)
+
+    def stop_recording(self) -> None:
+        """Stop and save the current recording"""
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
     def wait_until_clickseq_done(self, assumed_time: float) -> bool:
         """Read the 'done' output after a clickSeq"""
+        if self.replay is not None or self.recorder is not None:
+            response = self._replay_or_record(
+                None, lambda: bytes(self._read_clickseq_done(assumed_time))
+            )
+        else:
+            response = self._read_clickseq_done(assumed_time)
+        return response == b"done\n"
+
+    def _read_clickseq_done(self, assumed_time: float) -> memoryview:
+        """Read the raw output of a clickSeq"""
         if self.usb_connection:
             assumed_time = ceil(assumed_time * 1000)
-            return (
-                self._read_chunks(
-                    int(
-                        struct.unpack(
-                            "<L", self.global_in.read(4, timeout=assumed_time).tobytes()
-                        )[0]
-                    ),
-                    4080,
-                    lambda size: self.global_in.read(
-                        size, timeout=assumed_time
-                    ).tobytes(),
-                )
-                == b"done\n"
+            return self._read_chunks(
+                int(
+                    struct.unpack(
+                        "<L", self.global_in.read(4, timeout=assumed_time).tobytes()
+                    )[0]
+                ),
+                4080,
+                partial(self._usb_read_into, timeout=assumed_time),
             )
         self.socket.settimeout(assumed_time)
-        return (
-            self._read_chunks(size=5, chunk_size=1020, read_func=self.socket.recv)
-            == b"done\n"
+        return self._read_chunks(
+            size=5, chunk_size=1020, read_into=self.socket.recv_into
+        )
+
+    def _buffer_view(self, size: int) -> memoryview:
+        """View of size bytes of the reusable receive buffer"""
+        if len(self._recv_buffer) < size:
+            self._recv_buffer = bytearray(size)
+        return memoryview(self._recv_buffer)[:size]
+
+    def _usb_read_into(self, view: memoryview, timeout: int = 0) -> int:
+        """Read from usb into view, returning the amount of bytes read"""
+        # pyusb only reads into arrays
+        chunk = (
+            self._usb_chunk
+            if len(view) == len(self._usb_chunk)
+            else array.array("B", bytes(len(view)))
         )
+        read_size = self.global_in.read(chunk, timeout=timeout)
+        view[:read_size] = memoryview(chunk)[:read_size]
+        return read_size
 
-    def _read_chunks(self, size: int, chunk_size: int, read_func: callable) -> bytes:
-        """Read data from socket/usb in chunks"""
-        if size < chunk_size:
-            return read_func(size)
-        # empty bytes of size
-        data = bytearray(0 for _ in range(size))
+    def _read_chunks(
+        self, size: int, chunk_size: int, read_into: callable
+    ) -> memoryview:
+        """Read data from socket/usb in chunks into the reusable receive buffer
+
+        The returned view is only valid until the next read"""
+        data = self._buffer_view(size)
         i = 0
         # while there is still data to read
         while i < size:
-            current_chunk_size = chunk_size
-            # data left to read is less than chunk_size
-            if size - i < current_chunk_size:
-                current_chunk_size = size - i
-            # try to read chunk_size worth of data
-            read_data = read_func(current_chunk_size)
+            # read at most chunk_size worth of data straight into the buffer
+            read_size = read_into(data[i : min(i + chunk_size, size)])
             # socket shut down on the switch side
-            if len(read_data) == 0:
+            if read_size == 0:
                 raise SocketError("Socket shut down on the switch's side.")
-            # store in data
-            data[i : i + len(read_data)] = read_data
-            i += len(read_data)
+            i += read_size
         return data
 
+    def _replay_or_record(self, size: int | None, receive: callable) -> bytes:
+        """Replay the next response or receive it and record it when recording"""
+        if self.replay is not None:
+            if (response := self.replay.recv(size)) is None:
+                raise FramingError("Replayed framing error")
+            return response
+        try:
+            response = receive()
+        except FramingError as error:
+            if self.recorder is not None:
+                self.recorder.record(SessionEvent.FRAMING_ERROR, str(error).encode())
+            raise
+        if self.recorder is not None:
+            self.recorder.record(SessionEvent.RESPONSE, response)
+        return response
+
     def _recv(self, size: int) -> bytes:
         """Receive response from sys-botbase"""
+        if self.replay is not None or self.recorder is not None:
+            return self._replay_or_record(size, partial(self._recv_response, size))
+        return self._recv_response(size)
+
+    def _recv_response(self, size: int) -> bytes:
         if not self.usb_connection:
-            # hex -> bytes, strip ending \n
-            return binascii.unhexlify(
-                self._read_chunks(
+            try:
+                data = self._read_chunks(
                     # * 2 because the data is sent as a hex string
                     # + 1 because it ends in \n
                     size=size * 2 + 1,
                     chunk_size=1020,
-                    read_func=self.socket.recv,
-                )[:-1]
-            )
+                    read_into=self.socket.recv_into,
+                )
+            # a truncated response never completes, a lost connection will
+            # still time out while resynchronizing
+            except TimeoutError as error:
+                raise FramingError(f"Response of {size=:X} timed out") from error
+            if data[-1] != ord("\n"):
+                raise FramingError(f"Response of {size=:X} is not terminated")
+            # hex -> bytes, strip ending \n
+            try:
+                return binascii.unhexlify(data[:-1])
+            except binascii.Error as error:
+                raise FramingError(f"Response of {size=:X} is not hex") from error
         # usb tells us the size its sending
         usb_size = int(
             struct.unpack("<L", self.global_in.read(4, timeout=0).tobytes())[0]
         )
         assert usb_size == size, "USB did not send the correct amount of bytes"
-        return self._read_chunks(
-            size, 4080, lambda size: self.global_in.read(size, timeout=0).tobytes()
-        )
+        return bytes(self._read_chunks(size, 4080, self._usb_read_into))
+
+    def resync(self) -> None:
+        """Discard stale or partial responses from the socket
+
+        A marker read of SYNC_SIZE is sent and responses are discarded line by
+        line until its response, the last one outstanding, is found"""
+        if self.usb_connection:
+            return
+        self.send_command(f"peekMain 0x0 0x{self.SYNC_SIZE:X}")
+        if self.replay is not None:
+            return
+        line = bytearray()
+        while True:
+            chunk = self.socket.recv(0x8000)
+            if len(chunk) == 0:
+                raise SocketError("Socket shut down on the switch's side.")
+            line += chunk
+            *lines, line = line.split(b"\n")
+            for full_line in lines:
+                if len(full_line) == self.SYNC_SIZE * 2:
+                    with contextlib.suppress(ValueError):
+                        bytes.fromhex(full_line.decode())
+                        return
 
     def close(self) -> None:
         """Close connection to switch"""
         print("Exiting...")
         self.detach()
+        self.stop_recording()
+        if self.replay is not None:
+            print("Disconnected")
+            return
         self.pause(0.5)
         if self.usb_connection:
-            self.global_dev.reset()
+            if self.global_dev is not None:
+                self.global_dev.reset()
         else:
             self.socket.shutdown(socket.SHUT_RDWR)
             self.socket.close()
@@ -213,8 +374,7 @@ class NXReader:
 
     def read(self, address: int, size: int) -> bytes:
         """Read bytes from heap"""
-        self.send_command(f"peek 0x{address:X} 0x{size:X}")
-        return self._recv(size)
+        return self.request(f"peek 0x{address:X} 0x{size:X}", size)
 
     def read_int(self, address: int, size: int) -> int:
         """Read integer from heap"""
@@ -222,8 +382,7 @@ class NXReader:
 
     def read_absolute(self, address: int, size: int) -> bytes:
         """Read bytes from absolute address"""
-        self.send_command(f"peekAbsolute 0x{address:X} 0x{size:X}")
-        return self._recv(size)
+        return self.request(f"peekAbsolute 0x{address:X} 0x{size:X}", size)
 
     def read_absolute_int(self, address: int, size: int) -> int:
         """Read integer from absolute address"""
@@ -235,8 +394,7 @@ class NXReader:
 
     def read_main(self, address: int, size: int) -> bytes:
         """Read bytes from main"""
-        self.send_command(f"peekMain 0x{address:X} 0x{size:X}")
-        return self._recv(size)
+        return self.request(f"peekMain 0x{address:X} 0x{size:X}", size)
 
     def read_main_int(self, address: int, size: int) -> int:
         """Read integer from main"""
@@ -246,12 +404,197 @@ class NXReader:
         """Write data to main"""
         self.send_command(f"pokeMain 0x{address:X} 0x{data}")
 
+    @staticmethod
+    def parse_pointer(pointer: str) -> tuple[tuple[int], int]:
+        """Split pointer into the chain of jumps to dereference and a final offset"""
+        jumps = tuple(
+            int(jump.replace("+", "") or "0", 16)
+            for jump in pointer.replace("[", "").replace("main", "").split("]")
+        )
+        return jumps[:-1], jumps[-1]
+
+    def resolve_pointers(self, pointers: list[str]) -> None:
+        """Resolve and cache the chains of pointers, pipelining uncached chains"""
+        chains = list(
+            dict.fromkeys(
+                chain
+                for chain, _ in map(self.parse_pointer, pointers)
+                if chain not in self._pointer_cache
+            )
+        )
+        responses = self._pipeline(
+            [
+                (f'pointerAll {" ".join(f"0x{jump:X}" for jump in (*chain, 0))}', 8)
+                for chain in chains
+            ]
+        )
+        for chain, response in zip(chains, responses):
+            # sent as a raw u64 over usb but as a big-endian hex string otherwise
+            # chains that could not be followed are cached as 0 until cleared
+            self._pointer_cache[chain] = int.from_bytes(
+                response, "little" if self.usb_connection else "big"
+            )
+
+    def resolve_pointer(self, pointer: str) -> int:
+        """Resolve pointer to an absolute address
+
+        The dereferenced chain is cached so only the first resolution of a
+        chain costs a round trip, returns 0 if the chain could not be followed"""
+        chain, offset = self.parse_pointer(pointer)
+        if chain not in self._pointer_cache:
+            self.resolve_pointers([pointer])
+        if (base := self._pointer_cache[chain]) == 0:
+            return 0
+        return base + offset
+
+    def clear_pointer_cache(self, pointer: str = None) -> None:
+        """Forget resolved pointers, needed when the game restarts or moves data
+
+        Only the chain of pointer is forgotten when given"""
+        if pointer is None:
+            self._pointer_cache.clear()
+            return
+        self._pointer_cache.pop(self.parse_pointer(pointer)[0], None)
+
+    @staticmethod
+    def pointer_peek_command(pointer: str, size: int) -> str:
+        """Build a pointerPeek command that follows pointer on the switch"""
+        jumps = pointer.replace("[", "").replace("main", "").split("]")
+        return f'pointerPeek 0x{size:X} 0x{" 0x".join(jump.replace("+", "") for jump in jumps)}'
+
     def read_pointer(self, pointer: str, size: int) -> bytes:
         """Read bytes from pointer"""
-        jumps = pointer.replace("[", "").replace("main", "").split("]")
-        command = f'pointerPeek 0x{size:X} 0x{" 0x".join(jump.replace("+", "") for jump in jumps)}'
-        self.send_command(command)
-        return self._recv(size)
+        if address := self.resolve_pointer(pointer):
+            return self.read_absolute(address, size)
+        return self.request(self.pointer_peek_command(pointer, size), size)
+
+    def request(self, command: str, size: int) -> bytes:
+        """Send a command and receive its response of size bytes"""
+        return self._pipeline([(command, size)])[0]
+
+    def queue_command(self, command: str, size: int = None) -> None:
+        """Queue a command to be pipelined by send_queued
+
+        size is the expected response size, None for commands without one"""
+        self._queued_commands.append((command, size))
+
+    def send_queued(self) -> list[bytes | None]:
+        """Send all queued commands and receive their responses in order"""
+        commands, self._queued_commands = self._queued_commands, []
+        return self._pipeline(commands)
+
+    def _pipeline(self, commands: list[tuple[str, int | None]]) -> list[bytes | None]:
+        """Send (command, response size) pairs and receive every response
+
+        Over sockets every command is sent before any response is read.
+        When a response is misframed the stream is resynchronized and the
+        reads that were not received yet are retried once"""
+        if self.usb_connection:
+            responses = []
+            for command, size in commands:
+                self.send_command(command)
+                responses.append(None if size is None else self._recv(size))
+            return responses
+        for command, _ in commands:
+            self.send_command(command)
+        responses = []
+        for i, (_, size) in enumerate(commands):
+            if size is None:
+                responses.append(None)
+                continue
+            try:
+                responses.append(self._recv(size))
+            except FramingError as error:
+                print(f"WARNING: {error}, resynchronizing")
+                self.resync()
+                # only reads are retried, other commands were already applied
+                retry = [command for command in commands[i:] if command[1] is not None]
+                for command, _ in retry:
+                    self.send_command(command)
+                try:
+                    retried = iter([self._recv(size) for _, size in retry])
+                except FramingError:
+                    # leave no retried responses behind for the next read
+                    self.resync()
+                    raise
+                responses.extend(
+                    None if size is None else next(retried) for _, size in commands[i:]
+                )
+                break
+        return responses
+
+    @staticmethod
+    def build_multi_commands(
+        requests: list[tuple[str, int | str, int]], multi_peek: bool
+    ) -> list[tuple[str, int, list[tuple[int, int]]]]:
+        """Build (command, response size, [(request index, size)]) reading requests
+
+        Pointers that could be resolved must already be replaced by absolute
+        addresses, remaining pointers are read with pointerPeek"""
+        commands = []
+        groups: dict[str, list[tuple[int, int, int]]] = {}
+        for i, (kind, address, size) in enumerate(requests):
+            if kind == "pointer":
+                commands.append(
+                    (NXReader.pointer_peek_command(address, size), size, [(i, size)])
+                )
+                continue
+            groups.setdefault(kind, []).append((i, address, size))
+        for kind, group in groups.items():
+            single_command, multi_command = NXReader.PEEK_COMMANDS[kind]
+            if not multi_peek:
+                commands.extend(
+                    (f"{single_command} 0x{address:X} 0x{size:X}", size, [(i, size)])
+                    for i, address, size in group
+                )
+                continue
+            for start in range(0, len(group), NXReader.MULTI_PEEK_LIMIT):
+                chunk = group[start : start + NXReader.MULTI_PEEK_LIMIT]
+                commands.append(
+                    (
+                        f"{multi_command} "
+                        + " ".join(
+                            f"0x{address:X} 0x{size:X}" for _, address, size in chunk
+                        ),
+                        sum(size for _, _, size in chunk),
+                        [(i, size) for i, _, size in chunk],
+                    )
+                )
+        return commands
+
+    @staticmethod
+    def split_multi_responses(
+        commands: list[tuple[str, int, list[tuple[int, int]]]],
+        responses: list[bytes],
+        request_count: int,
+    ) -> list[bytes]:
+        """Split the responses of build_multi_commands back into each request"""
+        results: list[bytes] = [None] * request_count
+        for (_, _, regions), response in zip(commands, responses):
+            ofs = 0
+            for i, size in regions:
+                results[i] = response[ofs : ofs + size]
+                ofs += size
+        return results
+
+    def read_multi(self, requests: list[tuple[str, int | str, int]]) -> list[bytes]:
+        """Read several regions with as few round trips as possible
+
+        requests are (kind, address, size) where kind is "heap", "absolute",
+        "main" or "pointer" (with address being the pointer string).
+        Regions of the same kind are read with multi peeks when supported
+        and all commands are pipelined"""
+        self.resolve_pointers(
+            [address for kind, address, _ in requests if kind == "pointer"]
+        )
+        resolved = []
+        for kind, address, size in requests:
+            if kind == "pointer" and (absolute := self.resolve_pointer(address)):
+                kind, address = "absolute", absolute
+            resolved.append((kind, address, size))
+        commands = self.build_multi_commands(resolved, self.multi_peek)
+        responses = self._pipeline([(command, size) for command, size, _ in commands])
+        return self.split_multi_responses(commands, responses, len(requests))
 
     def read_pointer_int(self, pointer: str, size: int) -> int:
         """Read integer from pointer"""
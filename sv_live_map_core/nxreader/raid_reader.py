@@ -1,20 +1,23 @@
 """Subclass of NXReader with functions specifically for raids"""
 
-import contextlib
 import socket
 import io
 import struct
+import time
 from typing import Type
 import bytechomp
 from PIL import Image
 from .nxreader import NXReader
+from .session_replay import SessionReplay
 from ..enums import StarLevel, StoryProgress, Game
+from ..enums.save_block import SCTypeCode
 from ..fbs.raid_enemy_table_array import RaidEnemyTableArray
 from ..fbs.delivery_raid_priority_array import DeliveryRaidPriorityArray
 from ..fbs.raid_fixed_reward_item_array import RaidFixedRewardItemArray
 from ..fbs.raid_lottery_reward_item_array import RaidLotteryRewardItemArray
 from ..save.raid_block import RaidBlock, process_raid_block
-from ..rng import SCXorshift32
+from ..save.encounter_index import EncounterIndex
+from ..rng import decrypt_into
 from ..save.my_status_9 import MyStatus9
 
 
@@ -30,7 +33,14 @@ class RaidReader(NXReader):
     RAID_BINARY_OFS = (0x8, 0x8, 0x4, 0x4, 0x4, 0x4, None)
     # https://github.com/Manu098vm/SVResearches/blob/master/RAM%20Pointers/RAM%20Pointers.txt
     RAID_BLOCK_PTR = ("[[main+43A77C8]+160]+40", 0xC98)  # ty skylink!
+    RAID_BINARY_PTR = "[[[[[[[[main+43A77B8]+20]+2B0]+60]+10]+208]]+198]+{:X}"
+    RAID_FIXED_ITEM_PTR = ("[[[[[[[[main+43A77B8]+20]+2B0]+60]+30]+208]]+5D0]", 0x1CA8)
+    RAID_LOTTERY_ITEM_PTR = ("[[[[[[[main+43A77B8]+20]+2B0]+60]+28]+200]]+E8", 0x3AC8)
     SAVE_BLOCK_PTR = "[[[main+4385F30]+80]+8]"
+    # key table entries are (key, pad, data pointer, ...), key table covers
+    # every known location with room for blocks to shift after game updates
+    SAVE_BLOCK_ENTRY_SIZE = 0x20
+    SAVE_BLOCK_TABLE_SIZE = 0x2D000
     GAME_ID_OFS = 0x4385FD0  # game_id = *(main + GAME_ID_OFS)
     # save block locations and keys: (ofs, key)
     DIFFICULTY_FLAG_LOCATIONS = (
@@ -56,43 +66,79 @@ class RaidReader(NXReader):
         read_safety: bool = False,
         raid_enemy_table_arrays: tuple[bytes, 7] = None,
         raid_item_table_arrays: tuple[bytes, 2] = None,
+        usb_endpoints: tuple = None,
+        replay: SessionReplay = None,
+        multi_peek: bool = True,
     ):
-        super().__init__(ip_address, port, usb_connection)
+        super().__init__(
+            ip_address,
+            port,
+            usb_connection,
+            multi_peek,
+            usb_endpoints=usb_endpoints,
+            replay=replay,
+        )
         self.read_safety = read_safety
-        if raid_enemy_table_arrays is None:
-            self.raid_enemy_table_arrays: tuple[
-                RaidEnemyTableArray, 7
-            ] = self.read_raid_enemy_table_arrays()
-        else:
-            self.raid_enemy_table_arrays = [
-                RaidEnemyTableArray(table) for table in raid_enemy_table_arrays
-            ]
-            self.raid_enemy_table_arrays.append(
-                RaidEnemyTableArray(self.read_raid_binary(StarLevel.EVENT))
+        # key -> offset of every save block, scanned once a block has moved
+        self._save_block_offsets: dict[int, int] = None
+        (
+            event_binary,
+            fixed_delivery_binary,
+            lottery_delivery_binary,
+            priority_binary,
+            my_status_binary,
+        ) = self.read_save_block_objects(
+            (
+                self.BCAT_RAID_BINARY_LOCATION,
+                self.BCAT_RAID_FIXED_REWARD_LOCATION,
+                self.BCAT_RAID_LOTTERY_REWARD_LOCATION,
+                self.BCAT_RAID_PRIORITY_LOCATION,
+                self.MY_STATUS_LOCATION,
             )
+        )
+        if raid_enemy_table_arrays is None:
+            raid_enemy_table_arrays = self.read_raid_binaries()
+        self.raid_enemy_table_arrays: list[RaidEnemyTableArray] = [
+            RaidEnemyTableArray(table) for table in raid_enemy_table_arrays
+        ]
+        self.raid_enemy_table_arrays.append(RaidEnemyTableArray(event_binary))
+        self.encounter_index: EncounterIndex = EncounterIndex(
+            self.raid_enemy_table_arrays
+        )
         if raid_item_table_arrays is None:
-            self.raid_item_table_arrays: tuple[
-                RaidFixedRewardItemArray | RaidLotteryRewardItemArray, 4
-            ] = self.read_raid_item_table_arrays()
-        else:
-            self.raid_item_table_arrays: tuple[
-                RaidFixedRewardItemArray | RaidLotteryRewardItemArray, 4
-            ] = (
-                RaidFixedRewardItemArray(raid_item_table_arrays[0]),
-                RaidLotteryRewardItemArray(raid_item_table_arrays[1]),
-                *self.read_delivery_item_binaries(),
-            )
-        self.delivery_raid_priority: tuple[int] = self.read_delivery_raid_priority()
-        self.story_progress: StoryProgress = self.read_story_progess()
+            raid_item_table_arrays = self.read_raid_item_binaries()
+        self.raid_item_table_arrays: tuple[
+            RaidFixedRewardItemArray | RaidLotteryRewardItemArray, 4
+        ] = (
+            RaidFixedRewardItemArray(raid_item_table_arrays[0]),
+            RaidLotteryRewardItemArray(raid_item_table_arrays[1]),
+            RaidFixedRewardItemArray(fixed_delivery_binary),
+            RaidLotteryRewardItemArray(lottery_delivery_binary),
+        )
+        self.delivery_raid_priority: tuple[int] = self.parse_delivery_raid_priority(
+            priority_binary
+        )
+        self.story_progress: StoryProgress = self.story_progress_from_flags(
+            self.read_save_block_bools(self.DIFFICULTY_FLAG_LOCATIONS)
+        )
         self.game_version: Game = self.read_game_version()
-        self.my_status: MyStatus9 = self.read_my_status()
+        self.my_status: MyStatus9 = self.parse_save_block_struct(
+            my_status_binary, MyStatus9
+        )
         print(f"Trainer Info | {self.my_status}")
+        # last derived raid block, reused for unchanged raids
+        self.previous_raid_block: RaidBlock = None
 
     def read_delivery_raid_priority(self) -> tuple[int]:
         """Read the delivery priority flatbuffer from the save"""
-        delivery_raid_priority_array = DeliveryRaidPriorityArray(
+        return self.parse_delivery_raid_priority(
             self.read_save_block_object(*self.BCAT_RAID_PRIORITY_LOCATION)
         )
+
+    @staticmethod
+    def parse_delivery_raid_priority(binary: bytes) -> tuple[int]:
+        """Parse the group counts of a delivery priority flatbuffer"""
+        delivery_raid_priority_array = DeliveryRaidPriorityArray(binary)
         if len(delivery_raid_priority_array.delivery_raid_prioritys) == 0:
             return (0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0)
         return delivery_raid_priority_array.delivery_raid_prioritys[
@@ -101,17 +147,32 @@ class RaidReader(NXReader):
 
     def read_raid_fixed_item_binary(self) -> bytes:
         """Read raid fixed item flatbuffer binary from memory"""
-        return self.read_pointer(
-            "[[[[[[[[main+43A77B8]+20]+2B0]+60]+30]+208]]+5D0]", 0x1CA8
-        )
+        return self.read_pointer(*self.RAID_FIXED_ITEM_PTR)
 
     def read_raid_lottery_item_binary(self) -> bytes:
         """Read raid lottery item flatbuffer binary from memory"""
-        return self.read_absolute(
-            self.read_pointer_int("[[[[[[[main+43A77B8]+20]+2B0]+60]+28]+200]]+E8", 8)
-            - 0xC,
-            0x3AC8,
+        pointer, size = self.RAID_LOTTERY_ITEM_PTR
+        return self.read_absolute(self.read_pointer_int(pointer, 8) - 0xC, size)
+
+    def read_raid_item_binaries(self) -> tuple[bytes, 2]:
+        """Read raid fixed and lottery item flatbuffer binaries in one batch"""
+        lottery_pointer, lottery_size = self.RAID_LOTTERY_ITEM_PTR
+        fixed_binary, lottery_address = self.read_multi(
+            (
+                ("pointer", *self.RAID_FIXED_ITEM_PTR),
+                ("pointer", lottery_pointer, 8),
+            )
         )
+        (lottery_binary,) = self.read_multi(
+            (
+                (
+                    "absolute",
+                    int.from_bytes(lottery_address, "little") - 0xC,
+                    lottery_size,
+                ),
+            )
+        )
+        return fixed_binary, lottery_binary
 
     def read_delivery_item_binaries(
         self,
@@ -130,9 +191,10 @@ class RaidReader(NXReader):
         self,
     ) -> tuple[RaidFixedRewardItemArray | RaidLotteryRewardItemArray, 4]:
         """Read raid item table arrays from flatbuffer binaries stored in memory"""
+        fixed_binary, lottery_binary = self.read_raid_item_binaries()
         return (
-            RaidFixedRewardItemArray(self.read_raid_fixed_item_binary()),
-            RaidLotteryRewardItemArray(self.read_raid_lottery_item_binary()),
+            RaidFixedRewardItemArray(fixed_binary),
+            RaidLotteryRewardItemArray(lottery_binary),
             *self.read_delivery_item_binaries(),
         )
 
@@ -142,18 +204,48 @@ class RaidReader(NXReader):
             return self.read_save_block_object(*self.BCAT_RAID_BINARY_LOCATION)
         return self.read_absolute(
             self.read_pointer_int(
-                f"[[[[[[[[main+43A77B8]+20]+2B0]+60]+10]+208]]+198]+{(star_level + 1) * 0xB0:X}",
-                8,
+                self.RAID_BINARY_PTR.format((star_level + 1) * 0xB0), 8
             )
             - self.RAID_BINARY_OFS[star_level],
             self.RAID_BINARY_SIZES[star_level],
         )
 
+    def read_raid_binaries(self) -> list[bytes]:
+        """Read the raid flatbuffer binaries of every non-event star level"""
+        levels = [
+            level
+            for level in StarLevel
+            if level not in (StarLevel.EVENT, StarLevel.SEVEN_STAR)
+        ]
+        addresses = self.read_multi(
+            [
+                ("pointer", self.RAID_BINARY_PTR.format((level + 1) * 0xB0), 8)
+                for level in levels
+            ]
+        )
+        return self.read_multi(
+            [
+                (
+                    "absolute",
+                    int.from_bytes(address, "little") - self.RAID_BINARY_OFS[level],
+                    self.RAID_BINARY_SIZES[level],
+                )
+                for level, address in zip(levels, addresses)
+            ]
+        )
+
     def read_story_progess(self) -> StoryProgress:
         """Read and decrypt story progress from save blocks"""
+        return self.story_progress_from_flags(
+            self.read_save_block_bools(self.DIFFICULTY_FLAG_LOCATIONS)
+        )
+
+    @staticmethod
+    def story_progress_from_flags(difficulty_flags: list[bool]) -> StoryProgress:
+        """Get story progress from the unlock flags of each difficulty"""
         progress = StoryProgress.SIX_STAR_UNLOCKED
-        for ofs, key in reversed(self.DIFFICULTY_FLAG_LOCATIONS):
-            if self.read_save_block_bool(ofs, key=key):
+        for flag in reversed(difficulty_flags):
+            if flag:
                 return StoryProgress(progress)
             progress -= 1
         return StoryProgress.DEFAULT
@@ -169,37 +261,65 @@ class RaidReader(NXReader):
             return base_offset, self.read_pointer_int(
                 f"{self.SAVE_BLOCK_PTR}+{base_offset:X}", 4
             )
+        if (offset := self._lookup_save_block_offset(key)) is not None:
+            return offset, key
         read_key = self.read_pointer_int(f"{self.SAVE_BLOCK_PTR}+{base_offset:X}", 4)
         if read_key != key:
-            print(
-                f"WARNING: {base_offset=:X} contains the key {read_key=:X} and not {key=:X}"
-            )
-            print("Searching for correct block")
-            direction = 1 if key > read_key else -1
-            for offset in range(
-                base_offset, base_offset + direction * 0x1000, direction * 0x20
-            ):
-                read_key = self.read_pointer_int(f"{self.SAVE_BLOCK_PTR}+{offset:X}", 4)
-                print(f"Testing {offset=:X}, {read_key=:X}")
-                if read_key == key:
-                    print(f"Found at {offset=:X}")
-                    return offset, key
-            raise SaveBlockError("Save block not found")
+            return self._find_moved_save_block(base_offset, read_key, key), key
         return base_offset, key
 
+    def _find_moved_save_block(self, base_offset: int, read_key: int, key: int) -> int:
+        """Find the offset of a save block whose key was not at base_offset"""
+        if (offset := self._lookup_save_block_offset(key)) is not None:
+            return offset
+        print(
+            f"WARNING: {base_offset=:X} contains the key {read_key=:X} and not {key=:X}"
+        )
+        print("Scanning save block key table")
+        # resolved save block pointers may be stale
+        self.clear_pointer_cache()
+        self._save_block_offsets = self.read_save_block_offsets()
+        if (offset := self._save_block_offsets.get(key)) is None:
+            raise SaveBlockError("Save block not found")
+        print(f"Found at {offset=:X}")
+        return offset
+
+    def _lookup_save_block_offset(self, key: int) -> int | None:
+        """Offset of key in the cached save block key table, if scanned"""
+        if self._save_block_offsets is None:
+            return None
+        return self._save_block_offsets.get(key)
+
+    def read_save_block_offsets(self) -> dict[int, int]:
+        """Read the save block key table in one read and map each key to its offset"""
+        table = self.read_pointer(self.SAVE_BLOCK_PTR, self.SAVE_BLOCK_TABLE_SIZE)
+        offsets = {}
+        for ofs, (key,) in zip(
+            range(0, len(table), self.SAVE_BLOCK_ENTRY_SIZE),
+            struct.iter_unpack(f"<I{self.SAVE_BLOCK_ENTRY_SIZE - 4}x", table),
+        ):
+            # keep the first entry of keys that repeat in unused space
+            offsets.setdefault(key, ofs)
+        return offsets
+
     @staticmethod
     def _decrypt_save_block(key: int, block: bytearray) -> bytearray:
-        rng = SCXorshift32(key)
-        for i, byte in enumerate(block):
-            block[i] = byte ^ rng.next()
+        decrypt_into(block, key)
         return block
 
     # TODO: read save blocks more like save_file_9 does
     def read_save_block_struct(self, offset: int, _struct: Type, key: int = None):
         """Read decrypted save block of bytechomp struct at offset"""
         offset, key = self._search_save_block(offset, key)
+        return self.parse_save_block_struct(
+            self.read_save_block_object(offset, key), _struct
+        )
+
+    @staticmethod
+    def parse_save_block_struct(data: bytes, _struct: Type):
+        """Parse decrypted save block object as bytechomp struct"""
         byte_reader = bytechomp.Reader[_struct](bytechomp.ByteOrder.LITTLE).allocate()
-        byte_reader.feed(self.read_save_block_object(offset, key))
+        byte_reader.feed(data)
         assert byte_reader.is_complete(), "Invalid data size"
         return byte_reader.build()
 
@@ -222,10 +342,9 @@ class RaidReader(NXReader):
     def read_save_block_object(self, offset: int, key: int = None) -> bytearray:
         """Read decrypted save block object at offset"""
         offset, key = self._search_save_block(offset, key)
-        header = bytearray(
-            self.read_pointer(f"[{self.SAVE_BLOCK_PTR}+{offset + 8:X}]", 5)
+        (header,) = self._read_save_block_heads(
+            [offset], [key], 5, (SCTypeCode.OBJECT,)
         )
-        header = self._decrypt_save_block(key, header)
         # discard type byte
         size = int.from_bytes(header[1:], "little")
         full_object = bytearray(
@@ -234,6 +353,83 @@ class RaidReader(NXReader):
         # discard type and size bytes
         return self._decrypt_save_block(key, full_object)[5:]
 
+    def _read_save_block_heads(
+        self,
+        offsets: list[int],
+        keys: list[int],
+        size: int,
+        type_codes: tuple[SCTypeCode],
+    ) -> list[bytearray]:
+        """Read and decrypt the first size bytes of several save blocks
+
+        Data pointers are resolved again if a type byte is not in type_codes"""
+        pointers = [f"[{self.SAVE_BLOCK_PTR}+{ofs + 8:X}]" for ofs in offsets]
+        for attempt in range(2):
+            heads = [
+                self._decrypt_save_block(key, bytearray(head))
+                for key, head in zip(
+                    keys,
+                    self.read_multi(
+                        [("pointer", pointer, size) for pointer in pointers]
+                    ),
+                )
+            ]
+            if all(head[0] in type_codes for head in heads):
+                return heads
+            if attempt == 0:
+                # save block data is reallocated when the game restarts
+                for pointer in pointers:
+                    self.clear_pointer_cache(pointer)
+        raise SaveBlockError("Save block has an unexpected type")
+
+    def validate_save_block_offsets(
+        self, locations: tuple[tuple[int, int]]
+    ) -> list[int]:
+        """Check the keys of several save blocks in one batch, searching for
+        the correct offset of any block that moved"""
+        offsets = [self._lookup_save_block_offset(key) for _, key in locations]
+        if None not in offsets:
+            return offsets
+        read_keys = self.read_multi(
+            [("pointer", f"{self.SAVE_BLOCK_PTR}+{ofs:X}", 4) for ofs, _ in locations]
+        )
+        offsets = []
+        for (ofs, key), read_key in zip(locations, read_keys):
+            if (read_key := int.from_bytes(read_key, "little")) != key:
+                ofs = self._find_moved_save_block(ofs, read_key, key)
+            offsets.append(ofs)
+        return offsets
+
+    def read_save_block_bools(self, locations: tuple[tuple[int, int]]) -> list[bool]:
+        """Read decrypted save block booleans at each (offset, key)"""
+        blocks = self._read_save_block_heads(
+            self.validate_save_block_offsets(locations),
+            [key for _, key in locations],
+            1,
+            (SCTypeCode.BOOL_FALSE, SCTypeCode.BOOL_TRUE),
+        )
+        return [block[0] == SCTypeCode.BOOL_TRUE for block in blocks]
+
+    def read_save_block_objects(
+        self, locations: tuple[tuple[int, int]]
+    ) -> list[bytearray]:
+        """Read decrypted save block objects at each (offset, key) in batches"""
+        offsets = self.validate_save_block_offsets(locations)
+        pointers = [f"[{self.SAVE_BLOCK_PTR}+{ofs + 8:X}]" for ofs in offsets]
+        headers = self._read_save_block_heads(
+            offsets, [key for _, key in locations], 5, (SCTypeCode.OBJECT,)
+        )
+        # discard type byte
+        sizes = [int.from_bytes(header[1:], "little") for header in headers]
+        full_objects = self.read_multi(
+            [("pointer", pointer, 5 + size) for pointer, size in zip(pointers, sizes)]
+        )
+        # discard type and size bytes
+        return [
+            self._decrypt_save_block(key, bytearray(full_object))[5:]
+            for (_, key), full_object in zip(locations, full_objects)
+        ]
+
     def read_trainer_icon(self) -> Image.Image:
         """Read trainer icon as PIL image"""
 
@@ -270,26 +466,62 @@ class RaidReader(NXReader):
 
     def read_raid_enemy_table_arrays(self) -> tuple[RaidEnemyTableArray, 7]:
         """Read all raid flatbuffer binaries from memory"""
-        binaries = []
-        for difficulty in StarLevel:
-            if difficulty == StarLevel.SEVEN_STAR:
-                continue
-            print(f"Reading binary for {difficulty=}")
-            binaries.append(RaidEnemyTableArray(self.read_raid_binary(difficulty)))
+        binaries = [RaidEnemyTableArray(table) for table in self.read_raid_binaries()]
+        binaries.append(RaidEnemyTableArray(self.read_raid_binary(StarLevel.EVENT)))
         print("Done reading raid binaries!")
         return tuple(binaries)
 
-    def read_raid_block_data(self) -> RaidBlock:
-        """Read raid block data from memory and process"""
+    def read_raid_block_seeds(self) -> tuple[int, int]:
+        """Read only the current and tomorrow seeds from the raid block header"""
+        seeds = struct.unpack("<QQ", self.read_pointer(self.RAID_BLOCK_PTR[0], 0x10))
+        if seeds[0] == 0:
+            # a stale pointer after the game restarts reads freed memory
+            self.clear_pointer_cache(self.RAID_BLOCK_PTR[0])
+            seeds = struct.unpack(
+                "<QQ", self.read_pointer(self.RAID_BLOCK_PTR[0], 0x10)
+            )
+        return seeds
+
+    def wait_for_raid_block_change(
+        self, last_seed: int, timeout: float = 0, interval: float = 0.2
+    ) -> bool:
+        """Poll the raid block header until current_seed differs from last_seed
+
+        Returns False if the seed did not change within timeout"""
+        deadline = time.perf_counter() + timeout
+        while True:
+            current_seed, _ = self.read_raid_block_seeds()
+            if current_seed != last_seed:
+                return True
+            if time.perf_counter() >= deadline:
+                return False
+            self.pause(interval)
+
+    def read_raid_block(self) -> RaidBlock:
+        """Read the raw raid block, re-resolving its pointer if it is invalid"""
         raid_block = process_raid_block(self.read_pointer(*self.RAID_BLOCK_PTR))
+        if not raid_block.is_valid():
+            # the cached pointer is stale after the game restarts
+            self.clear_pointer_cache(self.RAID_BLOCK_PTR[0])
+            raid_block = process_raid_block(self.read_pointer(*self.RAID_BLOCK_PTR))
+        return raid_block
+
+    def read_raid_block_data(self, incremental: bool = True) -> RaidBlock:
+        """Read raid block data from memory and process
+
+        When incremental, only raids that changed since the last read are
+        regenerated"""
+        raid_block = self.read_raid_block()
         raid_block.initialize_data(
-            self.raid_enemy_table_arrays,
+            self.encounter_index,
             self.raid_item_table_arrays,
             self.story_progress,
             self.game_version,
             self.my_status,
             self.delivery_raid_priority,
+            self.previous_raid_block if incremental else None,
         )
+        self.previous_raid_block = raid_block
         return raid_block
 
     def check_if_data_avaiable(self):
@@ -302,9 +534,7 @@ class RaidReader(NXReader):
 
     def clear_all_data(self):
         """Clear all data waiting to be read"""
-        with contextlib.suppress(TimeoutError):
-            while self.check_if_data_avaiable():
-                self.socket.recv(0x8000)
+        self.resync()
 
     def read(self, address: int, size: int) -> bytes:
         """Read bytes from heap"""
@@ -329,3 +559,9 @@ class RaidReader(NXReader):
         if self.read_safety and not self.usb_connection:
             self.clear_all_data()
         return super().read_pointer(pointer, size)
+
+    def read_multi(self, requests: list[tuple[str, int | str, int]]) -> list[bytes]:
+        """Read several regions with as few round trips as possible"""
+        if self.read_safety and not self.usb_connection:
+            self.clear_all_data()
+        return super().read_multi(requests)
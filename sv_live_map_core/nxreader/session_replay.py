@@ -0,0 +1,101 @@
+"""Record sys-botbase sessions and replay them offline"""
+
+import gzip
+import struct
+import time
+from enum import IntEnum
+
+MAGIC = b"NXRS\x01"
+# kind, microseconds since the previous event, payload length
+EVENT_HEADER = struct.Struct("<BII")
+
+
+class SessionEvent(IntEnum):
+    """Kinds of recorded session events"""
+
+    COMMAND = 0
+    RESPONSE = 1
+    FRAMING_ERROR = 2
+
+
+class ReplayError(Exception):
+    """Error to be raised when a replayed session diverges from its recording"""
+
+
+class SessionRecorder:
+    """Records the commands, responses and timing of a session to a gzip file"""
+
+    def __init__(self, path: str) -> None:
+        self.file = gzip.open(path, "wb")
+        self.file.write(MAGIC)
+        self.last_time = time.perf_counter()
+
+    def record(self, kind: SessionEvent, payload: bytes = b"") -> None:
+        """Record a single event"""
+        now = time.perf_counter()
+        self.file.write(
+            EVENT_HEADER.pack(kind, round((now - self.last_time) * 1e6), len(payload))
+        )
+        self.file.write(payload)
+        self.last_time = now
+
+    def close(self) -> None:
+        """Flush and close the recording"""
+        self.file.close()
+
+
+class SessionReplay:
+    """Plays back a recorded session in place of a switch connection
+
+    Commands must match the recording, when realtime the recorded delay
+    before each response is reproduced"""
+
+    def __init__(self, path: str, realtime: bool = False) -> None:
+        self.realtime = realtime
+        with gzip.open(path, "rb") as file:
+            data = file.read()
+        if not data.startswith(MAGIC):
+            raise ReplayError(f"{path} is not a recorded session")
+        self.events: list[tuple[SessionEvent, float, bytes]] = []
+        ofs = len(MAGIC)
+        while ofs < len(data):
+            kind, delay, size = EVENT_HEADER.unpack_from(data, ofs)
+            ofs += EVENT_HEADER.size
+            self.events.append(
+                (SessionEvent(kind), delay / 1e6, data[ofs : ofs + size])
+            )
+            ofs += size
+        self.position = 0
+
+    @property
+    def finished(self) -> bool:
+        """Whether or not every recorded event was replayed"""
+        return self.position == len(self.events)
+
+    def _next_event(self) -> tuple[SessionEvent, float, bytes]:
+        if self.finished:
+            raise ReplayError("Replay went past the end of the recording")
+        event = self.events[self.position]
+        self.position += 1
+        return event
+
+    def send_command(self, content: str) -> None:
+        """Check that content is the next recorded command"""
+        kind, _, payload = self._next_event()
+        if kind != SessionEvent.COMMAND or payload.decode() != content:
+            raise ReplayError(
+                f"Sent {content!r} but recording has {kind.name} {payload!r}"
+            )
+
+    def recv(self, size: int = None) -> bytes | None:
+        """Return the next recorded response, None for a recorded framing error"""
+        kind, delay, payload = self._next_event()
+        if self.realtime:
+            time.sleep(delay)
+        if kind == SessionEvent.FRAMING_ERROR:
+            return None
+        if kind != SessionEvent.RESPONSE or (size is not None and len(payload) != size):
+            raise ReplayError(
+                f"Expected a response of {size=} but recording has {kind.name} {payload!r}"
+            )
+        return payload
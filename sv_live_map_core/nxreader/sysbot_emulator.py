@@ -0,0 +1,440 @@
+"""Local stand-in for sys-botbase backed by an emulated memory image"""
+
+import argparse
+import array
+import random
+import socketserver
+import struct
+import threading
+import time
+import usb.core
+from ..save.raid_block import RAID_COUNT
+from ..save.save_file_9 import MappedSaveFile9, SaveFile9
+from ..util.raid_analyzer import read_cached_tables
+from ..util.path_handler import get_path
+from .nxreader import NXReader
+from .raid_reader import RaidReader
+
+
+class EmulatedMemory:
+    """Sparse switch memory with main, heap and absolute address spaces"""
+
+    PAGE_SIZE = 0x1000
+    # space reserved for each node allocated while building pointer chains
+    NODE_SIZE = 0x100000
+
+    def __init__(
+        self,
+        main_base: int = 0x8000000000,
+        heap_base: int = 0x4000000000,
+        allocation_base: int = 0x2000000000,
+    ) -> None:
+        self.main_base = main_base
+        self.heap_base = heap_base
+        self._next_allocation = allocation_base
+        self.pages: dict[int, bytearray] = {}
+
+    def read(self, address: int, size: int) -> bytes:
+        """Read bytes at an absolute address, unmapped memory reads as 0"""
+        data = bytearray(size)
+        i = 0
+        while i < size:
+            page, ofs = divmod(address + i, self.PAGE_SIZE)
+            length = min(size - i, self.PAGE_SIZE - ofs)
+            if page in self.pages:
+                data[i : i + length] = self.pages[page][ofs : ofs + length]
+            i += length
+        return bytes(data)
+
+    def write(self, address: int, data: bytes) -> None:
+        """Write bytes at an absolute address"""
+        i = 0
+        while i < len(data):
+            page, ofs = divmod(address + i, self.PAGE_SIZE)
+            length = min(len(data) - i, self.PAGE_SIZE - ofs)
+            self.pages.setdefault(page, bytearray(self.PAGE_SIZE))[
+                ofs : ofs + length
+            ] = data[i : i + length]
+            i += length
+
+    def read_u64(self, address: int) -> int:
+        """Read a pointer at an absolute address"""
+        return int.from_bytes(self.read(address, 8), "little")
+
+    def write_u64(self, address: int, value: int) -> None:
+        """Write a pointer at an absolute address"""
+        self.write(address, value.to_bytes(8, "little"))
+
+    def allocate(self, size: int) -> int:
+        """Reserve size bytes of unused absolute memory"""
+        address = self._next_allocation
+        self._next_allocation += -(-size // self.NODE_SIZE) * self.NODE_SIZE
+        return address
+
+    def solve(self, jumps: tuple[int]) -> int:
+        """Follow jumps like sys-botbase, every jump but the last is dereferenced"""
+        address = self.main_base + jumps[0]
+        for jump in jumps[1:]:
+            address = self.read_u64(address) + jump
+        return address
+
+    def build_pointer(self, pointer: str) -> int:
+        """Allocate the missing links of pointer and return its target address"""
+        chain, offset = NXReader.parse_pointer(pointer)
+        jumps = (*chain, offset)
+        address = self.main_base + jumps[0]
+        for jump in jumps[1:]:
+            if (node := self.read_u64(address)) == 0:
+                node = self.allocate(self.NODE_SIZE)
+                self.write_u64(address, node)
+            address = node + jump
+        return address
+
+
+def build_memory_image(
+    save_file: SaveFile9,
+    raid_enemy_table_binaries: tuple[bytes, 6],
+    raid_item_table_binaries: tuple[bytes, 2],
+) -> EmulatedMemory:
+    """Lay out a save and cached raid binaries where RaidReader expects them"""
+    memory = EmulatedMemory()
+    # save blocks are stored as key followed by a pointer to the encrypted block
+    save_block_base = memory.build_pointer(RaidReader.SAVE_BLOCK_PTR)
+    for ofs, key in (
+        *RaidReader.DIFFICULTY_FLAG_LOCATIONS,
+        RaidReader.MY_STATUS_LOCATION,
+        RaidReader.BCAT_RAID_BINARY_LOCATION,
+        RaidReader.BCAT_RAID_PRIORITY_LOCATION,
+        RaidReader.BCAT_RAID_FIXED_REWARD_LOCATION,
+        RaidReader.BCAT_RAID_LOTTERY_REWARD_LOCATION,
+        RaidReader.TRAINER_ICON_WIDTH_LOCATION,
+        RaidReader.TRAINER_ICON_HEIGHT_LOCATION,
+        RaidReader.TRAINER_ICON_LOCATION,
+    ):
+        if (entry := save_file.block_directory.get(key)) is None:
+            continue
+        block_address = memory.allocate(1 + entry.size)
+        memory.write(block_address, save_file.read_range(entry.offset, 1 + entry.size))
+        memory.write(save_block_base + ofs, key.to_bytes(4, "little"))
+        memory.write_u64(save_block_base + ofs + 8, block_address)
+    # game id is stored offset by 49
+    memory.write(
+        memory.main_base + RaidReader.GAME_ID_OFS,
+        save_file.read_block(RaidReader.MY_STATUS_LOCATION[1])[4:5],
+    )
+    memory.write(
+        memory.build_pointer(RaidReader.RAID_BLOCK_PTR[0]),
+        save_file.read_block(SaveFile9.RAID_BLOCK_LOCATION),
+    )
+    for level, binary in enumerate(raid_enemy_table_binaries):
+        binary_address = memory.allocate(len(binary))
+        memory.write(binary_address, binary)
+        memory.write_u64(
+            memory.build_pointer(RaidReader.RAID_BINARY_PTR.format((level + 1) * 0xB0)),
+            binary_address + RaidReader.RAID_BINARY_OFS[level],
+        )
+    fixed_item_binary, lottery_item_binary = raid_item_table_binaries
+    memory.write(
+        memory.build_pointer(RaidReader.RAID_FIXED_ITEM_PTR[0]), fixed_item_binary
+    )
+    lottery_address = memory.allocate(len(lottery_item_binary))
+    memory.write(lottery_address, lottery_item_binary)
+    memory.write_u64(
+        memory.build_pointer(RaidReader.RAID_LOTTERY_ITEM_PTR[0]), lottery_address + 0xC
+    )
+    return memory
+
+
+class SysBotEmulator:
+    """Executes sys-botbase commands against an EmulatedMemory
+
+    latency is added to every command, bandwidth (bytes per second) limits
+    responses and fault_rate is the chance of a response getting one of
+    faults ("corrupt", "truncate" or "stale"), up to max_faults times, over
+    sockets.
+    Without multi_peek the multi peek commands are unsupported like on older
+    builds"""
+
+    FAULTS = ("corrupt", "truncate", "stale")
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        memory: EmulatedMemory,
+        latency: float = 0,
+        bandwidth: float = None,
+        fault_rate: float = 0,
+        seed: int = None,
+        advance_date: bool = False,
+        input_time_scale: float = 0,
+        faults: tuple[str] = FAULTS,
+        max_faults: int = None,
+        multi_peek: bool = True,
+    ) -> None:
+        self.memory = memory
+        self.multi_peek = multi_peek
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.fault_rate = fault_rate
+        self.faults = faults
+        self.max_faults = max_faults
+        self.fault_count = 0
+        self.rand = random.Random(seed)
+        # reseed raids after every clickSeq to stand in for date skips
+        self.advance_date = advance_date
+        # fraction of clickSeq/touchHold durations to actually wait
+        self.input_time_scale = input_time_scale
+        self.commands: list[str] = []
+        self._last_response = b""
+        self._lock = threading.Lock()
+
+    def reseed_raids(self) -> None:
+        """Give every raid in the raid block a new seed"""
+        raid_block = self.memory.build_pointer(RaidReader.RAID_BLOCK_PTR[0])
+        self.memory.write(raid_block, self.rand.randbytes(16))
+        for i in range(RAID_COUNT):
+            self.memory.write(
+                raid_block + 0x10 + i * 0x20 + 0x10, self.rand.randbytes(4)
+            )
+
+    def execute(self, command: str, usb: bool = False) -> bytes | None:
+        """Execute a command, returning its response as sent on the wire
+
+        Socket responses are hex lines, usb responses are raw bytes"""
+        with self._lock:
+            self.commands.append(command)
+            name, *args = command.split()
+            response = self._execute(name, args, usb)
+            # usb transfers are framed by their size header so faults are
+            # only injected into the socket stream
+            if (
+                response is not None
+                and not usb
+                and self.fault_rate
+                and (self.max_faults is None or self.fault_count < self.max_faults)
+                and self.rand.random() < self.fault_rate
+            ):
+                self.fault_count += 1
+                response = self._inject_fault(response)
+            if response is not None:
+                self._last_response = response
+        time.sleep(self.latency)
+        if response is None:
+            return None
+        if self.bandwidth:
+            time.sleep(len(response) / self.bandwidth)
+        return response
+
+    def _inject_fault(self, response: bytes) -> bytes:
+        """Corrupt, truncate or prepend a stale response"""
+        match self.rand.choice(self.faults):
+            case "corrupt":
+                index = self.rand.randrange(len(response))
+                return response[:index] + b"Z" + response[index + 1 :]
+            case "truncate":
+                return response[: self.rand.randrange(len(response))]
+            case _:
+                return self._last_response + response
+
+    def _execute(self, name: str, args: list[str], usb: bool) -> bytes | None:
+        """Execute a single parsed command"""
+        values = [
+            int(arg, 16) if arg.startswith("0x") and len(arg) > 2 else 0 for arg in args
+        ]
+        match name:
+            case "peek":
+                return self._respond(
+                    self.memory.read(self.memory.heap_base + values[0], values[1]), usb
+                )
+            case "peekAbsolute":
+                return self._respond(self.memory.read(values[0], values[1]), usb)
+            case "peekMain":
+                return self._respond(
+                    self.memory.read(self.memory.main_base + values[0], values[1]), usb
+                )
+            case "peekMulti" | "peekAbsoluteMulti" | "peekMainMulti" if (
+                self.multi_peek
+            ):
+                base = {
+                    "peekMulti": self.memory.heap_base,
+                    "peekAbsoluteMulti": 0,
+                    "peekMainMulti": self.memory.main_base,
+                }[name]
+                return self._respond(
+                    b"".join(
+                        self.memory.read(base + address, size)
+                        for address, size in zip(values[::2], values[1::2])
+                    ),
+                    usb,
+                )
+            case "pointerPeek":
+                return self._respond(
+                    self.memory.read(self.memory.solve(values[1:]), values[0]), usb
+                )
+            case "pointerAll":
+                address = self.memory.solve(values)
+                if usb:
+                    return address.to_bytes(8, "little")
+                return self._respond(address.to_bytes(8, "big"), usb)
+            case "poke":
+                self.memory.write(
+                    self.memory.heap_base + values[0], bytes.fromhex(args[1][2:])
+                )
+            case "pokeAbsolute":
+                self.memory.write(values[0], bytes.fromhex(args[1][2:]))
+            case "pokeMain":
+                self.memory.write(
+                    self.memory.main_base + values[0], bytes.fromhex(args[1][2:])
+                )
+            case "pointerPoke":
+                self.memory.write(
+                    self.memory.solve(values[1:]), bytes.fromhex(args[0][2:])
+                )
+            case "clickSeq":
+                time.sleep(
+                    sum(
+                        int(action[1:])
+                        for action in args[0].split(",")
+                        if action.startswith("W")
+                    )
+                    / 1000
+                    * self.input_time_scale
+                )
+                if self.advance_date:
+                    self.reseed_raids()
+                return b"done\n"
+            case "touchHold":
+                time.sleep(int(args[2]) / 1000 * self.input_time_scale)
+            case "configure" | "detachController" | "click" | "press" | "release" | "setStick":
+                pass
+            case _:
+                print(f"WARNING: unsupported command {name}")
+        return None
+
+    @staticmethod
+    def _respond(data: bytes, usb: bool) -> bytes:
+        """Frame a read response"""
+        if usb:
+            return data
+        return data.hex().upper().encode() + b"\n"
+
+
+class _SysBotHandler(socketserver.StreamRequestHandler):
+    """Serves sys-botbase commands over tcp"""
+
+    def handle(self) -> None:
+        while line := self.rfile.readline():
+            if not (command := line.decode().strip()):
+                continue
+            if (response := self.server.emulator.execute(command)) is not None:
+                self.wfile.write(response)
+
+
+class SysBotServer(socketserver.ThreadingTCPServer):
+    """TCP server for a SysBotEmulator"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(
+        self, emulator: SysBotEmulator, host: str = "127.0.0.1", port: int = 6000
+    ):
+        self.emulator = emulator
+        super().__init__((host, port), _SysBotHandler)
+
+    @property
+    def port(self) -> int:
+        """Port the server is bound to"""
+        return self.server_address[1]
+
+    def start(self) -> threading.Thread:
+        """Serve from a background thread"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+class EmulatedUSBOut:
+    """Out endpoint of an emulated usb connection"""
+
+    def __init__(self, emulator: SysBotEmulator, usb_in: "EmulatedUSBIn") -> None:
+        self.emulator = emulator
+        self.usb_in = usb_in
+        self._expected_size = None
+
+    def write(self, data: str | bytes, timeout: int = None) -> int:
+        """Receive a command size header or the command itself"""
+        # pylint: disable=unused-argument
+        if self._expected_size is None:
+            self._expected_size = struct.unpack("<I", data)[0]
+            return len(data)
+        self._expected_size = None
+        command = data if isinstance(data, str) else data.decode()
+        if (response := self.emulator.execute(command.strip(), usb=True)) is not None:
+            self.usb_in.data += struct.pack("<I", len(response)) + response
+        return len(data)
+
+
+class EmulatedUSBIn:
+    """In endpoint of an emulated usb connection"""
+
+    def __init__(self) -> None:
+        self.data = bytearray()
+
+    def read(self, size_or_buffer: int | array.array, timeout: int = None):
+        """Read like pyusb, into a given array or as a new array"""
+        # pylint: disable=unused-argument
+        # responses are queued as soon as commands are written
+        if not self.data:
+            raise usb.core.USBTimeoutError("Operation timed out", None, None)
+        if isinstance(size_or_buffer, int):
+            data = array.array("B", self.data[:size_or_buffer])
+            del self.data[:size_or_buffer]
+            return data
+        size = min(len(size_or_buffer), len(self.data))
+        size_or_buffer[:size] = array.array("B", self.data[:size])
+        del self.data[:size]
+        return size
+
+
+def emulated_usb_endpoints(
+    emulator: SysBotEmulator,
+) -> tuple[EmulatedUSBOut, EmulatedUSBIn]:
+    """(out, in) endpoints to pass to NXReader as usb_endpoints"""
+    usb_in = EmulatedUSBIn()
+    return EmulatedUSBOut(emulator, usb_in), usb_in
+
+
+def main(argv: list[str] = None) -> None:
+    """Command line entry point of the emulator"""
+    parser = argparse.ArgumentParser(description="Serve an emulated sys-botbase")
+    parser.add_argument("save")
+    parser.add_argument("--cached-tables", default=get_path("./cached_tables/"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6000)
+    parser.add_argument("--latency", type=float, default=0, help="seconds per command")
+    parser.add_argument("--bandwidth", type=float, help="bytes per second")
+    parser.add_argument("--fault-rate", type=float, default=0)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--advance-date", action="store_true")
+    parser.add_argument("--input-time-scale", type=float, default=0)
+    parser.add_argument(
+        "--no-multi-peek", action="store_true", help="emulate an older sys-botbase"
+    )
+    args = parser.parse_args(argv)
+
+    with MappedSaveFile9(args.save) as save_file:
+        memory = build_memory_image(save_file, *read_cached_tables(args.cached_tables))
+    emulator = SysBotEmulator(
+        memory,
+        args.latency,
+        args.bandwidth,
+        args.fault_rate,
+        args.seed,
+        args.advance_date,
+        args.input_time_scale,
+        multi_peek=not args.no_multi_peek,
+    )
+    with SysBotServer(emulator, args.host, args.port) as server:
+        print(f"Serving on {args.host}:{server.port}")
+        server.serve_forever()
@@ -1,4 +1,4 @@
 """Pseudorandom number generators used in game"""
 
-from .xorshift import SCXorshift32
-from .xoroshiro import Xoroshiro128Plus
+from .xorshift import SCXorshift32, decrypt_into
+from .xoroshiro import Xoroshiro128Plus, Xoroshiro128PlusBatch
@@ -6,56 +6,136 @@ import numpy as np
 class Xoroshiro128Plus:
     """Xoroshiro128+ Implementation"""
 
-    _XORO_CONST: np.uint64 = np.uint64(0x82A2B175229D6A5B)
-    _ULONG_SIZE: np.uint64 = np.uint64(64)
-    _ROT_24: np.uint64 = np.uint64(24)
-    _ROT_37: np.uint64 = np.uint64(37)
-    _SHIFT_16: np.uint64 = np.uint64(16)
-    _ONE: np.uint64 = np.uint64(1)
-    _ZERO: np.uint64 = np.uint64(0)
+    _XORO_CONST: int = 0x82A2B175229D6A5B
+    _ULONG_MASK: int = 0xFFFFFFFFFFFFFFFF
+    # precomputed masks for the fixed ranges used by raid generation
+    _MASKS: dict[int, int] = {
+        2: 0x1,
+        3: 0x3,
+        6: 0x7,
+        18: 0x1F,
+        25: 0x1F,
+        32: 0x1F,
+        100: 0x7F,
+        0x80: 0x7F,
+        0x81: 0xFF,
+        0xFFFFFFFF: 0xFFFFFFFF,
+    }
 
-    def __init__(self, seed0: np.uint64, seed1: np.uint64 = _XORO_CONST) -> None:
-        # disable integer overflow warnings
-        np.seterr(over="ignore")
-        # ensure integer inputs are casted to numpy ints
-        self.seed0: np.uint64 = np.uint64(seed0)
-        self.seed1: np.uint64 = np.uint64(seed1)
+    def __init__(self, seed0: int, seed1: int = _XORO_CONST) -> None:
+        # masked python ints are faster than numpy scalars for single seeds
+        self.seed0: int = int(seed0) & self._ULONG_MASK
+        self.seed1: int = int(seed1) & self._ULONG_MASK
 
-    @staticmethod
-    def _rotl(num: np.uint64, k: np.uint64) -> np.uint64:
-        """Rotate num left by k"""
-        return (num << k) | (num >> (Xoroshiro128Plus._ULONG_SIZE - k))
-
-    def next(self) -> np.uint64:
+    def next(self) -> int:
         """Generate next pseudorandom number"""
-        rand = self.seed0 + self.seed1
-        self.seed1 ^= self.seed0
+        # rotations are inlined to avoid method call overhead
+        seed0, seed1 = self.seed0, self.seed1
+        rand = (seed0 + seed1) & self._ULONG_MASK
+        seed1 ^= seed0
         self.seed0 = (
-            self._rotl(self.seed0, self._ROT_24)
-            ^ self.seed1
-            ^ (self.seed1 << self._SHIFT_16)
-        )
-        self.seed1 = self._rotl(self.seed1, self._ROT_37)
-        # integer overflow
+            ((seed0 << 24) | (seed0 >> 40)) ^ seed1 ^ (seed1 << 16)
+        ) & self._ULONG_MASK
+        self.seed1 = ((seed1 << 37) | (seed1 >> 27)) & self._ULONG_MASK
         return rand
 
     @staticmethod
-    def get_mask(maximum: np.uint64) -> np.uint64:
+    def get_mask(maximum: int) -> int:
         """Generate a bitmask for rand generation"""
-        mask = maximum - Xoroshiro128Plus._ONE
-        for i in range(6):
-            mask |= mask >> (Xoroshiro128Plus._ONE << np.uint64(i))
-        return mask
+        return (1 << (int(maximum) - 1).bit_length()) - 1
 
-    def rand(self, maximum: np.uint64 = 0xFFFFFFFF) -> int:
+    def rand(self, maximum: int = 0xFFFFFFFF) -> int:
         """Generate a pseudorandom number in range [0, maximum)"""
-        assert maximum != self._ZERO
-        # ensure integer inputs are casted to numpy ints
-        maximum = np.uint64(maximum)
-        mask = self.get_mask(maximum)
+        assert maximum != 0
+        mask = self._MASKS.get(maximum)
+        if mask is None:
+            mask = self.get_mask(maximum)
         # ensure loop is at least run once
         # sourcery skip: use-assigned-variable
         result = maximum
         while result >= maximum:
             result = self.next() & mask
-        return int(result)
+        return result
+
+
+class Xoroshiro128PlusBatch:
+    """Xoroshiro128+ Implementation that advances many seeds in lockstep"""
+
+    _XORO_CONST: np.uint64 = np.uint64(0x82A2B175229D6A5B)
+    _ULONG_SIZE: np.uint64 = np.uint64(64)
+    _ROT_24: np.uint64 = np.uint64(24)
+    _ROT_37: np.uint64 = np.uint64(37)
+    _SHIFT_16: np.uint64 = np.uint64(16)
+
+    def __init__(self, seeds0: np.ndarray, seeds1: np.ndarray = _XORO_CONST) -> None:
+        # copy so that advancing never touches the caller's arrays
+        self.seed0: np.ndarray = np.array(seeds0, dtype=np.uint64, ndmin=1)
+        self.seed1: np.ndarray = np.broadcast_to(
+            np.asarray(seeds1, dtype=np.uint64), self.seed0.shape
+        ).copy()
+
+    def __len__(self) -> int:
+        return len(self.seed0)
+
+    @staticmethod
+    def _rotl(num: np.ndarray, k: np.uint64) -> np.ndarray:
+        """Rotate each lane of num left by k"""
+        return (num << k) | (num >> (Xoroshiro128PlusBatch._ULONG_SIZE - k))
+
+    @staticmethod
+    def _advance(
+        seed0: np.ndarray, seed1: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Advance state arrays, returning (rand, seed0, seed1)"""
+        rand = seed0 + seed1
+        seed1 = seed1 ^ seed0
+        seed0 = (
+            Xoroshiro128PlusBatch._rotl(seed0, Xoroshiro128PlusBatch._ROT_24)
+            ^ seed1
+            ^ (seed1 << Xoroshiro128PlusBatch._SHIFT_16)
+        )
+        seed1 = Xoroshiro128PlusBatch._rotl(seed1, Xoroshiro128PlusBatch._ROT_37)
+        return rand, seed0, seed1
+
+    def next(self, lanes: np.ndarray = None) -> np.ndarray:
+        """Generate next pseudorandom number for every lane
+        (or only the lanes indexed by lanes)"""
+        if lanes is None:
+            rand, self.seed0, self.seed1 = self._advance(self.seed0, self.seed1)
+            return rand
+        rand, self.seed0[lanes], self.seed1[lanes] = self._advance(
+            self.seed0[lanes], self.seed1[lanes]
+        )
+        return rand
+
+    def rand(
+        self, maximum: int | np.ndarray = 0xFFFFFFFF, active: np.ndarray = None
+    ) -> np.ndarray:
+        """Generate a pseudorandom number in range [0, maximum) for each lane
+
+        maximum can be shared or per-lane, lanes outside of the boolean
+        active mask are not advanced and their result is left as 0"""
+        maximum = np.broadcast_to(np.asarray(maximum, dtype=np.uint64), (len(self),))
+        assert (maximum != 0).all()
+        mask = self.get_mask(maximum)
+        result = np.zeros(len(self), dtype=np.uint64)
+        if active is None:
+            # first attempt can skip indexing entirely
+            result = self.next() & mask
+            pending = np.flatnonzero(result >= maximum)
+        else:
+            pending = np.flatnonzero(active)
+        # per-lane retry of rejected results
+        while len(pending):
+            attempt = self.next(pending) & mask[pending]
+            result[pending] = attempt
+            pending = pending[attempt >= maximum[pending]]
+        return result
+
+    @staticmethod
+    def get_mask(maximum: np.ndarray) -> np.ndarray:
+        """Generate a bitmask for rand generation for each lane"""
+        mask = np.asarray(maximum, dtype=np.uint64) - np.uint64(1)
+        for i in range(6):
+            mask |= mask >> np.uint64(1 << i)
+        return mask
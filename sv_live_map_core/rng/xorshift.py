@@ -1,34 +1,32 @@
 """Xorshift32 Implementation for saveblock decryption"""
 
+import struct
 import numpy as np
 
 
 class SCXorshift32:
     """Xorshift32 Implementation for saveblock decryption"""
 
-    _SHIFT2: np.uint32 = np.uint32(2)
-    _SHIFT15: np.uint32 = np.uint32(15)
-    _SHIFT13: np.uint32 = np.uint32(13)
-    _SHIFT8: np.uint32 = np.uint32(8)
-    _SHIFT16: np.uint32 = np.uint32(16)
-    _SHIFT24: np.uint32 = np.uint32(24)
+    _UINT_MASK: int = 0xFFFFFFFF
 
-    def __init__(self, key: np.uint32) -> None:
-        # ensure integer inputs are casted to numpy ints
-        self.seed: np.uint32 = np.uint32(key)
+    def __init__(self, key: int) -> None:
+        # masked python ints are faster than numpy scalars for single seeds
+        self.seed: int = int(key) & self._UINT_MASK
         for _ in range(self.pop_count(self.seed)):
             self.advance()
-        self.counter: np.uint32 = 0
+        self.counter: int = 0
 
     def advance(self) -> None:
         """Advance RNG"""
-        self.seed ^= self.seed << self._SHIFT2
-        self.seed ^= self.seed >> self._SHIFT15
-        self.seed ^= self.seed << self._SHIFT13
+        seed = self.seed
+        seed ^= (seed << 2) & self._UINT_MASK
+        seed ^= seed >> 15
+        seed ^= (seed << 13) & self._UINT_MASK
+        self.seed = seed
 
-    def next(self) -> np.uint32:
+    def next(self) -> int:
         """Generate next pseudorandom byte"""
-        result: np.uint32 = (self.seed >> (self.counter << 3)) & 0xFF
+        result: int = (self.seed >> (self.counter << 3)) & 0xFF
         if self.counter == 3:
             self.advance()
             self.counter = 0
@@ -36,21 +34,43 @@ class SCXorshift32:
             self.counter += 1
         return result
 
-    def next_32(self) -> np.uint32:
+    def next_32(self) -> int:
         """Generate next pseudorandom uint"""
         return (
-            self.next()
-            | (self.next() << self._SHIFT8)
-            | (self.next() << self._SHIFT16)
-            | (self.next() << self._SHIFT24)
+            self.next() | (self.next() << 8) | (self.next() << 16) | (self.next() << 24)
+        )
+
+    def keystream(self, size: int) -> bytes:
+        """Generate the next size pseudorandom bytes at once"""
+        head = bytearray()
+        # finish the bytes left in the current state
+        while self.counter != 0 and len(head) < size:
+            head.append(self.next())
+        word_count, tail_size = divmod(size - len(head), 4)
+        words = [0] * word_count
+        seed = self.seed
+        for i in range(word_count):
+            words[i] = seed
+            seed ^= (seed << 2) & self._UINT_MASK
+            seed ^= seed >> 15
+            seed ^= (seed << 13) & self._UINT_MASK
+        self.seed = seed
+        tail = bytes(self.next() for _ in range(tail_size))
+        return bytes(head) + struct.pack(f"<{word_count}I", *words) + tail
+
+    def xor_into(self, buffer: bytearray | memoryview) -> None:
+        """XOR buffer in place with the next len(buffer) pseudorandom bytes"""
+        data = np.frombuffer(buffer, dtype=np.uint8)
+        np.bitwise_xor(
+            data, np.frombuffer(self.keystream(len(data)), dtype=np.uint8), out=data
         )
 
     @staticmethod
-    def pop_count(val: np.uint32) -> np.uint32:
+    def pop_count(val: int) -> int:
         """Count of bits set in value"""
-        val -= (val >> 1) & 0x55555555
-        val = (val & 0x33333333) + ((val >> 2) & 0x33333333)
-        val = (val + (val >> 4)) & 0x0F0F0F0F
-        val += val >> SCXorshift32._SHIFT8
-        val += val >> SCXorshift32._SHIFT16
-        return val & 0x3F
+        return (int(val) & SCXorshift32._UINT_MASK).bit_count()
+
+
+def decrypt_into(buffer: bytearray | memoryview, key: int) -> None:
+    """Decrypt a whole save block encrypted with key in place"""
+    SCXorshift32(key).xor_into(buffer)
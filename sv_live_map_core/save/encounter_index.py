@@ -0,0 +1,94 @@
+"""Precomputed encounter slots per (difficulty, progress, game, delivery group)"""
+
+from bisect import bisect_right
+from dataclasses import dataclass
+from itertools import accumulate
+from typing import Self
+from ..enums import StoryProgress, StarLevel, Game
+from ..fbs.raid_enemy_table_array import RaidEnemyTableArray, RaidEnemyTable
+
+
+def is_valid_table(
+    table: RaidEnemyTable,
+    story_progress: StoryProgress,
+    game: Game,
+    delivery_group_id: int = None,
+    is_event: bool = False,
+) -> bool:
+    """Check if a RaidEnemyTable is possible to be selected"""
+    if is_event and (
+        table.raid_enemy_info.delivery_group_id != delivery_group_id
+        or (
+            table.raid_enemy_info.difficulty is not None
+            and not table.raid_enemy_info.difficulty.is_unlocked(story_progress)
+        )
+    ):
+        return False
+    return table.raid_enemy_info.rom_ver in (None, game, Game.BOTH)
+
+
+@dataclass
+class EncounterSlots:
+    """Filtered encounter slots along with their cumulative rates"""
+
+    tables: list[RaidEnemyTable]
+    cumulative_rates: list[int]
+
+    @property
+    def total(self) -> int:
+        """Sum of the rates of all slots"""
+        return self.cumulative_rates[-1] if self.cumulative_rates else 0
+
+    def select(self, encounter_slot_rand: int) -> RaidEnemyTable:
+        """Select the slot that encounter_slot_rand lands on"""
+        return self.tables[bisect_right(self.cumulative_rates, encounter_slot_rand)]
+
+
+class EncounterIndex:
+    """Precomputed encounter slots per (difficulty, progress, game, delivery group)
+
+    Built once when the raid tables are loaded, each key is only filtered
+    the first time it is requested"""
+
+    def __init__(self, raid_enemy_table_arrays: tuple[RaidEnemyTableArray, 7]) -> None:
+        self.raid_enemy_table_arrays = raid_enemy_table_arrays
+        self._slots: dict[
+            tuple[StarLevel, StoryProgress, Game, int], EncounterSlots
+        ] = {}
+
+    @classmethod
+    def from_table(
+        cls, difficulty: StarLevel, raid_enemy_table_array: RaidEnemyTableArray
+    ) -> Self:
+        """Index of the single table used for raids of difficulty"""
+        raid_enemy_table_arrays = [None] * 7
+        raid_enemy_table_arrays[difficulty] = raid_enemy_table_array
+        return cls(tuple(raid_enemy_table_arrays))
+
+    def get(
+        self,
+        difficulty: StarLevel,
+        story_progress: StoryProgress,
+        game: Game,
+        delivery_group_id: int = None,
+    ) -> EncounterSlots:
+        """Get the possible encounter slots for a raid"""
+        is_event = difficulty == StarLevel.EVENT
+        # delivery group only matters for events
+        if not is_event:
+            delivery_group_id = None
+        key = (difficulty, story_progress, game, delivery_group_id)
+        if (encounter_slots := self._slots.get(key)) is None:
+            tables = [
+                table
+                for table in self.raid_enemy_table_arrays[difficulty].raid_enemy_tables
+                if is_valid_table(
+                    table, story_progress, game, delivery_group_id, is_event
+                )
+            ]
+            encounter_slots = EncounterSlots(
+                tables,
+                list(accumulate(table.raid_enemy_info.rate for table in tables)),
+            )
+            self._slots[key] = encounter_slots
+        return encounter_slots
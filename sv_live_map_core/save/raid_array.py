@@ -0,0 +1,357 @@
+"""Vectorized TeraRaid generation over arrays of seeds"""
+
+import numpy as np
+from ..rng import Xoroshiro128PlusBatch
+from ..enums import (
+    Game,
+    StoryProgress,
+    StarLevel,
+    Species,
+    TeraTypeGeneration,
+    AbilityGeneration,
+    NatureGeneration,
+    IVGeneration,
+    GenderGeneration,
+    ShinyGeneration,
+    Gender,
+    Nature,
+)
+from ..fbs.raid_enemy_table_array import RaidEnemyInfo
+from ..util.personal_data_handler import PersonalDataHandler
+from .encounter_index import EncounterIndex
+from .my_status_9 import MyStatus9
+from .raid_block import (
+    TOXTRICITY_AMPED_NATURES,
+    TOXTRICITY_LOWKEY_NATURES,
+    RaidBlock,
+    calc_difficulty,
+)
+
+# one row per raid, mirrors the derived attributes of TeraRaid
+RAID_DTYPE = np.dtype(
+    [
+        ("seed", np.uint32),
+        ("species", np.uint16),
+        ("form", np.uint8),
+        ("tera_type", np.uint8),
+        ("difficulty", np.int8),
+        ("encryption_constant", np.uint32),
+        ("pid", np.uint32),
+        ("is_shiny", np.bool_),
+        ("ivs", np.uint8, (6,)),
+        ("ability_index", np.uint8),
+        ("ability", np.uint16),
+        ("gender", np.uint8),
+        ("nature", np.uint8),
+        ("height", np.uint8),
+        ("weight", np.uint8),
+        ("scale", np.uint8),
+    ]
+)
+
+
+def shiny_xor_array(pid: np.ndarray, sidtid: np.ndarray | int) -> np.ndarray:
+    """Get shiny XOR for each lane"""
+    temp = pid ^ np.uint64(sidtid)
+    return (temp & np.uint64(0xFFFF)) ^ (temp >> np.uint64(16))
+
+
+def is_shiny_array(pid: np.ndarray, sidtid: np.ndarray | int) -> np.ndarray:
+    """Check which pids are shiny"""
+    return shiny_xor_array(pid, sidtid) < np.uint64(0x10)
+
+
+def force_shininess_array(
+    lock_type: ShinyGeneration,
+    fake_pid: np.ndarray,
+    fake_sidtid: np.ndarray,
+    sidtid: int,
+) -> np.ndarray:
+    """Force pids to be shiny/non shiny if applicable"""
+    match lock_type:
+        case None | ShinyGeneration.RANDOM_SHININESS:
+            should_be_shiny = is_shiny_array(fake_pid, fake_sidtid)
+        case ShinyGeneration.FORCED_SHINY:
+            should_be_shiny = np.ones(len(fake_pid), dtype=np.bool_)
+        case _:
+            should_be_shiny = np.zeros(len(fake_pid), dtype=np.bool_)
+    already_shiny = is_shiny_array(fake_pid, sidtid)
+    low = fake_pid & np.uint64(0xFFFF)
+    forced_shiny = (
+        (
+            np.uint64((sidtid & 0xFFFF) ^ (sidtid >> 16))
+            ^ low
+            ^ (shiny_xor_array(fake_pid, fake_sidtid) != 0).astype(np.uint64)
+        )
+        << np.uint64(16)
+    ) | low
+    return np.where(
+        should_be_shiny,
+        np.where(already_shiny, fake_pid, forced_shiny),
+        np.where(already_shiny, fake_pid ^ np.uint64(0x10000000), fake_pid),
+    )
+
+
+def difficulty_lookup(story_progress: StoryProgress) -> np.ndarray:
+    """Build a table mapping difficulty_rand -> StarLevel"""
+    return np.array(
+        [calc_difficulty(story_progress, rand) for rand in range(100)],
+        dtype=np.int8,
+    )
+
+
+def rand_ivs_array(
+    rng: Xoroshiro128PlusBatch, raid_enemy_info: RaidEnemyInfo
+) -> np.ndarray:
+    """Generate ivs for each lane"""
+    boss_poke_para = raid_enemy_info.boss_poke_para
+    count = len(rng)
+    match boss_poke_para.talent_type:
+        case IVGeneration.RANDOM_IVS:
+            return np.stack([rng.rand(32) for _ in range(6)], axis=1)
+        case IVGeneration.SET_GUARANTEED_IVS:
+            ivs = np.full((count, 6), -1, dtype=np.int16)
+            lanes = np.arange(count)
+            for _ in range(boss_poke_para.talent_vnum or 0):
+                index = rng.rand(6).astype(np.intp)
+                # reroll only the lanes that picked an already guaranteed iv
+                taken = ivs[lanes, index] != -1
+                while taken.any():
+                    index[taken] = rng.rand(6, taken)[taken]
+                    taken = ivs[lanes, index] != -1
+                ivs[lanes, index] = 31
+            for i in range(6):
+                unset = ivs[:, i] == -1
+                ivs[unset, i] = rng.rand(32, unset)[unset]
+            return ivs
+        case IVGeneration.SET_IVS:
+            return np.tile(
+                (
+                    boss_poke_para.talent_value.hp,
+                    boss_poke_para.talent_value.atk,
+                    boss_poke_para.talent_value.def_,
+                    boss_poke_para.talent_value.spa,
+                    boss_poke_para.talent_value.spd,
+                    boss_poke_para.talent_value.spe,
+                ),
+                (count, 1),
+            )
+
+
+def rand_ability_index_array(
+    rng: Xoroshiro128PlusBatch, raid_enemy_info: RaidEnemyInfo
+) -> np.ndarray:
+    """Generate ability index for each lane"""
+    raid_fixed_ability = raid_enemy_info.boss_poke_para.tokusei
+    match raid_fixed_ability:
+        case AbilityGeneration.RANDOM_12 | None:
+            return rng.rand(2)
+        case AbilityGeneration.RANDOM_12HA:
+            return rng.rand(3)
+        case _:
+            return np.full(len(rng), raid_fixed_ability.to_ability_index())
+
+
+def rand_gender_array(
+    rng: Xoroshiro128PlusBatch, raid_enemy_info: RaidEnemyInfo
+) -> np.ndarray:
+    """Generate gender for each lane"""
+    species = raid_enemy_info.boss_poke_para.dev_id
+    form = raid_enemy_info.boss_poke_para.form_id
+    raid_fixed_gender = raid_enemy_info.boss_poke_para.sex
+    match raid_fixed_gender:
+        case None | GenderGeneration.RANDOM_GENDER:
+            species_fixed_gender = PersonalDataHandler.fixed_gender(species, form)
+            match species_fixed_gender:
+                case GenderGeneration.RANDOM_GENDER:
+                    gender_ratio = PersonalDataHandler.gender_ratio(species, form)
+                    # Gender.FEMALE == 1 when gender_rand < gender_ratio
+                    return rng.rand(100) < np.uint64(gender_ratio)
+                case _:
+                    return np.full(
+                        len(rng), Gender.from_generation(species_fixed_gender)
+                    )
+        case _:
+            return np.full(len(rng), Gender.from_generation(raid_fixed_gender))
+
+
+def rand_nature_array(
+    rng: Xoroshiro128PlusBatch, raid_enemy_info: RaidEnemyInfo
+) -> np.ndarray:
+    """Generate nature for each lane"""
+    raid_fixed_nature = raid_enemy_info.boss_poke_para.seikaku
+    match raid_fixed_nature:
+        case None | NatureGeneration.NONE:
+            if raid_enemy_info.boss_poke_para.dev_id == Species.TOXTRICITY:
+                match raid_enemy_info.boss_poke_para.form_id:
+                    case 0:  # amped
+                        return np.array(TOXTRICITY_AMPED_NATURES)[
+                            rng.rand(13).astype(np.intp)
+                        ]
+                    case 1:  # lowkey
+                        return np.array(TOXTRICITY_LOWKEY_NATURES)[
+                            rng.rand(12).astype(np.intp)
+                        ]
+            return rng.rand(25)
+        case _:
+            return np.full(len(rng), Nature.from_generation(raid_fixed_nature))
+
+
+def rand_size_array(rng: Xoroshiro128PlusBatch) -> np.ndarray:
+    """Generate size scalar for each lane, see TeraRaid.rand_size"""
+    return rng.rand(0x81) + rng.rand(0x80)
+
+
+def generate_pokemon_array(
+    seeds: np.ndarray,
+    raid_enemy_info: RaidEnemyInfo,
+    full_id: int,
+    difficulty: StarLevel = None,
+) -> np.ndarray:
+    """Derive pokemon data from seeds that all landed on the same slot,
+    equivalent to TeraRaid.generate_pokemon for each seed"""
+    seeds = np.asarray(seeds, dtype=np.uint64)
+    boss_poke_para = raid_enemy_info.boss_poke_para
+    raids = np.zeros(len(seeds), dtype=RAID_DTYPE)
+    raids["seed"] = seeds
+    # events who force their own difficulty
+    if raid_enemy_info.difficulty is not None:
+        difficulty = raid_enemy_info.difficulty
+    raids["difficulty"] = StarLevel.EVENT if difficulty is None else difficulty
+
+    # slot directly determines species + form
+    species = boss_poke_para.dev_id
+    form = boss_poke_para.form_id or 0
+    raids["species"] = species
+    raids["form"] = form
+
+    # own rng
+    match boss_poke_para.gem_type:
+        case None | TeraTypeGeneration.NONE | TeraTypeGeneration.RANDOM:
+            raids["tera_type"] = Xoroshiro128PlusBatch(seeds).rand(18)
+        case _:
+            raids["tera_type"] = boss_poke_para.gem_type - TeraTypeGeneration.NORMAL
+
+    # main rng
+    rng = Xoroshiro128PlusBatch(seeds)
+    raids["encryption_constant"] = rng.rand()
+    sidtid = rng.rand()
+    pid = force_shininess_array(boss_poke_para.rare_type, rng.rand(), sidtid, full_id)
+    raids["pid"] = pid
+    raids["is_shiny"] = is_shiny_array(pid, full_id)
+    raids["ivs"] = rand_ivs_array(rng, raid_enemy_info)
+    ability_index = rand_ability_index_array(rng, raid_enemy_info)
+    raids["ability_index"] = ability_index
+    raids["ability"] = np.array(PersonalDataHandler.abilities(species, form))[
+        ability_index.astype(np.intp)
+    ]
+    raids["gender"] = rand_gender_array(rng, raid_enemy_info)
+    raids["nature"] = rand_nature_array(rng, raid_enemy_info)
+    raids["height"] = rand_size_array(rng)
+    raids["weight"] = rand_size_array(rng)
+    raids["scale"] = rand_size_array(rng)
+    return raids
+
+
+def generate_raids(
+    seeds: np.ndarray,
+    content: np.ndarray | int,
+    encounter_index: EncounterIndex,
+    story_progress: StoryProgress,
+    game: Game,
+    full_id: int = 0,
+    delivery_group_ids: np.ndarray | int = -1,
+) -> np.ndarray:
+    """Derive raids from seeds as a RAID_DTYPE structured array,
+    equivalent to TeraRaid.initialize_data for each seed
+
+    content and delivery_group_ids can be shared or per-seed, a delivery
+    group of -1 means none. Raids without any possible slot are left zeroed"""
+    seeds = np.asarray(seeds, dtype=np.uint64)
+    count = len(seeds)
+    content = np.broadcast_to(np.asarray(content), (count,))
+    delivery_group_ids = np.broadcast_to(np.asarray(delivery_group_ids), (count,))
+    raids = np.zeros(count, dtype=RAID_DTYPE)
+    raids["seed"] = seeds
+
+    # rng object used for difficulty and slot
+    rng_slot = Xoroshiro128PlusBatch(seeds)
+    # six star dens do not roll difficulty_rand, events roll it but do not use it
+    difficulty_rand = rng_slot.rand(100, content != 1)
+    difficulty = np.where(
+        content == 1,
+        StarLevel.SIX_STAR,
+        np.where(
+            content >= 2,
+            StarLevel.EVENT,
+            difficulty_lookup(story_progress)[difficulty_rand.astype(np.intp)],
+        ),
+    )
+    # delivery group only matters for events
+    delivery_group_ids = np.where(difficulty == StarLevel.EVENT, delivery_group_ids, -1)
+
+    groups = []
+    encounter_slot_totals = np.ones(count, dtype=np.uint64)
+    has_slots = np.zeros(count, dtype=np.bool_)
+    for group_difficulty, delivery_group_id in set(
+        zip(difficulty.tolist(), delivery_group_ids.tolist())
+    ):
+        lanes = np.flatnonzero(
+            (difficulty == group_difficulty) & (delivery_group_ids == delivery_group_id)
+        )
+        encounter_slots = encounter_index.get(
+            StarLevel(group_difficulty),
+            story_progress,
+            game,
+            None if delivery_group_id == -1 else delivery_group_id,
+        )
+        if encounter_slots.total == 0:
+            continue
+        encounter_slot_totals[lanes] = encounter_slots.total
+        has_slots[lanes] = True
+        groups.append((StarLevel(group_difficulty), lanes, encounter_slots))
+
+    encounter_slot_rand = rng_slot.rand(encounter_slot_totals, has_slots)
+    for group_difficulty, lanes, encounter_slots in groups:
+        slots = np.searchsorted(
+            encounter_slots.cumulative_rates,
+            encounter_slot_rand[lanes],
+            side="right",
+        )
+        for slot in np.unique(slots).tolist():
+            slot_lanes = lanes[slots == slot]
+            raids[slot_lanes] = generate_pokemon_array(
+                seeds[slot_lanes],
+                encounter_slots.tables[slot].raid_enemy_info,
+                full_id,
+                group_difficulty,
+            )
+    return raids
+
+
+def generate_raid_block(
+    raid_block: RaidBlock,
+    encounter_index: EncounterIndex,
+    story_progress: StoryProgress,
+    game: Game,
+    my_status: MyStatus9,
+    delivery_raid_priority: tuple[int],
+) -> np.ndarray:
+    """Derive every raid of a RaidBlock as a RAID_DTYPE structured array,
+    rows are in the same order as raid_block.raids"""
+    return generate_raids(
+        np.array([raid.seed for raid in raid_block.raids], dtype=np.uint64),
+        np.array([raid.content for raid in raid_block.raids]),
+        encounter_index,
+        story_progress,
+        game,
+        my_status.full_id,
+        np.array(
+            [
+                -1 if delivery_group_id is None else delivery_group_id
+                for delivery_group_id in raid_block.delivery_group_ids(
+                    encounter_index, story_progress, game, delivery_raid_priority
+                )
+            ]
+        ),
+    )
@@ -2,7 +2,7 @@
    https://github.com/kwsch/PKHeX/blob/master/PKHeX.Core/Saves/Substructures/Gen9/RaidSpawnList9.cs
 """
 
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 from bytechomp import Annotated, ByteOrder, Reader
 from bytechomp.datatypes import U32, U64
 from ..rng import Xoroshiro128Plus
@@ -24,18 +24,15 @@ from ..enums import (
     AbilityIndex,
     Item,
     RaidRewardItemSubjectType,
-    RaidRewardItemCategoryType,
     SandwichLevel,
 )
-from ..fbs.raid_enemy_table_array import (
-    RaidEnemyTableArray,
-    RaidEnemyTable,
-    RaidEnemyInfo,
-)
+from ..fbs.raid_enemy_table_array import RaidEnemyInfo
 from ..fbs.raid_fixed_reward_item_array import RaidFixedRewardItemArray
 from ..fbs.raid_lottery_reward_item_array import RaidLotteryRewardItemArray
 from ..util.personal_data_handler import PersonalDataHandler
+from .encounter_index import EncounterIndex
 from .my_status_9 import MyStatus9
+from .raid_record import RaidRecord
 
 RAID_COUNT = 72
 TOXTRICITY_AMPED_NATURES = (
@@ -240,9 +237,13 @@ class TeraRaid:
         self.weight: int = None
         self.scale: int = None
 
-        self.rewards: list[
+        # rewards are only generated once they are accessed
+        self._rewards: list[
             tuple[Item, int, RaidRewardItemSubjectType, SandwichLevel]
         ] = None
+        self._raid_item_table_arrays: tuple[
+            RaidFixedRewardItemArray | RaidLotteryRewardItemArray
+        ] = None
 
         # for map display
         self.id_str: str = f"{self.area_id}-{self.den_id}"
@@ -376,13 +377,15 @@ class TeraRaid:
                 return Nature.from_generation(raid_fixed_nature)
 
     def rand_size(self, rng: Xoroshiro128Plus) -> int:
-        """Generate size scalar"""
-        # TODO: deal with forced size ranges
+        """Generate size scalar
+
+        Forced size ranges of encounters are not handled yet, sizes are
+        always rolled over the full range"""
         return rng.rand(0x81) + rng.rand(0x80)
 
     def initialize_data(
         self,
-        raid_enemy_table_arrays: tuple[RaidEnemyTableArray],
+        encounter_index: EncounterIndex,
         raid_item_table_arrays: tuple[
             RaidFixedRewardItemArray | RaidLotteryRewardItemArray
         ],
@@ -399,22 +402,53 @@ class TeraRaid:
         # tid/sid used for pid generation
         self.my_status = my_status
 
+        # item tables for rewards to be generated from on access
+        self._raid_item_table_arrays = raid_item_table_arrays
+        self._rewards = None
+
         # rng object used for difficulty and slot
         rng_slot = Xoroshiro128Plus(self.seed)
 
-        # rng object used for reward items
-        rng_reward = Xoroshiro128Plus(self.seed)
-
         self.difficulty = self.rand_difficulty(story_progress, rng_slot)
 
-        possible_encounter_slots, encounter_slot_total = self.build_encounter_table(
-            raid_enemy_table_arrays, story_progress, game
+        encounter_slots = encounter_index.get(
+            self.difficulty, story_progress, game, self.delivery_group_id
+        )
+        self.generate_pokemon(
+            encounter_slots.select(rng_slot.rand(encounter_slots.total)).raid_enemy_info
         )
 
-        self.generate_from_slots(
-            rng_slot, possible_encounter_slots, encounter_slot_total
+    def can_reuse_derived_data(self, other: "TeraRaid", delivery_group_id: int) -> bool:
+        """Check if other was derived from the same seed, content and delivery group"""
+        return (
+            other.raid_enemy_info is not None
+            and other.seed == self.seed
+            and other.content == self.content
+            and other.delivery_group_id == delivery_group_id
         )
-        self.generate_rewards(rng_reward, raid_item_table_arrays)
+
+    def copy_derived_data(self, other: "TeraRaid") -> None:
+        """Copy information derived from seed and slot from other"""
+        raw_fields = {field.name for field in fields(self)}
+        for name, value in vars(other).items():
+            if name not in raw_fields and name not in ("id_str", "hide_sensitive_info"):
+                setattr(self, name, value)
+
+    def to_record(self) -> RaidRecord:
+        """Memory-compact record of the derived raid"""
+        return RaidRecord.from_tera_raid(self)
+
+    @property
+    def rewards(
+        self,
+    ) -> list[tuple[Item, int, RaidRewardItemSubjectType, SandwichLevel]]:
+        """Raid rewards, generated the first time they are accessed"""
+        if self._rewards is None and self._raid_item_table_arrays is not None:
+            # rng object used for reward items
+            self.generate_rewards(
+                Xoroshiro128Plus(self.seed), self._raid_item_table_arrays
+            )
+        return self._rewards
 
     def generate_rewards(
         self,
@@ -425,66 +459,30 @@ class TeraRaid:
     ):
         """Generate raid rewards"""
         if self.is_event:
-            fixed_array = raid_item_table_arrays[2].reward_item_dict
-            lottery_array = raid_item_table_arrays[3].reward_item_dict
+            fixed_array = raid_item_table_arrays[2].compiled_reward_dict
+            lottery_array = raid_item_table_arrays[3].compiled_reward_dict
         else:
-            fixed_array = raid_item_table_arrays[0].reward_item_dict
-            lottery_array = raid_item_table_arrays[1].reward_item_dict
-        fixed_items = fixed_array[self.raid_enemy_info.drop_table_fix]
-        lottery_items = lottery_array[self.raid_enemy_info.drop_table_random]
-        self.rewards = []
-        for item_info in fixed_items:
-            if item_info.item_id not in (None, Item.NONE):
-                self.rewards.append(
-                    (
-                        item_info.item_id,
-                        item_info.num,
-                        item_info.subject_type or RaidRewardItemSubjectType.ALL,
-                        SandwichLevel.NONE,
-                    )
-                )
-            elif item_info.category not in (None, RaidRewardItemCategoryType.ITEM):
-                self.rewards.append(
-                    (
-                        item_info.category.to_item_id(self.species, self.tera_type),
-                        item_info.num,
-                        item_info.subject_type or RaidRewardItemSubjectType.ALL,
-                        SandwichLevel.NONE,
-                    )
-                )
-        lot_sum = sum(item.rate or 0 for item in lottery_items)
+            fixed_array = raid_item_table_arrays[0].compiled_reward_dict
+            lottery_array = raid_item_table_arrays[1].compiled_reward_dict
+        fixed_table = fixed_array[self.raid_enemy_info.drop_table_fix]
+        lottery_table = lottery_array[self.raid_enemy_info.drop_table_random]
+        self._rewards = list(fixed_table.rewards(self.species, self.tera_type))
+        lottery_outputs = lottery_table.outputs(self.species, self.tera_type)
         count_rand = rng_reward.rand(100)
         # for now, assume sandwich lv.3
         count = calc_reward_item_count(count_rand, self.difficulty) + 3
         for cnt in range(count):
-            item_rand = rng_reward.rand(lot_sum)
-            for item_info in lottery_items:
-                if item_rand < (item_info.rate or 0):
-                    if item_info.item_id not in (None, Item.NONE):
-                        self.rewards.append(
-                            (
-                                item_info.item_id,
-                                item_info.num,
-                                RaidRewardItemSubjectType.ALL,
-                                SandwichLevel(max(0, 4 - (count - cnt))),
-                            )
-                        )
-                    elif item_info.category not in (
-                        None,
-                        RaidRewardItemCategoryType.ITEM,
-                    ):
-                        self.rewards.append(
-                            (
-                                item_info.category.to_item_id(
-                                    self.species, self.tera_type
-                                ),
-                                item_info.num,
-                                RaidRewardItemSubjectType.ALL,
-                                SandwichLevel(max(0, 4 - (count - cnt))),
-                            )
-                        )
-                    break
-                item_rand -= item_info.rate
+            output = lottery_outputs[
+                lottery_table.select(rng_reward.rand(lottery_table.lot_sum))
+            ]
+            if output is not None:
+                self._rewards.append(
+                    (
+                        *output,
+                        RaidRewardItemSubjectType.ALL,
+                        SandwichLevel(max(0, 4 - (count - cnt))),
+                    )
+                )
 
     def rand_difficulty(
         self, story_progress: StoryProgress, rng_slot: Xoroshiro128Plus
@@ -499,60 +497,6 @@ class TeraRaid:
             return StarLevel.EVENT
         return calc_difficulty(story_progress, difficulty_rand)
 
-    def generate_from_slots(
-        self,
-        rng_slot: Xoroshiro128Plus,
-        possible_encounter_slots: list[RaidEnemyTable],
-        encounter_slot_total: int,
-    ):
-        """Generate pokemon based on possible slots"""
-        encounter_slot_rand = rng_slot.rand(encounter_slot_total)
-        for table in possible_encounter_slots:
-            if encounter_slot_rand < table.raid_enemy_info.rate:
-                self.generate_pokemon(table.raid_enemy_info)
-                break
-            encounter_slot_rand -= table.raid_enemy_info.rate
-
-    def build_encounter_table(
-        self,
-        raid_enemy_table_arrays: list[RaidEnemyTableArray],
-        story_progress: StoryProgress,
-        game: Game,
-    ) -> tuple[list[RaidEnemyTable], int]:
-        """Build possible encounter table array"""
-        raid_enemy_table_array = raid_enemy_table_arrays[self.difficulty]
-
-        possible_encounter_tables = []
-        encounter_slot_total = 0
-
-        for table in raid_enemy_table_array.raid_enemy_tables:
-            if self.valid_table(story_progress, game, table):
-                possible_encounter_tables.append(table)
-                encounter_slot_total += table.raid_enemy_info.rate
-
-        return possible_encounter_tables, encounter_slot_total
-
-    def valid_table_event(
-        self, story_progress: StoryProgress, game: Game, table: RaidEnemyTable
-    ) -> bool:
-        """Check if a RaidEnemyTable is possible to be selected for events"""
-        return (
-            table.raid_enemy_info.delivery_group_id == self.delivery_group_id
-            and (
-                table.raid_enemy_info.difficulty is None
-                or table.raid_enemy_info.difficulty.is_unlocked(story_progress)
-            )
-            and table.raid_enemy_info.rom_ver in (None, game, Game.BOTH)
-        )
-
-    def valid_table(
-        self, story_progress: StoryProgress, game: Game, table: RaidEnemyTable
-    ) -> bool:
-        """Check if a RaidEnemyTable is possible to be selected"""
-        if self.is_event:
-            return self.valid_table_event(story_progress, game, table)
-        return table.raid_enemy_info.rom_ver in (None, game, Game.BOTH)
-
     def __str__(self) -> str:
         if not self.is_enabled:
             return "Empty Den"
@@ -589,7 +533,7 @@ class RaidBlock:
 
     def initialize_data(
         self,
-        raid_enemy_table_arrays: tuple[RaidEnemyTableArray],
+        encounter_index: EncounterIndex,
         raid_item_table_arrays: tuple[
             RaidFixedRewardItemArray | RaidLotteryRewardItemArray
         ],
@@ -597,9 +541,74 @@ class RaidBlock:
         game: Game,
         my_status: MyStatus9,
         delivery_raid_priority: tuple[int],
+        previous_block: "RaidBlock" = None,
     ) -> None:
-        """Initialize each raid with derived information"""
-        for i, raid in enumerate(self.raids):
+        """Initialize each raid with derived information
+
+        When previous_block was derived in the same context, raids whose seed,
+        content and delivery group are unchanged reuse its derived information"""
+        # pylint: disable=attribute-defined-outside-init
+        self.derivation_context = (
+            encounter_index,
+            raid_item_table_arrays,
+            story_progress,
+            game,
+            my_status,
+        )
+        previous_raids = (
+            previous_block.raids
+            if previous_block is not None
+            and getattr(previous_block, "derivation_context", None)
+            == self.derivation_context
+            else (None,) * len(self.raids)
+        )
+        for raid, previous_raid, den_delivery_group_id in zip(
+            self.raids,
+            previous_raids,
+            self.delivery_group_ids(
+                encounter_index, story_progress, game, delivery_raid_priority
+            ),
+        ):
+            if previous_raid is not None and raid.can_reuse_derived_data(
+                previous_raid, den_delivery_group_id
+            ):
+                raid.copy_derived_data(previous_raid)
+                continue
+            raid.initialize_data(
+                encounter_index,
+                raid_item_table_arrays,
+                story_progress,
+                game,
+                my_status,
+                den_delivery_group_id,
+            )
+
+    def is_valid(self) -> bool:
+        """Sanity check the raw raid data, memory that is not a raid block
+        (including freed, zeroed memory) rarely passes"""
+        return (
+            self.current_seed != 0
+            and self.tomorrow_seed != 0
+            and any(raid.is_enabled for raid in self.raids)
+            and all(
+                raid.is_enabled in (0, 1) and raid.content <= 3 for raid in self.raids
+            )
+        )
+
+    def to_records(self) -> list[RaidRecord]:
+        """Memory-compact records of each derived raid"""
+        return [raid.to_record() for raid in self.raids]
+
+    def delivery_group_ids(
+        self,
+        encounter_index: EncounterIndex,
+        story_progress: StoryProgress,
+        game: Game,
+        delivery_raid_priority: tuple[int],
+    ) -> list[int]:
+        """Event delivery group of each raid based on its position in the raid list"""
+        den_delivery_group_ids = []
+        for i in range(len(self.raids)):
             # check the event delivery group
             den_delivery_group_id = None
             for delivery_group_id, delivery_group_size in enumerate(
@@ -607,46 +616,29 @@ class RaidBlock:
             ):
                 if i < delivery_group_size:
                     if not self.validate_event_slots(
-                        raid_enemy_table_arrays, story_progress, game, delivery_group_id
+                        encounter_index, story_progress, game, delivery_group_id
                     ):
                         continue
                     den_delivery_group_id = delivery_group_id
                     break
                 i -= delivery_group_size
-            raid.initialize_data(
-                raid_enemy_table_arrays,
-                raid_item_table_arrays,
-                story_progress,
-                game,
-                my_status,
-                den_delivery_group_id,
-            )
+            den_delivery_group_ids.append(den_delivery_group_id)
+        return den_delivery_group_ids
 
+    @staticmethod
     def validate_event_slots(
-        self,
-        raid_enemy_table_arrays: tuple[RaidEnemyTableArray],
+        encounter_index: EncounterIndex,
         story_progress: StoryProgress,
         game: Game,
         delivery_group_id: int,
     ):
         """Check if a delivery group id has spawnable pokemon"""
-        dummy_raid = TeraRaid(
-            is_enabled=1,
-            area_id=0,
-            display_type=0,
-            den_id=0,
-            seed=0,
-            _unused_14=0,
-            content=0,
-            collected_league_points=0,
+        return (
+            encounter_index.get(
+                StarLevel.EVENT, story_progress, game, delivery_group_id
+            ).total
+            != 0
         )
-        dummy_raid.delivery_group_id = delivery_group_id
-        dummy_raid.is_event = True
-        dummy_raid.difficulty = StarLevel.EVENT
-        total = dummy_raid.build_encounter_table(
-            raid_enemy_table_arrays, story_progress, game
-        )[1]
-        return total != 0
 
 
 def process_raid_block(raid_block: bytes) -> RaidBlock:
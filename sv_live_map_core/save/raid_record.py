@@ -0,0 +1,169 @@
+"""Memory-compact record of a derived TeraRaid"""
+
+from typing import TYPE_CHECKING
+from ..enums import (
+    StarLevel,
+    TeraType,
+    Species,
+    Nature,
+    Ability,
+    AbilityIndex,
+    Gender,
+)
+from ..fbs.raid_enemy_table_array import RaidEnemyInfo
+
+if TYPE_CHECKING:
+    from .raid_block import TeraRaid
+
+
+class RaidRecord:
+    """Memory-compact record of a derived TeraRaid
+
+    Enums are stored as integer codes and converted on access, static
+    encounter data is a shared reference to the RaidEnemyInfo of the slot"""
+
+    __slots__ = (
+        "area_id",
+        "den_id",
+        "seed",
+        "content",
+        "delivery_group_id",
+        "raid_enemy_info",
+        "encryption_constant",
+        "pid",
+        "is_shiny",
+        "_difficulty",
+        "_tera_type",
+        "_ivs",
+        "_ability_index",
+        "_ability",
+        "_gender",
+        "_nature",
+        "height",
+        "weight",
+        "scale",
+    )
+
+    # pylint: disable=too-many-instance-attributes,too-many-arguments
+    def __init__(
+        self,
+        area_id: int,
+        den_id: int,
+        seed: int,
+        content: int,
+        delivery_group_id: int,
+        raid_enemy_info: RaidEnemyInfo,
+        difficulty: int,
+        tera_type: int,
+        encryption_constant: int,
+        pid: int,
+        is_shiny: bool,
+        ivs: tuple[int, 6],
+        ability_index: int,
+        ability: int,
+        gender: int,
+        nature: int,
+        height: int,
+        weight: int,
+        scale: int,
+    ) -> None:
+        self.area_id = area_id
+        self.den_id = den_id
+        self.seed = seed
+        self.content = content
+        self.delivery_group_id = delivery_group_id
+        self.raid_enemy_info = raid_enemy_info
+        self.encryption_constant = encryption_constant
+        self.pid = pid
+        self.is_shiny = is_shiny
+        self._difficulty = int(difficulty)
+        self._tera_type = int(tera_type)
+        # 5 bits per iv, hp in the lowest bits
+        self._ivs = sum(iv << (5 * i) for i, iv in enumerate(ivs))
+        self._ability_index = int(ability_index)
+        self._ability = int(ability)
+        self._gender = int(gender)
+        self._nature = int(nature)
+        self.height = height
+        self.weight = weight
+        self.scale = scale
+
+    @classmethod
+    def from_tera_raid(cls, raid: "TeraRaid") -> "RaidRecord":
+        """Build a record from an initialized TeraRaid"""
+        return cls(
+            raid.area_id,
+            raid.den_id,
+            raid.seed,
+            raid.content,
+            raid.delivery_group_id,
+            raid.raid_enemy_info,
+            raid.difficulty,
+            raid.tera_type,
+            raid.encryption_constant,
+            raid.pid,
+            raid.is_shiny,
+            raid.ivs,
+            raid.ability_index,
+            raid.ability,
+            raid.gender,
+            raid.nature,
+            raid.height,
+            raid.weight,
+            raid.scale,
+        )
+
+    @property
+    def id_str(self) -> str:
+        """Location string for map display"""
+        return f"{self.area_id}-{self.den_id}"
+
+    @property
+    def is_event(self) -> bool:
+        """Whether or not the raid is an event raid"""
+        return self.content >= 2
+
+    @property
+    def species(self) -> Species:
+        """Species of the raid pokemon"""
+        return self.raid_enemy_info.boss_poke_para.dev_id
+
+    @property
+    def form(self) -> int:
+        """Form of the raid pokemon"""
+        return self.raid_enemy_info.boss_poke_para.form_id
+
+    @property
+    def difficulty(self) -> StarLevel:
+        """Star level of the raid"""
+        return StarLevel(self._difficulty)
+
+    @property
+    def tera_type(self) -> TeraType:
+        """Tera type of the raid pokemon"""
+        return TeraType(self._tera_type)
+
+    @property
+    def ivs(self) -> tuple[int, 6]:
+        """IVs of the raid pokemon"""
+        return tuple((self._ivs >> (5 * i)) & 31 for i in range(6))
+
+    @property
+    def ability_index(self) -> AbilityIndex:
+        """Ability index of the raid pokemon"""
+        return AbilityIndex(self._ability_index)
+
+    @property
+    def ability(self) -> Ability:
+        """Ability of the raid pokemon"""
+        return Ability(self._ability)
+
+    @property
+    def gender(self) -> Gender:
+        """Gender of the raid pokemon"""
+        return Gender(self._gender)
+
+    @property
+    def nature(self) -> Nature:
+        """Nature of the raid pokemon"""
+        return Nature(self._nature)
@@ -1,10 +1,14 @@
 """Decrypt and read blocks from a SV save file
    https://github.com/kwsch/PKHeX/tree/master/PKHeX.Core/Saves/Encryption/SwishCrypto"""
 
+import mmap
 import struct
+from dataclasses import dataclass
+from functools import cached_property
 from typing import Type
 import bytechomp
-from ..rng.xorshift import SCXorshift32
+import numpy as np
+from ..rng.xorshift import SCXorshift32, decrypt_into
 from ..enums.save_block import SCTypeCode
 from ..enums.difficulty import StoryProgress
 from ..save.my_status_9 import MyStatus9
@@ -15,9 +19,24 @@ from ..fbs.raid_fixed_reward_item_array import RaidFixedRewardItemArray
 from ..fbs.raid_lottery_reward_item_array import RaidLotteryRewardItemArray
 
 
+# numpy dtypes of numeric SCTypeCodes for decoding arrays
+ARRAY_DTYPES = {
+    SCTypeCode.U8: np.dtype("<u1"),
+    SCTypeCode.U16: np.dtype("<u2"),
+    SCTypeCode.U32: np.dtype("<u4"),
+    SCTypeCode.U64: np.dtype("<u8"),
+    SCTypeCode.I8: np.dtype("<i1"),
+    SCTypeCode.I16: np.dtype("<i2"),
+    SCTypeCode.I32: np.dtype("<i4"),
+    SCTypeCode.I64: np.dtype("<i8"),
+    SCTypeCode.FLOAT: np.dtype("<f4"),
+    SCTypeCode.DOUBLE: np.dtype("<f8"),
+}
+
+
 def parse_int(block_type: SCTypeCode, data: bytearray) -> int:
     """Parse bytes for integer SCTypeCodes"""
-    return int.from_bytes(data, "little", signed=block_type.is_signed())[0]
+    return int.from_bytes(data, "little", signed=block_type.is_signed())
 
 
 def parse_float(block_type: SCTypeCode, data: bytearray) -> float:
@@ -25,6 +44,18 @@ def parse_float(block_type: SCTypeCode, data: bytearray) -> float:
     return struct.unpack("f" if block_type == SCTypeCode.FLOAT else "d", data)[0]
 
 
+@dataclass
+class SaveBlockEntry:
+    """Location of a save block within the decrypted save"""
+
+    key: int
+    # offset of the encrypted type byte
+    offset: int
+    block_type: SCTypeCode
+    # size of the encrypted data following the type byte
+    size: int
+
+
 class SaveFile9:
     """SV save file and save block accessor"""
 
@@ -172,26 +203,89 @@ class SaveFile9:
     RAID_BLOCK_LOCATION = 0xCAAC8800
 
     def __init__(self, save_data: bytearray):
-        self.save_data = save_data
+        self._setup(save_data)
         self.decrypt_main()
 
+    def _setup(self, save_data: bytearray | mmap.mmap) -> None:
+        """Set up state shared by every kind of save file"""
+        self.save_data = save_data
+
     def decrypt_main(self):
         """Decrypt main"""
-        for i in range(len(self.save_data) - 0x20):
-            self.save_data[i] ^= self.STATIC_XORPAD[i % len(self.STATIC_XORPAD)]
+        self.xor_static_pad(self.save_data, len(self.save_data) - 0x20)
 
-    def decrypt_bytes(self, rng: SCXorshift32, ofs: int, size: int):
-        """Decrypt SCXorshift encrypted bytearray"""
-        return bytearray(byte ^ rng.next() for byte in self.save_data[ofs : ofs + size])
+    @classmethod
+    def xor_static_pad(cls, data: bytearray | memoryview, size: int, start: int = 0):
+        """XOR the first size bytes of data against STATIC_XORPAD in place
+
+        start is the offset of data within the save"""
+        if size <= 0:
+            return
+        pad = np.roll(
+            np.array(cls.STATIC_XORPAD, dtype=np.uint8),
+            -(start % len(cls.STATIC_XORPAD)),
+        )
+        view = np.frombuffer(data, dtype=np.uint8, count=size)
+        full_size = size - size % len(pad)
+        # XOR whole pads at once by viewing the buffer as rows of pad length
+        rows = view[:full_size].reshape(-1, len(pad))
+        np.bitwise_xor(rows, pad, out=rows)
+        tail = view[full_size:]
+        np.bitwise_xor(tail, pad[: len(tail)], out=tail)
+
+    @classmethod
+    def xor_static_pad_reference(cls, data: bytearray, size: int):
+        """Byte by byte reference implementation of xor_static_pad"""
+        for i in range(size):
+            data[i] ^= cls.STATIC_XORPAD[i % len(cls.STATIC_XORPAD)]
+
+    def read_range(self, ofs: int, size: int) -> bytearray:
+        """Read size bytes at ofs with the static xorpad removed"""
+        return self.save_data[ofs : ofs + size]
+
+    @cached_property
+    def block_directory(self) -> dict[int, SaveBlockEntry]:
+        """Location of every save block by key
+
+        Built on first access by reading and decrypting every block header"""
+        return self.parse_block_directory()
+
+    def parse_block_directory(self) -> dict[int, SaveBlockEntry]:
+        """Walk the save block stream once and record the location of each block"""
+        directory = {}
+        ofs = 0
+        end = len(self.save_data) - 0x20
+        while ofs < end:
+            # key, type and up to 5 bytes of size/sub type
+            header = self.read_range(ofs, 10)
+            key = int.from_bytes(header[:4], "little")
+            rng = SCXorshift32(key)
+            ofs += 4
+            block_type = SCTypeCode(header[4] ^ rng.next())
+            match block_type:
+                case SCTypeCode.BOOL_FALSE | SCTypeCode.BOOL_TRUE | SCTypeCode.BOOL_ARRAY:
+                    size = 0
+                case SCTypeCode.OBJECT:
+                    size = 4 + (int.from_bytes(header[5:9], "little") ^ rng.next_32())
+                case SCTypeCode.ARRAY:
+                    arr_size = int.from_bytes(header[5:9], "little") ^ rng.next_32()
+                    sub_type = SCTypeCode(header[9] ^ rng.next())
+                    size = 5 + arr_size * sub_type.byte_size()
+                case _:
+                    size = block_type.byte_size()
+            directory[key] = SaveBlockEntry(key, ofs, block_type, size)
+            ofs += 1 + size
+        return directory
 
     def read_block(
         self, block_key: int
-    ) -> bool | bytearray | int | float | list[bytearray] | list[int] | list[float]:
+    ) -> bool | bytearray | int | float | list[bytearray] | np.ndarray:
         """Read and decrypt save block from block_key"""
-        rng = SCXorshift32(block_key)
-        ofs = self.save_data.find(block_key.to_bytes(4, "little")) + 4
-        block_type = SCTypeCode(self.save_data[ofs] ^ rng.next())
-        ofs += 1
+        entry = self.block_directory[block_key]
+        # type byte, headers and data are one continuous encrypted stream
+        block = self.read_range(entry.offset, 1 + entry.size)
+        decrypt_into(block, block_key)
+        block_type = SCTypeCode(block[0])
         match block_type:
             case SCTypeCode.BOOL_FALSE:
                 return False
@@ -200,39 +294,17 @@ class SaveFile9:
             case SCTypeCode.BOOL_ARRAY:
                 raise NotImplementedError("BOOL_ARRAY is an invalid block type.")
             case SCTypeCode.OBJECT:
-                return self.decrypt_bytes(
-                    rng,
-                    ofs + 4,
-                    size=int.from_bytes(self.save_data[ofs : ofs + 4], "little")
-                    ^ rng.next_32(),
-                )
+                return block[5:]
             case SCTypeCode.ARRAY:
-                arr_size = (
-                    int.from_bytes(self.save_data[ofs : ofs + 4], "little")
-                    ^ rng.next_32()
-                )
-                ofs += 4
-                sub_type = SCTypeCode(self.save_data[ofs] ^ rng.next())
-                ofs += 1
+                arr_size = int.from_bytes(block[1:5], "little")
+                sub_type = SCTypeCode(block[5])
+                if (dtype := ARRAY_DTYPES.get(sub_type)) is not None:
+                    return np.frombuffer(block, dtype=dtype, count=arr_size, offset=6)
                 sub_type_size = sub_type.byte_size()
-                arr = []
-                for _ in range(arr_size):
-                    data = self.decrypt_bytes(rng, ofs, sub_type_size)
-                    match sub_type:
-                        case (
-                            SCTypeCode.U8
-                            | SCTypeCode.U16
-                            | SCTypeCode.U32
-                            | SCTypeCode.I8
-                            | SCTypeCode.I16
-                            | SCTypeCode.I32
-                        ):
-                            data = parse_int(sub_type, data)
-                        case SCTypeCode.FLOAT | SCTypeCode.DOUBLE:
-                            data = parse_float(sub_type, data)
-                    arr.append(data)
-                    ofs += sub_type_size
-                return arr
+                return [
+                    block[ofs : ofs + sub_type_size]
+                    for ofs in range(6, 6 + arr_size * sub_type_size, sub_type_size)
+                ]
             case (
                 SCTypeCode.U8
                 | SCTypeCode.U16
@@ -241,13 +313,9 @@ class SaveFile9:
                 | SCTypeCode.I16
                 | SCTypeCode.I32
             ):
-                return parse_int(
-                    block_type, self.decrypt_bytes(rng, ofs, block_type.byte_size())
-                )
+                return parse_int(block_type, block[1:])
             case SCTypeCode.FLOAT | SCTypeCode.DOUBLE:
-                return parse_float(
-                    block_type, self.decrypt_bytes(rng, ofs, block_type.byte_size())
-                )
+                return parse_float(block_type, block[1:])
             case _:
                 raise NotImplementedError(
                     f"{block_type:!r} is not an implemented block type."
@@ -304,3 +372,46 @@ class SaveFile9:
     def read_raid_block(self) -> RaidBlock:
         """Read and process raid block"""
         return process_raid_block(self.read_block(self.RAID_BLOCK_LOCATION))
+
+
+class MappedSaveFile9(SaveFile9):
+    """SV save file backed by mmap
+
+    Only the byte ranges of requested blocks are read and decrypted, and
+    results are cached per block key. Building the block directory on the
+    first read still touches the header of every block in the file"""
+
+    # pylint: disable=super-init-not-called
+    def __init__(self, path: str):
+        # the static xorpad is removed per range in read_range instead of
+        # decrypting the whole file in SaveFile9.__init__
+        with open(path, "rb") as save_file:
+            self._setup(mmap.mmap(save_file.fileno(), 0, access=mmap.ACCESS_READ))
+        self._block_cache: dict[int, object] = {}
+
+    def __enter__(self) -> "MappedSaveFile9":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the underlying mmap"""
+        self.save_data.close()
+
+    def read_range(self, ofs: int, size: int) -> bytearray:
+        """Read size bytes at ofs with the static xorpad removed"""
+        data = bytearray(self.save_data[ofs : ofs + size])
+        # the footer is not encrypted with the static xorpad
+        self.xor_static_pad(
+            data, min(len(data), len(self.save_data) - 0x20 - ofs), start=ofs
+        )
+        return data
+
+    def read_block(
+        self, block_key: int
+    ) -> bool | bytearray | int | float | list[bytearray] | np.ndarray:
+        """Read and decrypt save block from block_key, cached per key"""
+        if block_key not in self._block_cache:
+            self._block_cache[block_key] = super().read_block(block_key)
+        return self._block_cache[block_key]
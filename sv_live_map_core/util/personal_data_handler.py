@@ -1,46 +1,164 @@
 """Get data from personal_data"""
 
 import json
+import numpy as np
 from ..enums import Ability, AbilityIndex, Gender, GenderGeneration, Species
 from .path_handler import get_path
 
+# gender_group of (species, form) ordinals not present in personal_data
+MISSING_ENTRY = 0xFF
+
 
 class PersonalDataHandler:
-    """Get data from personal_data"""
+    """Get data from personal_data
+
+    Data is stored in tables indexed by a (species, form) ordinal which is
+    form_offsets[species] + form"""
 
-    _personal_data: dict[str, dict] = None
+    _form_offsets: tuple[int] = None
+    _form_counts: tuple[int] = None
+    _gender_groups: tuple[GenderGeneration | None] = None
+    _gender_ratios: tuple[int] = None
+    _abilities: tuple[tuple[Ability, 3] | None] = None
 
-    def __init__(self) -> None:
-        with open(
-            get_path("./resources/personal_data_partial.json"), "r", encoding="utf-8"
-        ) as personal_data_json:
-            if PersonalDataHandler._personal_data is None:
-                PersonalDataHandler._personal_data = json.load(personal_data_json)
+    def __init__(self, path: str = None) -> None:
+        if PersonalDataHandler._form_offsets is None or path is not None:
+            if path is None:
+                path = get_path("./resources/personal_data_partial.json")
+            if path.endswith(".npz"):
+                with np.load(path) as binary:
+                    tables = {name: binary[name] for name in binary.files}
+            else:
+                with open(path, "r", encoding="utf-8") as personal_data_json:
+                    tables = PersonalDataHandler.build_tables(
+                        json.load(personal_data_json)
+                    )
+            PersonalDataHandler.load_tables(tables)
 
     @staticmethod
-    def get_data(species: Species, form: int) -> dict:
-        """Get personal data of a mon"""
+    def build_tables(personal_data: dict[str, dict]) -> dict[str, np.ndarray]:
+        """Build ordinal indexed tables from "species-form" keyed personal_data"""
+        entries = {
+            tuple(int(value) for value in key.split("-")): data
+            for key, data in personal_data.items()
+        }
+        form_counts = np.zeros(
+            max(species for species, _ in entries) + 1, dtype=np.uint8
+        )
+        for species, form in entries:
+            form_counts[species] = max(form_counts[species], form + 1)
+        form_offsets = np.zeros(len(form_counts), dtype=np.uint16)
+        form_offsets[1:] = np.cumsum(form_counts)[:-1]
+        entry_count = int(form_counts.sum(dtype=np.uint32))
+        gender_group = np.full(entry_count, MISSING_ENTRY, dtype=np.uint8)
+        gender_ratio = np.zeros(entry_count, dtype=np.uint8)
+        abilities = np.zeros((entry_count, 3), dtype=np.uint16)
+        for (species, form), data in entries.items():
+            ordinal = form_offsets[species] + form
+            gender_group[ordinal] = data["gender_group"]
+            gender_ratio[ordinal] = data["gender_ratio"]
+            abilities[ordinal] = data["abilities"]
+        return {
+            "form_offsets": form_offsets,
+            "form_counts": form_counts,
+            "gender_group": gender_group,
+            "gender_ratio": gender_ratio,
+            "abilities": abilities,
+        }
+
+    @staticmethod
+    def load_tables(tables: dict[str, np.ndarray]) -> None:
+        """Load ordinal indexed tables for lookups"""
+        PersonalDataHandler._form_offsets = tuple(tables["form_offsets"].tolist())
+        PersonalDataHandler._form_counts = tuple(tables["form_counts"].tolist())
+        PersonalDataHandler._gender_groups = tuple(
+            None if gender_group == MISSING_ENTRY else GenderGeneration(gender_group)
+            for gender_group in tables["gender_group"].tolist()
+        )
+        PersonalDataHandler._gender_ratios = tuple(tables["gender_ratio"].tolist())
+        PersonalDataHandler._abilities = tuple(
+            tuple(Ability(ability) for ability in abilities)
+            for abilities in tables["abilities"].tolist()
+        )
+
+    @staticmethod
+    def save_binary(path: str) -> None:
+        """Save the loaded tables as a prebuilt .npz binary"""
+        np.savez(
+            path,
+            form_offsets=np.array(PersonalDataHandler._form_offsets, dtype=np.uint16),
+            form_counts=np.array(PersonalDataHandler._form_counts, dtype=np.uint8),
+            gender_group=np.array(
+                [
+                    MISSING_ENTRY if gender_group is None else gender_group
+                    for gender_group in PersonalDataHandler._gender_groups
+                ],
+                dtype=np.uint8,
+            ),
+            gender_ratio=np.array(PersonalDataHandler._gender_ratios, dtype=np.uint8),
+            abilities=np.array(PersonalDataHandler._abilities, dtype=np.uint16),
+        )
+
+    @staticmethod
+    def get_ordinal(species: Species, form: int) -> int:
+        """Get the table index of a mon"""
         if form is None:
             form = 0
-        return PersonalDataHandler._personal_data[f"{species.value}-{form}"]
+        if (
+            species >= len(PersonalDataHandler._form_counts)
+            or form < 0
+            or form >= PersonalDataHandler._form_counts[species]
+            or PersonalDataHandler._gender_groups[
+                ordinal := PersonalDataHandler._form_offsets[species] + form
+            ]
+            is None
+        ):
+            raise KeyError(f"{species.value}-{form}")
+        return ordinal
+
+    @staticmethod
+    def get_data(species: Species, form: int) -> dict:
+        """Get personal data of a mon"""
+        ordinal = PersonalDataHandler.get_ordinal(species, form)
+        return {
+            "abilities": [
+                ability.value for ability in PersonalDataHandler._abilities[ordinal]
+            ],
+            "gender_group": PersonalDataHandler._gender_groups[ordinal].value,
+            "gender_ratio": PersonalDataHandler._gender_ratios[ordinal],
+        }
 
     @staticmethod
     def fixed_gender(species: Species, form: int) -> GenderGeneration:
         """Return gender generation type of a mon"""
-        return GenderGeneration(
-            PersonalDataHandler.get_data(species, form)["gender_group"]
-        )
+        return PersonalDataHandler._gender_groups[
+            PersonalDataHandler.get_ordinal(species, form)
+        ]
+
+    @staticmethod
+    def gender_ratio(species: Species, form: int) -> int:
+        """Return the gender ratio of a mon"""
+        return PersonalDataHandler._gender_ratios[
+            PersonalDataHandler.get_ordinal(species, form)
+        ]
 
     @staticmethod
     def get_gender(species: Species, form: int, gender_rand: int) -> Gender:
         """Compare a mon's gender rand"""
-        return Gender(
-            gender_rand < PersonalDataHandler.get_data(species, form)["gender_ratio"]
+        return (
+            Gender.FEMALE
+            if gender_rand < PersonalDataHandler.gender_ratio(species, form)
+            else Gender.MALE
         )
 
+    @staticmethod
+    def abilities(species: Species, form: int) -> tuple[Ability, 3]:
+        """Get all of a mon's abilities"""
+        return PersonalDataHandler._abilities[
+            PersonalDataHandler.get_ordinal(species, form)
+        ]
+
     @staticmethod
     def get_ability(species: Species, form: int, ability: AbilityIndex) -> Ability:
         """Get a mon's ability based on its index"""
-        return Ability(
-            PersonalDataHandler.get_data(species, form)["abilities"][ability]
-        )
+        return PersonalDataHandler.abilities(species, form)[ability]
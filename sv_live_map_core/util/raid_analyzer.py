@@ -0,0 +1,353 @@
+"""Headless batch analysis of saves and raid block dumps"""
+
+import argparse
+import csv
+import fnmatch
+import glob
+import json
+import os
+import struct
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterable, TextIO
+import bytechomp
+from ..enums import StarLevel, StoryProgress, Game
+from ..fbs.raid_enemy_table_array import RaidEnemyTableArray
+from ..fbs.raid_fixed_reward_item_array import RaidFixedRewardItemArray
+from ..fbs.raid_lottery_reward_item_array import RaidLotteryRewardItemArray
+from ..save.encounter_index import EncounterIndex
+from ..save.my_status_9 import MyStatus9
+from ..save.raid_block import RaidBlock, TeraRaid, process_raid_block
+from ..save.save_file_9 import MappedSaveFile9
+from .path_handler import get_path
+from .personal_data_handler import PersonalDataHandler
+from .raid_filter import RaidFilter
+
+DUMP_NAME = "raid_block.bin"
+CSV_FIELDS = (
+    "path",
+    "location",
+    "seed",
+    "species",
+    "form",
+    "difficulty",
+    "tera_type",
+    "is_shiny",
+    "ivs",
+    "ability",
+    "nature",
+    "gender",
+    "scale",
+    "encryption_constant",
+    "pid",
+    "rewards",
+)
+
+# analyzer owned by each worker process
+_WORKER_ANALYZER = None
+
+
+def _init_worker(*args) -> None:
+    """Load personal data and build the analyzer for a worker process"""
+    global _WORKER_ANALYZER  # pylint: disable=global-statement
+    PersonalDataHandler()
+    _WORKER_ANALYZER = RaidAnalyzer(*args)
+
+
+def _analyze_work(path: str) -> tuple[str, list[dict]]:
+    """Analyze a single file within a worker process"""
+    return path, _WORKER_ANALYZER.analyze(path)
+
+
+def read_cached_tables(
+    cached_tables_path: str,
+) -> tuple[tuple[bytes, 6], tuple[bytes, 2]]:
+    """Read cached encounter and item tables"""
+    tables = []
+    for level in StarLevel:
+        if level in (StarLevel.EVENT, StarLevel.SEVEN_STAR):
+            continue
+        with open(os.path.join(cached_tables_path, f"{level.name}.bin"), "rb") as file:
+            tables.append(file.read())
+    with open(os.path.join(cached_tables_path, "FIXED_ITEM.bin"), "rb") as file:
+        fixed_item_table = file.read()
+    with open(os.path.join(cached_tables_path, "LOTTERY_ITEM.bin"), "rb") as file:
+        lottery_item_table = file.read()
+    return tuple(tables), (fixed_item_table, lottery_item_table)
+
+
+def read_filters(filter_paths: list[str] = None) -> list[RaidFilter]:
+    """Read RaidFilters, defaulting to the enabled filters in filter_settings"""
+    if not filter_paths:
+        filters = []
+        for filename in glob.glob(get_path("./resources/filter_settings/*.json")):
+            with open(filename, "r", encoding="utf-8") as file:
+                filters.append(RaidFilter.from_json(json.load(file)))
+        return [raid_filter for raid_filter in filters if raid_filter.is_enabled]
+    filters = []
+    for filename in filter_paths:
+        if not os.path.exists(filename):
+            filename = get_path(f"./resources/filter_settings/{filename}")
+        with open(filename, "r", encoding="utf-8") as file:
+            filters.append(RaidFilter.from_json(json.load(file)))
+    return filters
+
+
+def find_inputs(directory: str, save_pattern: str = "main*") -> list[str]:
+    """Find raid block dumps and saves matching save_pattern in directory"""
+    inputs = []
+    for root, _, files in os.walk(directory):
+        for filename in files:
+            if filename == DUMP_NAME or fnmatch.fnmatch(filename, save_pattern):
+                inputs.append(os.path.join(root, filename))
+    return sorted(inputs)
+
+
+def build_my_status(tid: int, sid: int, game: Game) -> MyStatus9:
+    """Build MyStatus9 from trainer ids for raid block dumps"""
+    reader = bytechomp.Reader[MyStatus9](bytechomp.ByteOrder.LITTLE).allocate()
+    # game ids are offset by 49 in the save, everything else is left empty
+    reader.feed(struct.pack("<HHB", tid, sid, game + 49) + bytes(0x100))
+    assert reader.is_complete(), "Invalid data size"
+    return reader.build()
+
+
+def serialize_raid(path: str, raid: TeraRaid, include_rewards: bool) -> dict:
+    """Serialize a derived raid as a flat dict"""
+    return {
+        "path": path,
+        "location": raid.id_str,
+        "seed": f"{raid.seed:08X}",
+        "species": str(raid.species),
+        "form": raid.form,
+        "difficulty": str(raid.difficulty),
+        "tera_type": str(raid.tera_type),
+        "is_shiny": raid.is_shiny,
+        "ivs": list(raid.ivs),
+        "ability": str(raid.ability),
+        "nature": str(raid.nature),
+        "gender": str(raid.gender),
+        "scale": raid.scale,
+        "encryption_constant": f"{raid.encryption_constant:08X}",
+        "pid": f"{raid.pid:08X}",
+        "rewards": [f"{num}x {item}" for item, num, *_ in raid.rewards]
+        if include_rewards
+        else None,
+    }
+
+
+def write_records(records: Iterable[dict], output: TextIO, output_format: str):
+    """Stream serialized raids as JSON Lines or CSV"""
+    if output_format == "csv":
+        writer = csv.DictWriter(output, CSV_FIELDS)
+        writer.writeheader()
+        for record in records:
+            writer.writerow(
+                record
+                | {
+                    "ivs": "/".join(str(iv) for iv in record["ivs"]),
+                    "rewards": ", ".join(record["rewards"] or ()),
+                }
+            )
+            output.flush()
+        return
+    for record in records:
+        output.write(json.dumps(record) + "\n")
+        output.flush()
+
+
+class RaidAnalyzer:
+    """Derive raids from saves and raid block dumps and compare them to filters
+
+    Dumps do not contain event tables or delivery priority so event raids
+    are only derived from saves"""
+
+    # pylint: disable=too-many-instance-attributes,too-many-arguments
+    def __init__(
+        self,
+        raid_enemy_table_binaries: tuple[bytes, 6],
+        raid_item_table_binaries: tuple[bytes, 2],
+        filters: list[RaidFilter],
+        story_progress: StoryProgress = StoryProgress.SIX_STAR_UNLOCKED,
+        game: Game = Game.SCARLET,
+        tid: int = 0,
+        sid: int = 0,
+        include_rewards: bool = False,
+    ) -> None:
+        self.raid_enemy_table_arrays = [
+            RaidEnemyTableArray(table) for table in raid_enemy_table_binaries
+        ]
+        self.raid_item_table_arrays = (
+            RaidFixedRewardItemArray(raid_item_table_binaries[0]),
+            RaidLotteryRewardItemArray(raid_item_table_binaries[1]),
+        )
+        self.dump_encounter_index = EncounterIndex(self.raid_enemy_table_arrays)
+        self.filters = filters
+        self.story_progress = story_progress
+        self.game = game
+        self.my_status = build_my_status(tid, sid, game)
+        self.include_rewards = include_rewards or any(
+            raid_filter.uses_rewards for raid_filter in filters
+        )
+
+    def analyze(self, path: str) -> list[dict]:
+        """Derive and filter the raids of a save or raid block dump"""
+        if os.path.basename(path) == DUMP_NAME:
+            return self.analyze_dump(path)
+        return self.analyze_save(path)
+
+    def analyze_dump(self, path: str) -> list[dict]:
+        """Derive and filter the raids of a raid block dump"""
+        with open(path, "rb") as dump_file:
+            raid_block = process_raid_block(dump_file.read())
+        return self.match_raids(
+            path,
+            raid_block,
+            self.dump_encounter_index,
+            self.raid_item_table_arrays,
+            self.story_progress,
+            self.game,
+            self.my_status,
+            (0,) * 11,
+        )
+
+    def analyze_save(self, path: str) -> list[dict]:
+        """Derive and filter the raids of a save"""
+        with MappedSaveFile9(path) as save_file:
+            story_progress = save_file.read_story_progess()
+            my_status = save_file.read_my_status()
+            event_binary = save_file.read_event_binary()
+            delivery_item_binaries = save_file.read_delivery_item_binaries()
+            raid_priority = save_file.read_event_priority()
+            raid_block = save_file.read_raid_block()
+        return self.match_raids(
+            path,
+            raid_block,
+            EncounterIndex((*self.raid_enemy_table_arrays, event_binary)),
+            (*self.raid_item_table_arrays, *delivery_item_binaries),
+            story_progress,
+            my_status.game,
+            my_status,
+            raid_priority,
+        )
+
+    def match_raids(
+        self,
+        path: str,
+        raid_block: RaidBlock,
+        encounter_index: EncounterIndex,
+        raid_item_table_arrays: tuple[
+            RaidFixedRewardItemArray | RaidLotteryRewardItemArray
+        ],
+        story_progress: StoryProgress,
+        game: Game,
+        my_status: MyStatus9,
+        delivery_raid_priority: tuple[int],
+    ) -> list[dict]:
+        """Derive the enabled raids of raid_block and serialize the matches"""
+        matches = []
+        for raid, delivery_group_id in zip(
+            raid_block.raids,
+            raid_block.delivery_group_ids(
+                encounter_index, story_progress, game, delivery_raid_priority
+            ),
+        ):
+            if not raid.is_enabled:
+                continue
+            # no event tables to derive from
+            if raid.content >= 2 and delivery_group_id is None:
+                continue
+            raid.initialize_data(
+                encounter_index,
+                raid_item_table_arrays,
+                story_progress,
+                game,
+                my_status,
+                delivery_group_id,
+            )
+            if self.filters and not any(
+                raid_filter.compare(raid) for raid_filter in self.filters
+            ):
+                continue
+            matches.append(serialize_raid(path, raid, self.include_rewards))
+        return matches
+
+
+def analyze_paths(
+    paths: list[str], analyzer_args: tuple, processes: int = None
+) -> Iterable[dict]:
+    """Analyze paths across a process pool, yielding matches as files finish"""
+    with ProcessPoolExecutor(
+        max_workers=processes, initializer=_init_worker, initargs=analyzer_args
+    ) as executor:
+        futures = {executor.submit(_analyze_work, path): path for path in paths}
+        for future in as_completed(futures):
+            try:
+                _, records = future.result()
+            except Exception as error:  # pylint: disable=broad-except
+                print(f"WARNING: {futures[future]} failed: {error!r}", file=sys.stderr)
+                continue
+            yield from records
+
+
+def main(argv: list[str] = None) -> None:
+    """Command line entry point of the raid analyzer"""
+    parser = argparse.ArgumentParser(
+        description="Derive and filter raids from directories of saves and dumps"
+    )
+    parser.add_argument("directories", nargs="+")
+    parser.add_argument("--cached-tables", default=get_path("./cached_tables/"))
+    parser.add_argument(
+        "--filter",
+        action="append",
+        dest="filters",
+        help="filter json path or name in resources/filter_settings, "
+        "defaults to every enabled filter",
+    )
+    parser.add_argument("--output", help="output file, defaults to stdout")
+    parser.add_argument("--format", choices=("jsonl", "csv"))
+    parser.add_argument("--save-pattern", default="main*")
+    parser.add_argument("--processes", type=int)
+    parser.add_argument("--rewards", action="store_true")
+    # trainer and progress used for raid block dumps
+    parser.add_argument(
+        "--story-progress",
+        choices=[progress.name for progress in StoryProgress],
+        default=StoryProgress.SIX_STAR_UNLOCKED.name,
+    )
+    parser.add_argument(
+        "--game",
+        choices=[Game.SCARLET.name, Game.VIOLET.name],
+        default=Game.SCARLET.name,
+    )
+    parser.add_argument("--tid", type=int, default=0)
+    parser.add_argument("--sid", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    output_format = args.format or (
+        "csv" if args.output and args.output.endswith(".csv") else "jsonl"
+    )
+    raid_enemy_table_binaries, raid_item_table_binaries = read_cached_tables(
+        args.cached_tables
+    )
+    paths = [
+        path
+        for directory in args.directories
+        for path in find_inputs(directory, args.save_pattern)
+    ]
+    analyzer_args = (
+        raid_enemy_table_binaries,
+        raid_item_table_binaries,
+        read_filters(args.filters),
+        StoryProgress[args.story_progress],
+        Game[args.game],
+        args.tid,
+        args.sid,
+        args.rewards,
+    )
+    records = analyze_paths(paths, analyzer_args, args.processes)
+    if args.output is None:
+        write_records(records, sys.stdout, output_format)
+        return
+    with open(args.output, "w+", encoding="utf-8", newline="") as output:
+        write_records(records, output, output_format)
@@ -1,6 +1,7 @@
 """Filter for TeraRaids"""
 
 from typing import Self
+import numpy as np
 from ..save.raid_block import TeraRaid
 from ..enums import AbilityIndex, Gender, Nature, Species, StarLevel, Item, TeraType
 
@@ -100,6 +101,11 @@ class RaidFilter:
             self.spe_filter,
         ]
 
+    @property
+    def uses_rewards(self) -> bool:
+        """Whether or not comparing requires raid rewards"""
+        return self.reward_count_filter > 0
+
     def compare(self, raid: TeraRaid) -> bool:
         """Compare raid to filters"""
         for iv_filter, iv_val in zip(self.iv_filters, raid.ivs):
@@ -124,10 +130,32 @@ class RaidFilter:
         if raid.tera_type not in self.tera_type_filter:
             return False
 
-        if (
-            sum(reward[1] for reward in raid.rewards if reward[0] in self.reward_filter)
-            < self.reward_count_filter
-        ):
+        if self.shiny_filter and not raid.is_shiny:
             return False
 
-        return bool(not self.shiny_filter or raid.is_shiny)
+        # only generate rewards when the filter depends on them
+        return not self.uses_rewards or (
+            sum(reward[1] for reward in raid.rewards if reward[0] in self.reward_filter)
+            >= self.reward_count_filter
+        )
+
+    def compare_array(self, raids: np.ndarray) -> np.ndarray:
+        """Compare a RAID_DTYPE structured array to filters
+
+        Returns a boolean mask of matching raids, reward filters are not
+        considered as rewards are not part of the array"""
+        matches = np.ones(len(raids), dtype=np.bool_)
+        for i, iv_filter in enumerate(self.iv_filters):
+            matches &= np.isin(raids["ivs"][:, i], list(iv_filter))
+        for field, field_filter in (
+            ("ability_index", self.ability_filter),
+            ("gender", self.gender_filter),
+            ("nature", self.nature_filter),
+            ("species", self.species_filter),
+            ("difficulty", self.star_filter),
+            ("tera_type", self.tera_type_filter),
+        ):
+            matches &= np.isin(raids[field], [int(value) for value in field_filter])
+        if self.shiny_filter:
+            matches &= raids["is_shiny"]
+        return matches
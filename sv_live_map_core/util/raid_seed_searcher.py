@@ -0,0 +1,232 @@
+"""Search the full 32-bit den seed space for TeraRaids matching a filter"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable
+import numpy as np
+from ..enums import StarLevel, StoryProgress, Game
+from ..fbs.raid_enemy_table_array import RaidEnemyTableArray, RaidEnemyTable
+from ..rng import Xoroshiro128PlusBatch
+from ..save.encounter_index import EncounterIndex
+from ..save.raid_array import (
+    RAID_DTYPE,
+    difficulty_lookup,
+    force_shininess_array,
+    generate_pokemon_array,
+    is_shiny_array,
+)
+from .personal_data_handler import PersonalDataHandler
+from .raid_filter import RaidFilter
+
+# searcher owned by each worker process
+_WORKER_SEARCHER = None
+
+
+def _init_worker(searcher) -> None:
+    """Load personal data and store the searcher for a worker process"""
+    global _WORKER_SEARCHER  # pylint: disable=global-statement
+    PersonalDataHandler()
+    _WORKER_SEARCHER = searcher
+
+
+def _search_chunk_work(chunk: int) -> tuple[int, np.ndarray]:
+    """Search a single chunk within a worker process"""
+    return chunk, _WORKER_SEARCHER.search_chunk(chunk)
+
+
+class RaidSeedSearcher:
+    """Search the full 32-bit den seed space for TeraRaids matching a filter
+
+    Rewards are not generated, so reward filters are ignored"""
+
+    SEED_SPACE = 1 << 32
+
+    # pylint: disable=too-many-instance-attributes
+    def __init__(
+        self,
+        raid_enemy_table_array: RaidEnemyTableArray,
+        difficulty: StarLevel,
+        story_progress: StoryProgress,
+        game: Game,
+        raid_filter: RaidFilter,
+        full_id: int = 0,
+        delivery_group_id: int = None,
+        chunk_size: int = 1 << 20,
+    ) -> None:
+        assert self.SEED_SPACE % chunk_size == 0, "chunk_size must divide 2^32"
+        self.difficulty = difficulty
+        self.story_progress = story_progress
+        self.game = game
+        self.raid_filter = raid_filter
+        self.full_id = full_id
+        self.chunk_size = chunk_size
+        self.chunk_count = self.SEED_SPACE // chunk_size
+
+        # events share one table regardless of the star level searched for
+        table_difficulty = StarLevel.EVENT if self.content >= 2 else difficulty
+        encounter_slots = EncounterIndex.from_table(
+            table_difficulty, raid_enemy_table_array
+        ).get(table_difficulty, story_progress, game, delivery_group_id)
+        self.encounter_slots: list[RaidEnemyTable] = encounter_slots.tables
+        self.encounter_rates = np.array(
+            encounter_slots.cumulative_rates, dtype=np.uint64
+        )
+        self.encounter_slot_total = encounter_slots.total
+        self.difficulty_lookup = difficulty_lookup(story_progress)
+
+    @property
+    def content(self) -> int:
+        """Den content type searched for"""
+        match self.difficulty:
+            case StarLevel.SIX_STAR:
+                return 1
+            case StarLevel.EVENT | StarLevel.SEVEN_STAR:
+                return 2
+        return 0
+
+    def slot_may_match(self, table: RaidEnemyTable) -> bool:
+        """Check if a slot can possibly produce a match before generating it"""
+        info = table.raid_enemy_info
+        difficulty = self.difficulty if info.difficulty is None else info.difficulty
+        return (
+            info.boss_poke_para.dev_id in self.raid_filter.species_filter
+            and difficulty in self.raid_filter.star_filter
+        )
+
+    def search_seeds(self, seeds: np.ndarray) -> np.ndarray:
+        """Generate the raids of seeds and return the ones that match"""
+        seeds = np.asarray(seeds, dtype=np.uint64)
+        if self.encounter_slot_total == 0:
+            return np.zeros(0, dtype=RAID_DTYPE)
+        rng_slot = Xoroshiro128PlusBatch(seeds)
+        if self.content != 1:
+            difficulty_rand = rng_slot.rand(100)
+            if self.content == 0:
+                # difficulty is derived from the seed for standard dens
+                keep = (
+                    self.difficulty_lookup[difficulty_rand.astype(np.intp)]
+                    == self.difficulty
+                )
+                seeds = seeds[keep]
+                rng_slot = Xoroshiro128PlusBatch(
+                    rng_slot.seed0[keep], rng_slot.seed1[keep]
+                )
+        slots = np.searchsorted(
+            self.encounter_rates,
+            rng_slot.rand(self.encounter_slot_total),
+            side="right",
+        )
+
+        matches = []
+        for slot, table in enumerate(self.encounter_slots):
+            if not self.slot_may_match(table):
+                continue
+            slot_seeds = seeds[slots == slot]
+            if self.raid_filter.shiny_filter:
+                # shininess only depends on the first three rands
+                slot_seeds = slot_seeds[
+                    self.shiny_mask(slot_seeds, table.raid_enemy_info)
+                ]
+            raids = generate_pokemon_array(
+                slot_seeds, table.raid_enemy_info, self.full_id, self.difficulty
+            )
+            matches.append(raids[self.raid_filter.compare_array(raids)])
+        if not matches:
+            return np.zeros(0, dtype=RAID_DTYPE)
+        return np.concatenate(matches)
+
+    def shiny_mask(self, seeds: np.ndarray, raid_enemy_info) -> np.ndarray:
+        """Cheaply check which seeds produce a shiny pokemon"""
+        rng = Xoroshiro128PlusBatch(seeds)
+        # encryption constant
+        rng.rand()
+        sidtid = rng.rand()
+        pid = force_shininess_array(
+            raid_enemy_info.boss_poke_para.rare_type, rng.rand(), sidtid, self.full_id
+        )
+        return is_shiny_array(pid, self.full_id)
+
+    def search_chunk(self, chunk: int) -> np.ndarray:
+        """Search the seeds of a single chunk"""
+        start = chunk * self.chunk_size
+        return self.search_seeds(
+            np.arange(start, start + self.chunk_size, dtype=np.uint64)
+        )
+
+    def search(
+        self,
+        results_path: str = None,
+        checkpoint_path: str = None,
+        processes: int = None,
+        progress_callback: Callable[[int, int], None] = None,
+    ) -> list[int]:
+        """Search every seed across a process pool and return matching seeds
+
+        Matching seeds are appended to results_path as they are found and
+        finished chunks are recorded in checkpoint_path so that an
+        interrupted search can be resumed. Seeds already in results_path
+        are included in the returned seeds and are not written again"""
+        completed = self.load_checkpoint(checkpoint_path)
+        remaining = [
+            chunk for chunk in range(self.chunk_count) if chunk not in completed
+        ]
+        found = self.load_results(results_path)
+        with ProcessPoolExecutor(
+            max_workers=processes, initializer=_init_worker, initargs=(self,)
+        ) as executor:
+            futures = [
+                executor.submit(_search_chunk_work, chunk) for chunk in remaining
+            ]
+            for future in as_completed(futures):
+                chunk, raids = future.result()
+                # a chunk is searched again if the search stopped between
+                # writing its results and its checkpoint
+                seeds = [seed for seed in raids["seed"].tolist() if seed not in found]
+                found.update(seeds)
+                if results_path is not None:
+                    with open(results_path, "a+", encoding="utf-8") as results_file:
+                        results_file.writelines(f"{seed:08X}\n" for seed in seeds)
+                completed.add(chunk)
+                self.save_checkpoint(checkpoint_path, completed)
+                if progress_callback is not None:
+                    progress_callback(len(completed), self.chunk_count)
+        return sorted(found)
+
+    @staticmethod
+    def load_results(results_path: str) -> set[int]:
+        """Load the seeds already written to a results file
+
+        A partially written last line is discarded"""
+        if results_path is None or not os.path.exists(results_path):
+            return set()
+        with open(results_path, "r+", encoding="utf-8") as results_file:
+            lines = results_file.read().split("\n")
+            if lines[-1]:
+                results_file.seek(0)
+                results_file.truncate()
+                results_file.writelines(f"{line}\n" for line in lines[:-1])
+        return {int(line, 16) for line in lines[:-1]}
+
+    def load_checkpoint(self, checkpoint_path: str) -> set[int]:
+        """Load the set of finished chunks from a checkpoint file"""
+        if checkpoint_path is None or not os.path.exists(checkpoint_path):
+            return set()
+        with open(checkpoint_path, "r", encoding="utf-8") as checkpoint_file:
+            checkpoint = json.load(checkpoint_file)
+        if checkpoint["ChunkSize"] != self.chunk_size:
+            raise ValueError(
+                f"Checkpoint chunk size {checkpoint['ChunkSize']:X} "
+                f"does not match {self.chunk_size:X}"
+            )
+        return set(checkpoint["Completed"])
+
+    def save_checkpoint(self, checkpoint_path: str, completed: set[int]) -> None:
+        """Record the set of finished chunks to a checkpoint file"""
+        if checkpoint_path is None:
+            return
+        with open(checkpoint_path, "w+", encoding="utf-8") as checkpoint_file:
+            json.dump(
+                {"ChunkSize": self.chunk_size, "Completed": sorted(completed)},
+                checkpoint_file,
+            )
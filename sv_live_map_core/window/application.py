@@ -15,7 +15,7 @@ import struct
 from PIL import Image, ImageTk
 import customtkinter
 from ..nxreader.raid_reader import RaidReader
-from ..nxreader.nxreader import SocketError
+from ..nxreader.nxreader import SocketError, FramingError
 from ..widget.paldea_map_view import PaldeaMapView
 from ..util.poke_sprite_handler import PokeSpriteHandler
 from ..widget.scrollable_frame import ScrollableFrame
@@ -25,7 +25,8 @@ from ..fbs.raid_enemy_table_array import RaidEnemyTableArray
 from ..fbs.raid_fixed_reward_item_array import RaidFixedRewardItemArray
 from ..fbs.raid_lottery_reward_item_array import RaidLotteryRewardItemArray
 from ..save.raid_block import RaidBlock, TeraRaid
-from ..save.save_file_9 import SaveFile9
+from ..save.encounter_index import EncounterIndex
+from ..save.save_file_9 import MappedSaveFile9
 from ..widget.corrected_marker import CorrectedMarker
 from ..util.personal_data_handler import PersonalDataHandler
 from .automation_window import AutomationWindow
@@ -273,11 +274,13 @@ class Application(customtkinter.CTk):
         )
         if not filename:
             return
-        with open(filename, "rb") as save_file:
-            save_file = SaveFile9(bytearray(save_file.read()))
-
-        progress = save_file.read_story_progess()
-        my_status = save_file.read_my_status()
+        with MappedSaveFile9(filename) as save_file:
+            progress = save_file.read_story_progess()
+            my_status = save_file.read_my_status()
+            event_binary = save_file.read_event_binary()
+            delivery_item_binaries = save_file.read_delivery_item_binaries()
+            raid_priority = save_file.read_event_priority()
+            raid_block = save_file.read_raid_block()
 
         print("Save Info:")
         print(my_status)
@@ -289,20 +292,17 @@ class Application(customtkinter.CTk):
         raid_enemy_table_arrays = [
             RaidEnemyTableArray(table) for table in raid_enemy_table_arrays
         ]
-        raid_enemy_table_arrays.append(save_file.read_event_binary())
+        raid_enemy_table_arrays.append(event_binary)
 
         raid_item_table_arrays = cached_tables[1]
         raid_item_table_arrays = (
             RaidFixedRewardItemArray(raid_item_table_arrays[0]),
             RaidLotteryRewardItemArray(raid_item_table_arrays[1]),
-            *save_file.read_delivery_item_binaries(),
+            *delivery_item_binaries,
         )
 
-        raid_priority = save_file.read_event_priority()
-
-        raid_block = save_file.read_raid_block()
         raid_block.initialize_data(
-            raid_enemy_table_arrays,
+            EncounterIndex(raid_enemy_table_arrays),
             raid_item_table_arrays,
             progress,
             my_status.game,
@@ -323,7 +323,13 @@ class Application(customtkinter.CTk):
                     for k in obj.__slots__
                     if hasattr(obj, k) and not k.startswith("_")
                 }
-            return {k: v for k, v in obj.__dict__.items() if not k.startswith("_")}
+            serialized = {
+                k: v for k, v in obj.__dict__.items() if not k.startswith("_")
+            }
+            # rewards are generated lazily and not stored in __dict__
+            if isinstance(obj, TeraRaid):
+                serialized["rewards"] = obj.rewards
+            return serialized
 
         if not os.path.exists(get_path("./raid_dumps/")):
             os.mkdir(get_path("./raid_dumps/"))
@@ -531,12 +537,11 @@ class Application(customtkinter.CTk):
                     try:
                         raid_block_data = self.reader.read_raid_block_data()
                         break
-                    except binascii.Error as error:
-                        self.reader.read_safety = True
+                    # the stream is resynchronized before raising
+                    except FramingError as error:
                         print(f"Failed to read {i}")
                         if i == 4:
                             raise error
-                self.reader.read_safety = False
                 if render:
                     self.render_thread = self.render_raids(raid_block_data)
                 return raid_block_data
@@ -3,7 +3,44 @@ import sys
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from sv_live_map_core.save.raid_block import TeraRaid
+from sv_live_map_core.save.raid_block import TeraRaid, RaidBlock, process_raid_block
+from sv_live_map_core.save.raid_array import (
+    RAID_DTYPE,
+    generate_pokemon_array,
+    generate_raids,
+)
+from sv_live_map_core.save.encounter_index import EncounterIndex
+from sv_live_map_core.save.raid_record import RaidRecord
+from sv_live_map_core.save.save_file_9 import SaveFile9, MappedSaveFile9
+from sv_live_map_core.enums.save_block import SCTypeCode
+from sv_live_map_core.fbs.raid_fixed_reward_item_array import CompiledFixedRewardTable
+from sv_live_map_core.fbs.raid_lottery_reward_item_array import (
+    CompiledLotteryRewardTable,
+)
+from sv_live_map_core.util.raid_filter import RaidFilter
+from sv_live_map_core.util.raid_seed_searcher import RaidSeedSearcher
+from sv_live_map_core.util.raid_analyzer import (
+    RaidAnalyzer,
+    build_my_status,
+    find_inputs,
+    write_records,
+)
+from sv_live_map_core.nxreader.nxreader import NXReader, FramingError
+from sv_live_map_core.nxreader.async_nxreader import AsyncNXReader
+from sv_live_map_core.nxreader.raid_reader import RaidReader
+from sv_live_map_core.nxreader.session_replay import SessionReplay, ReplayError
+from sv_live_map_core.nxreader.sysbot_emulator import (
+    SysBotEmulator,
+    SysBotServer,
+    build_memory_image,
+    emulated_usb_endpoints,
+)
+from sv_live_map_core.rng import (
+    SCXorshift32,
+    Xoroshiro128Plus,
+    Xoroshiro128PlusBatch,
+    decrypt_into,
+)
 from sv_live_map_core.enums import (
     StarLevel,
     Species,
@@ -18,6 +55,12 @@ from sv_live_map_core.enums import (
     AbilityIndex,
     Gender,
     Nature,
+    StoryProgress,
+    Game,
+    Item,
+    RaidRewardItemCategoryType,
+    RaidRewardItemSubjectType,
+    SandwichLevel,
 )
 from sv_live_map_core.util.personal_data_handler import PersonalDataHandler
 
@@ -0,0 +1,53 @@
+"""Test AsyncNXReader request serialization"""
+# pylint: disable=import-error
+import asyncio
+from .context import AsyncNXReader
+
+
+async def serve_commands(commands: list[str]) -> asyncio.Server:
+    """Serve a minimal sys-botbase that records commands"""
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        while line := await reader.readline():
+            command, *args = line.decode().split()
+            commands.append(command)
+            if command == "peekAbsolute":
+                address, size = (int(arg, 16) for arg in args)
+                writer.write(bytes(address + i for i in range(size)).hex().encode())
+                writer.write(b"\n")
+            elif command == "clickSeq":
+                await asyncio.sleep(0.05)
+                writer.write(b"done\n")
+            await writer.drain()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+def test_concurrent_requests():
+    """Concurrent callers should each get their own response"""
+
+    async def run():
+        commands = []
+        server = await serve_commands(commands)
+        port = server.sockets[0].getsockname()[1]
+        async with AsyncNXReader("127.0.0.1", port) as reader:
+            results = await asyncio.gather(
+                reader.read_absolute(0x10, 2),
+                reader.execute_click_seq("clickSeq A,W50", 0.05),
+                reader.read_absolute(0x20, 3),
+                reader.read_absolute_int(0x30, 1),
+            )
+        server.close()
+        await server.wait_closed()
+        return commands, results
+
+    commands, results = asyncio.run(run())
+    assert results == [b"\x10\x11", True, b"\x20\x21\x22", 0x30]
+    assert commands == [
+        "configure",
+        "peekAbsolute",
+        "clickSeq",
+        "peekAbsolute",
+        "peekAbsolute",
+        "detachController",
+    ]
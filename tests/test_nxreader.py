@@ -0,0 +1,245 @@
+"""Test NXReader command handling"""
+# pylint: disable=import-error,protected-access
+from .context import NXReader, FramingError
+
+
+class MockSocket:
+    """Socket that returns data in short reads"""
+
+    def __init__(self, data: bytes, max_read: int) -> None:
+        self.data = data
+        self.max_read = max_read
+
+    def recv_into(self, buffer: memoryview) -> int:
+        """Copy at most max_read bytes into buffer"""
+        size = min(len(buffer), self.max_read, len(self.data))
+        buffer[:size] = self.data[:size]
+        self.data = self.data[size:]
+        return size
+
+
+class MockNXReader(NXReader):
+    """NXReader that records commands and replies with fixed responses"""
+
+    # pylint: disable=super-init-not-called
+    def __init__(self, responses: list[bytes]) -> None:
+        self.usb_connection = False
+        self.multi_peek = True
+        self._pointer_cache = {}
+        self.commands = []
+        self.responses = responses
+
+    def send_command(self, content: str) -> None:
+        self.commands.append(content)
+
+    def _recv(self, size: int) -> bytes:
+        response = self.responses.pop(0)
+        assert len(response) == size
+        return response
+
+
+def test_parse_pointer():
+    """Pointers should be split into a chain and a final offset"""
+    assert NXReader.parse_pointer("[[main+43A77C8]+160]+40") == (
+        (0x43A77C8, 0x160),
+        0x40,
+    )
+    assert NXReader.parse_pointer("[[[main+4385F30]+80]+8]") == (
+        (0x4385F30, 0x80, 0x8),
+        0,
+    )
+    assert NXReader.parse_pointer("[[[main+43A77B8]+20]]+5D0") == (
+        (0x43A77B8, 0x20, 0),
+        0x5D0,
+    )
+
+
+def test_pointer_cache():
+    """Pointer chains should only be resolved once until the cache is cleared"""
+    reader = MockNXReader(
+        [
+            (0x1122334400).to_bytes(8, "big"),
+            b"\x01\x02",
+            b"\x03\x04",
+            (0x55667700).to_bytes(8, "big"),
+            b"\x05\x06",
+        ]
+    )
+    assert reader.read_pointer("[[main+43A77C8]+160]+40", 2) == b"\x01\x02"
+    assert reader.read_pointer("[[main+43A77C8]+160]+48", 2) == b"\x03\x04"
+    reader.clear_pointer_cache()
+    assert reader.read_pointer("[[main+43A77C8]+160]+40", 2) == b"\x05\x06"
+    assert reader.commands == [
+        "pointerAll 0x43A77C8 0x160 0x0",
+        "peekAbsolute 0x1122334440 0x2",
+        "peekAbsolute 0x1122334448 0x2",
+        "pointerAll 0x43A77C8 0x160 0x0",
+        "peekAbsolute 0x55667740 0x2",
+    ]
+
+
+def test_pointer_cache_null():
+    """Chains that could not be followed should not be resolved again"""
+    reader = MockNXReader([bytes(8), b"\x01\x02", b"\x03\x04"])
+    assert reader.read_pointer("[[main+43A77C8]+160]+40", 2) == b"\x01\x02"
+    assert reader.read_pointer("[[main+43A77C8]+160]+40", 2) == b"\x03\x04"
+    assert reader.commands == [
+        "pointerAll 0x43A77C8 0x160 0x0",
+        "pointerPeek 0x2 0x43A77C8 0x160 0x40",
+        "pointerPeek 0x2 0x43A77C8 0x160 0x40",
+    ]
+
+
+def test_read_multi():
+    """Regions should be grouped into multi peeks after pipelined resolution"""
+    reader = MockNXReader(
+        [
+            (0x1000).to_bytes(8, "big"),
+            (0x2000).to_bytes(8, "big"),
+            b"\x01\x02\x03\x04\x05",
+            b"\x06",
+        ]
+    )
+    assert reader.read_multi(
+        [
+            ("pointer", "[[main+10]+20]+4", 2),
+            ("main", 0x30, 1),
+            ("pointer", "[main+40]+8", 1),
+            ("absolute", 0x3000, 2),
+        ]
+    ) == [b"\x01\x02", b"\x06", b"\x03", b"\x04\x05"]
+    assert reader.commands == [
+        "pointerAll 0x10 0x20 0x0",
+        "pointerAll 0x40 0x0",
+        "peekAbsoluteMulti 0x1004 0x2 0x2008 0x1 0x3000 0x2",
+        "peekMainMulti 0x30 0x1",
+    ]
+
+
+def test_read_multi_pipelined():
+    """Without multi peek support each region should be its own command"""
+    reader = MockNXReader([b"\x01", b"\x02\x03", b"\x04"])
+    reader.multi_peek = False
+    assert reader.read_multi(
+        [("heap", 0x10, 1), ("heap", 0x20, 2), ("main", 0x30, 1)]
+    ) == [b"\x01", b"\x02\x03", b"\x04"]
+    assert reader.commands == [
+        "peek 0x10 0x1",
+        "peek 0x20 0x2",
+        "peekMain 0x30 0x1",
+    ]
+
+
+def test_recv_into_buffer():
+    """Hex responses should be decoded from the reused receive buffer"""
+    reader = NXReader.__new__(NXReader)
+    reader.usb_connection = False
+    reader.replay = reader.recorder = None
+    reader._recv_buffer = bytearray(4)
+    payload = bytes(range(256)) * 8
+    reader.socket = MockSocket(payload.hex().upper().encode() + b"\n", 700)
+    assert reader._recv(len(payload)) == payload
+    buffer = reader._recv_buffer
+    reader.socket = MockSocket(b"0102\n", 700)
+    assert reader._recv(2) == b"\x01\x02"
+    assert reader._recv_buffer is buffer
+
+
+class MockSwitchSocket:
+    """Socket that answers peeks with fixed responses after stale data"""
+
+    def __init__(self, stale: bytes, responses: dict[str, bytes]) -> None:
+        self.data = bytearray(stale)
+        self.responses = responses
+        self.commands = []
+
+    def sendall(self, content: bytes) -> None:
+        """Queue the response of a command"""
+        command = content.decode().strip()
+        self.commands.append(command)
+        if command.startswith("peekMain 0x0 "):
+            size = int(command.split()[-1], 16)
+            self.data += bytes(size).hex().encode() + b"\n"
+        elif command in self.responses:
+            self.data += self.responses[command].hex().encode() + b"\n"
+
+    def recv(self, size: int) -> bytes:
+        """Pop at most size bytes"""
+        data = bytes(self.data[:size])
+        del self.data[:size]
+        return data
+
+    def recv_into(self, buffer: memoryview) -> int:
+        """Pop bytes into buffer"""
+        data = self.recv(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+
+def test_pipeline_resync():
+    """Misframed responses should be resynchronized and the reads retried"""
+    reader = NXReader.__new__(NXReader)
+    reader.usb_connection = False
+    reader.replay = reader.recorder = None
+    reader._recv_buffer = bytearray(4)
+    reader._queued_commands = []
+    reader.socket = MockSwitchSocket(
+        b"AB\n",
+        {"peek 0x10 0x2": b"\x01\x02", "peek 0x20 0x2": b"\x03\x04"},
+    )
+    reader.queue_command("peek 0x10 0x2", 2)
+    reader.queue_command("click A")
+    reader.queue_command("peek 0x20 0x2", 2)
+    assert reader.send_queued() == [b"\x01\x02", None, b"\x03\x04"]
+    assert reader.socket.commands == [
+        "peek 0x10 0x2",
+        "click A",
+        "peek 0x20 0x2",
+        f"peekMain 0x0 0x{NXReader.SYNC_SIZE:X}",
+        "peek 0x10 0x2",
+        "peek 0x20 0x2",
+    ]
+    assert not reader.socket.data
+    reader.socket.data += b"0Z\n"
+    try:
+        reader._recv(1)
+        assert False, "Non-hex response should not be decoded"
+    except FramingError:
+        pass
+
+
+class FlakySwitchSocket(MockSwitchSocket):
+    """Switch socket that corrupts the first failures responses to peeks"""
+
+    def __init__(self, responses: dict[str, bytes], failures: int) -> None:
+        super().__init__(b"", responses)
+        self.failures = failures
+
+    def sendall(self, content: bytes) -> None:
+        """Queue the response of a command, corrupted while failing"""
+        super().sendall(content)
+        if self.failures and content.decode().startswith("peek "):
+            self.failures -= 1
+            self.data[-2:-1] = b"Z"
+
+
+def test_pipeline_retry_resync():
+    """A failed retry should leave the stream in sync for the next read"""
+    reader = NXReader.__new__(NXReader)
+    reader.usb_connection = False
+    reader.replay = reader.recorder = None
+    reader._recv_buffer = bytearray(4)
+    reader._queued_commands = []
+    reader.socket = FlakySwitchSocket(
+        {"peek 0x10 0x2": b"\x01\x02", "peek 0x20 0x2": b"\x03\x04"}, 3
+    )
+    reader.queue_command("peek 0x10 0x2", 2)
+    reader.queue_command("peek 0x20 0x2", 2)
+    try:
+        reader.send_queued()
+        assert False, "Misframed retries should raise"
+    except FramingError:
+        pass
+    assert not reader.socket.data
+    reader.queue_command("peek 0x20 0x2", 2)
+    assert reader.send_queued() == [b"\x03\x04"]
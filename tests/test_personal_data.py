@@ -0,0 +1,61 @@
+"""Test personal data lookups"""
+# pylint: disable=import-error,protected-access
+import json
+import os
+import pytest
+from .context import (
+    PersonalDataHandler,
+    Species,
+    Ability,
+    AbilityIndex,
+    Gender,
+    GenderGeneration,
+)
+
+
+def test_personal_data_lookups():
+    """Ordinal tables should match the personal data json"""
+    with open(
+        os.path.join(
+            os.path.dirname(__file__), "../resources/personal_data_partial.json"
+        ),
+        "r",
+        encoding="utf-8",
+    ) as personal_data_json:
+        personal_data = json.load(personal_data_json)
+    for key, data in personal_data.items():
+        species, form = (int(value) for value in key.split("-"))
+        species = Species(species)
+        assert PersonalDataHandler.get_data(species, form) == data
+        assert PersonalDataHandler.fixed_gender(species, form) == GenderGeneration(
+            data["gender_group"]
+        )
+        assert PersonalDataHandler.get_gender(species, form, 49) == Gender(
+            49 < data["gender_ratio"]
+        )
+        for index in AbilityIndex:
+            assert PersonalDataHandler.get_ability(species, form, index) == Ability(
+                data["abilities"][index]
+            )
+    with pytest.raises(KeyError):
+        PersonalDataHandler.get_data(Species.PIKACHU, 99)
+    with pytest.raises(KeyError):
+        PersonalDataHandler.get_ordinal(Species.PIKACHU, -1)
+
+
+def test_personal_data_binary(tmp_path):
+    """Prebuilt binaries should load the same tables"""
+    tables = (
+        PersonalDataHandler._form_offsets,
+        PersonalDataHandler._gender_groups,
+        PersonalDataHandler._gender_ratios,
+        PersonalDataHandler._abilities,
+    )
+    PersonalDataHandler.save_binary(str(tmp_path / "personal_data.npz"))
+    PersonalDataHandler(str(tmp_path / "personal_data.npz"))
+    assert tables == (
+        PersonalDataHandler._form_offsets,
+        PersonalDataHandler._gender_groups,
+        PersonalDataHandler._gender_ratios,
+        PersonalDataHandler._abilities,
+    )
@@ -0,0 +1,89 @@
+"""Test headless raid analyzer"""
+# pylint: disable=import-error
+import io
+import json
+from .context import (
+    RaidAnalyzer,
+    RaidBlock,
+    RaidFilter,
+    TeraRaid,
+    Game,
+    Species,
+    StoryProgress,
+    build_my_status,
+    find_inputs,
+    write_records,
+)
+from .test_raid_array import SEEDS, mock_encounter_index
+
+
+def test_build_my_status():
+    """Trainer info for dumps should be built from ids"""
+    my_status = build_my_status(17328, 4753, Game.VIOLET)
+    assert my_status.full_id == (4753 << 16) | 17328
+    assert my_status.game == Game.VIOLET
+
+
+def test_find_inputs(tmp_path):
+    """Dumps and saves should be found recursively"""
+    for path in (
+        "raid_dumps/20230101-000000/raid_block.bin",
+        "raid_dumps/20230101-000000/raid_block.json",
+        "saves/a/main",
+        "saves/b/main.bak",
+        "saves/b/backup",
+    ):
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_bytes(b"")
+    assert [
+        path[len(str(tmp_path)) + 1 :].replace("\\", "/")
+        for path in find_inputs(str(tmp_path))
+    ] == [
+        "raid_dumps/20230101-000000/raid_block.bin",
+        "saves/a/main",
+        "saves/b/main.bak",
+    ]
+
+
+def test_match_raids():
+    """Only enabled raids that match a filter should be serialized"""
+    analyzer = RaidAnalyzer.__new__(RaidAnalyzer)
+    analyzer.filters = [RaidFilter(species_filter=[Species.PIKACHU])]
+    analyzer.include_rewards = False
+    raid_block = RaidBlock(
+        current_seed=0,
+        tomorrow_seed=0,
+        raids=[
+            TeraRaid(
+                is_enabled=i % 4 != 0,
+                area_id=1,
+                display_type=0,
+                den_id=i,
+                seed=seed,
+                _unused_14=0,
+                content=0,
+                collected_league_points=0,
+            )
+            for i, seed in enumerate(SEEDS[:72].tolist())
+        ],
+    )
+    matches = analyzer.match_raids(
+        "raid_block.bin",
+        raid_block,
+        mock_encounter_index(),
+        None,
+        StoryProgress.SIX_STAR_UNLOCKED,
+        Game.SCARLET,
+        build_my_status(0, 0, Game.SCARLET),
+        (0,) * 11,
+    )
+    assert matches
+    assert all(match["species"] == "Pikachu" for match in matches)
+    assert all(int(match["location"].split("-")[1]) % 4 != 0 for match in matches)
+
+    output = io.StringIO()
+    write_records(matches, output, "jsonl")
+    assert [json.loads(line) for line in output.getvalue().splitlines()] == matches
+    output = io.StringIO()
+    write_records(matches, output, "csv")
+    assert len(output.getvalue().splitlines()) == len(matches) + 1
@@ -0,0 +1,411 @@
+"""Test vectorized TeraRaid generation"""
+# pylint: disable=import-error
+import numpy as np
+from .context import (
+    TeraRaid,
+    RaidBlock,
+    RaidRecord,
+    process_raid_block,
+    Xoroshiro128Plus,
+    RaidFilter,
+    RaidSeedSearcher,
+    EncounterIndex,
+    generate_pokemon_array,
+    generate_raids,
+    RAID_DTYPE,
+    Species,
+    GenderGeneration,
+    NatureGeneration,
+    AbilityGeneration,
+    IVGeneration,
+    ShinyGeneration,
+    TeraTypeGeneration,
+    StarLevel,
+    StoryProgress,
+    Game,
+)
+from .test_raid_generation import (
+    MockMyStatus9,
+    MockParamSet,
+    MockPokeDataBattle,
+    MockRaidEnemyInfo,
+)
+
+SEEDS = np.arange(0x11223344, 0x11223344 + 0x800, dtype=np.uint64)
+MOCK_POKE_DATA_BATTLES = (
+    MockPokeDataBattle(dev_id=Species.PIKACHU, form_id=0),
+    MockPokeDataBattle(dev_id=Species.MAUSHOLD, form_id=0, talent_vnum=3),
+    MockPokeDataBattle(dev_id=Species.TOXTRICITY, form_id=0, talent_vnum=4),
+    MockPokeDataBattle(
+        dev_id=Species.TOXTRICITY,
+        form_id=1,
+        talent_type=IVGeneration.RANDOM_IVS,
+        tokusei=AbilityGeneration.RANDOM_12HA,
+    ),
+    MockPokeDataBattle(
+        dev_id=Species.CHARIZARD,
+        form_id=0,
+        talent_type=IVGeneration.SET_IVS,
+        talent_value=MockParamSet(31, 31, 31, 31, 31, 31),
+        sex=GenderGeneration.MALE,
+        seikaku=NatureGeneration.MODEST,
+        tokusei=AbilityGeneration.ABILITY_HA,
+        rare_type=ShinyGeneration.SHINY_LOCKED,
+        gem_type=TeraTypeGeneration.DRAGON,
+    ),
+    MockPokeDataBattle(
+        dev_id=Species.EEVEE,
+        form_id=0,
+        talent_vnum=6,
+        rare_type=ShinyGeneration.FORCED_SHINY,
+    ),
+)
+
+
+class MockRaidEnemyTable:
+    """Mock version of RaidEnemyTable"""
+
+    def __init__(self, raid_enemy_info: MockRaidEnemyInfo) -> None:
+        self.raid_enemy_info = raid_enemy_info
+
+
+class MockRaidEnemyTableArray:
+    """Mock version of RaidEnemyTableArray"""
+
+    def __init__(self, raid_enemy_tables: list[MockRaidEnemyTable]) -> None:
+        self.raid_enemy_tables = raid_enemy_tables
+
+
+def mock_encounter_index() -> EncounterIndex:
+    """EncounterIndex over mock tables for every difficulty"""
+    raid_enemy_table_arrays = []
+    for difficulty in range(7):
+        tables = []
+        for rate, boss_poke_para in zip((10, 25, 5, 40, 20, 3), MOCK_POKE_DATA_BATTLES):
+            info = MockRaidEnemyInfo(boss_poke_para=boss_poke_para)
+            info.rate = rate + difficulty
+            info.rom_ver = Game.VIOLET if rate == 5 else Game.BOTH
+            info.delivery_group_id = rate % 3 if difficulty == 6 else None
+            tables.append(MockRaidEnemyTable(info))
+        raid_enemy_table_arrays.append(MockRaidEnemyTableArray(tables))
+    return EncounterIndex(raid_enemy_table_arrays)
+
+
+def scalar_raid(seed: int, info: MockRaidEnemyInfo, my_status) -> TeraRaid:
+    """Generate a single raid via TeraRaid"""
+    raid = TeraRaid(
+        is_enabled=1,
+        area_id=0,
+        display_type=0,
+        den_id=0,
+        seed=seed,
+        _unused_14=0,
+        content=0,
+        collected_league_points=0,
+    )
+    raid.my_status = my_status
+    raid.generate_pokemon(info)
+    return raid
+
+
+def generate_from_slots(
+    raid: TeraRaid,
+    rng_slot: Xoroshiro128Plus,
+    tables: list[MockRaidEnemyTable],
+    encounter_slot_total: int,
+) -> None:
+    """Reference slot selection that walks the tables one rate at a time"""
+    encounter_slot_rand = rng_slot.rand(encounter_slot_total)
+    for table in tables:
+        if encounter_slot_rand < table.raid_enemy_info.rate:
+            raid.generate_pokemon(table.raid_enemy_info)
+            break
+        encounter_slot_rand -= table.raid_enemy_info.rate
+
+
+def test_generate_pokemon_array_matches_scalar():
+    """generate_pokemon_array should match TeraRaid.generate_pokemon"""
+    my_status = MockMyStatus9(tid=17328, sid=4753)
+    for boss_poke_para in MOCK_POKE_DATA_BATTLES:
+        info = MockRaidEnemyInfo(boss_poke_para=boss_poke_para)
+        raids = generate_pokemon_array(SEEDS, info, my_status.full_id)
+        for row in raids[::7]:
+            raid = scalar_raid(int(row["seed"]), info, my_status)
+            assert row["tera_type"] == raid.tera_type
+            assert row["encryption_constant"] == raid.encryption_constant
+            assert row["pid"] == raid.pid
+            assert row["is_shiny"] == raid.is_shiny
+            assert tuple(row["ivs"]) == raid.ivs
+            assert row["ability_index"] == raid.ability_index
+            assert row["ability"] == raid.ability
+            assert row["gender"] == raid.gender
+            assert row["nature"] == raid.nature
+            assert row["height"] == raid.height
+            assert row["weight"] == raid.weight
+            assert row["scale"] == raid.scale
+
+
+def mock_seed_searcher(**kwargs) -> RaidSeedSearcher:
+    """RaidSeedSearcher over mock four star tables"""
+    tables = []
+    for rate, boss_poke_para in zip((10, 25, 5, 40, 20, 0), MOCK_POKE_DATA_BATTLES):
+        info = MockRaidEnemyInfo(boss_poke_para=boss_poke_para)
+        info.rate = rate
+        info.rom_ver = Game.BOTH
+        info.delivery_group_id = None
+        tables.append(MockRaidEnemyTable(info))
+    raid_filter = RaidFilter(
+        hp_filter=range(20, 32),
+        atk_filter=range(0, 32),
+        def_filter=range(0, 32),
+        spa_filter=range(0, 32),
+        spd_filter=range(0, 32),
+        spe_filter=range(0, 32),
+        species_filter=[Species.PIKACHU, Species.MAUSHOLD, Species.TOXTRICITY],
+        star_filter=[StarLevel.FOUR_STAR],
+    )
+    return RaidSeedSearcher(
+        MockRaidEnemyTableArray(tables),
+        StarLevel.FOUR_STAR,
+        StoryProgress.SIX_STAR_UNLOCKED,
+        Game.SCARLET,
+        raid_filter,
+        **kwargs,
+    )
+
+
+def test_seed_searcher_matches_scalar():
+    """RaidSeedSearcher should find exactly the seeds TeraRaid generates"""
+    searcher = mock_seed_searcher()
+    raid_filter = searcher.raid_filter
+    tables = searcher.encounter_slots
+    found = searcher.search_seeds(SEEDS)["seed"].tolist()
+
+    my_status = MockMyStatus9(tid=0, sid=0)
+    expected = []
+    for seed in SEEDS.tolist():
+        raid = TeraRaid(
+            is_enabled=1,
+            area_id=0,
+            display_type=0,
+            den_id=0,
+            seed=seed,
+            _unused_14=0,
+            content=0,
+            collected_league_points=0,
+        )
+        raid.is_event = False
+        raid.my_status = my_status
+        rng_slot = Xoroshiro128Plus(seed)
+        raid.difficulty = raid.rand_difficulty(
+            StoryProgress.SIX_STAR_UNLOCKED, rng_slot
+        )
+        if raid.difficulty != StarLevel.FOUR_STAR:
+            continue
+        generate_from_slots(raid, rng_slot, tables, 100)
+        if (
+            raid.species in raid_filter.species_filter
+            and raid.ivs[0] in raid_filter.hp_filter
+        ):
+            expected.append(seed)
+    assert expected
+    assert sorted(found) == expected
+
+
+def test_generate_raids_matches_scalar():
+    """generate_raids should match TeraRaid for mixed content and events"""
+    encounter_index = mock_encounter_index()
+    my_status = MockMyStatus9(tid=17328, sid=4753)
+    content = np.arange(len(SEEDS)) % 3
+    delivery_group_ids = np.where(content == 2, np.arange(len(SEEDS)) % 2 + 1, -1)
+    raids = generate_raids(
+        SEEDS,
+        content,
+        encounter_index,
+        StoryProgress.FIVE_STAR_UNLOCKED,
+        Game.SCARLET,
+        my_status.full_id,
+        delivery_group_ids,
+    )
+    for row, den_content, delivery_group_id in zip(
+        raids, content.tolist(), delivery_group_ids.tolist()
+    ):
+        raid = TeraRaid(
+            is_enabled=1,
+            area_id=0,
+            display_type=0,
+            den_id=0,
+            seed=int(row["seed"]),
+            _unused_14=0,
+            content=den_content,
+            collected_league_points=0,
+        )
+        raid.is_event = den_content >= 2
+        raid.delivery_group_id = delivery_group_id
+        raid.my_status = my_status
+        rng_slot = Xoroshiro128Plus(raid.seed)
+        raid.difficulty = raid.rand_difficulty(
+            StoryProgress.FIVE_STAR_UNLOCKED, rng_slot
+        )
+        encounter_slots = encounter_index.get(
+            raid.difficulty,
+            StoryProgress.FIVE_STAR_UNLOCKED,
+            Game.SCARLET,
+            delivery_group_id,
+        )
+        raid.generate_pokemon(
+            encounter_slots.select(rng_slot.rand(encounter_slots.total)).raid_enemy_info
+        )
+        for name in RAID_DTYPE.names:
+            if name == "ivs":
+                assert tuple(row["ivs"]) == raid.ivs
+            else:
+                assert row[name] == getattr(raid, name), name
+
+
+def mock_raid_block(seeds: list[int]) -> RaidBlock:
+    """Build a raid block of enabled raids with seeds"""
+    return RaidBlock(
+        current_seed=0,
+        tomorrow_seed=0,
+        raids=[
+            TeraRaid(
+                is_enabled=1,
+                area_id=1,
+                display_type=0,
+                den_id=i,
+                seed=seed,
+                _unused_14=0,
+                content=i % 2,
+                collected_league_points=0,
+            )
+            for i, seed in enumerate(seeds)
+        ],
+    )
+
+
+def test_incremental_raid_block():
+    """Incremental derivation should only regenerate changed raids"""
+    encounter_index = mock_encounter_index()
+    my_status = MockMyStatus9(tid=17328, sid=4753)
+    derivation_args = (
+        encounter_index,
+        None,
+        StoryProgress.FIVE_STAR_UNLOCKED,
+        Game.SCARLET,
+        my_status,
+        (0,) * 11,
+    )
+
+    seeds = SEEDS[:72].tolist()
+    previous_block = mock_raid_block(seeds)
+    previous_block.initialize_data(*derivation_args)
+    # mark derived data so that reuse can be detected
+    for raid in previous_block.raids:
+        raid.height = -1
+
+    seeds[5] ^= 0xFFFF
+    seeds[40] ^= 0xFFFF
+    raid_block = mock_raid_block(seeds)
+    raid_block.initialize_data(*derivation_args, previous_block)
+    full_block = mock_raid_block(seeds)
+    full_block.initialize_data(*derivation_args)
+    for i, (raid, full_raid) in enumerate(zip(raid_block.raids, full_block.raids)):
+        if i in (5, 40):
+            assert raid.height == full_raid.height
+        else:
+            assert raid.height == -1
+        assert raid.species == full_raid.species
+        assert raid.pid == full_raid.pid
+        assert raid.ivs == full_raid.ivs
+        assert raid.id_str == full_raid.id_str
+
+    # a different context should regenerate everything
+    raid_block = mock_raid_block(seeds)
+    raid_block.initialize_data(
+        *derivation_args[:2], StoryProgress.SIX_STAR_UNLOCKED, *derivation_args[3:]
+    )
+    raid_block_reused = mock_raid_block(seeds)
+    raid_block_reused.initialize_data(
+        *derivation_args[:2],
+        StoryProgress.SIX_STAR_UNLOCKED,
+        *derivation_args[3:],
+        previous_block,
+    )
+    assert all(raid.height != -1 for raid in raid_block_reused.raids)
+    assert [raid.pid for raid in raid_block.raids] == [
+        raid.pid for raid in raid_block_reused.raids
+    ]
+
+
+def test_process_raid_block():
+    """Raw raid blocks should be parsed into 72 raids"""
+    raid_block = process_raid_block(
+        (0x1122334455667788).to_bytes(8, "little")
+        + bytes(8)
+        + b"".join(
+            bytes(0x10) + i.to_bytes(4, "little") + bytes(0xC) for i in range(72)
+        )
+    )
+    assert raid_block.current_seed == 0x1122334455667788
+    assert [raid.seed for raid in raid_block.raids] == list(range(72))
+
+
+def test_raid_record():
+    """Records should hold the same derived data as their raids"""
+    raid_block = mock_raid_block(SEEDS[:72].tolist())
+    raid_block.initialize_data(
+        mock_encounter_index(),
+        None,
+        StoryProgress.FIVE_STAR_UNLOCKED,
+        Game.SCARLET,
+        MockMyStatus9(tid=17328, sid=4753),
+        (0,) * 11,
+    )
+    records = raid_block.to_records()
+    for raid, record in zip(raid_block.raids, records):
+        assert record.raid_enemy_info is raid.raid_enemy_info
+        for name in (
+            "id_str",
+            "seed",
+            "species",
+            "form",
+            "difficulty",
+            "tera_type",
+            "pid",
+            "is_shiny",
+            "ivs",
+            "ability_index",
+            "ability",
+            "gender",
+            "nature",
+            "height",
+            "weight",
+            "scale",
+        ):
+            assert getattr(record, name) == getattr(raid, name)
+    assert not hasattr(records[0], "__dict__")
+    assert isinstance(records[0], RaidRecord)
+
+
+def test_seed_searcher_resume(tmp_path):
+    """Resumed searches should return every seed without duplicating results"""
+    searcher = mock_seed_searcher(chunk_size=1 << 16)
+    last_chunk = searcher.chunk_count - 1
+    last_seeds = searcher.search_chunk(last_chunk)["seed"].tolist()
+    assert last_seeds
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+    searcher.save_checkpoint(checkpoint_path, set(range(last_chunk)))
+    # stopped after writing part of the last chunk's results
+    results_path = tmp_path / "results.txt"
+    results_path.write_text(
+        "00000001\n"
+        + "".join(f"{seed:08X}\n" for seed in last_seeds[:2])
+        + f"{last_seeds[2]:08X}"[:4],
+        encoding="utf-8",
+    )
+    expected = sorted([1, *last_seeds])
+    assert searcher.search(str(results_path), checkpoint_path, processes=1) == expected
+    lines = results_path.read_text(encoding="utf-8").splitlines()
+    assert sorted(int(line, 16) for line in lines) == expected
+    assert searcher.load_checkpoint(checkpoint_path) == set(range(searcher.chunk_count))
@@ -0,0 +1,82 @@
+"""Test precompiled raid reward tables"""
+# pylint: disable=import-error,too-few-public-methods
+from .context import (
+    CompiledFixedRewardTable,
+    CompiledLotteryRewardTable,
+    Item,
+    RaidRewardItemCategoryType,
+    RaidRewardItemSubjectType,
+    SandwichLevel,
+    Species,
+    TeraType,
+)
+
+
+class MockRewardItemInfo:
+    """Mock RaidFixedRewardItemInfo/RaidLotteryRewardItemInfo"""
+
+    def __init__(
+        self,
+        item_id: Item = None,
+        category: RaidRewardItemCategoryType = None,
+        num: int = 1,
+        subject_type: RaidRewardItemSubjectType = None,
+        rate: int = None,
+    ):
+        self.item_id = item_id
+        self.category = category
+        self.num = num
+        self.subject_type = subject_type
+        self.rate = rate
+
+
+def test_fixed_reward_table():
+    """Fixed tables should skip empty items and resolve categories"""
+    table = CompiledFixedRewardTable(
+        (
+            MockRewardItemInfo(Item.RARE_CANDY, num=2),
+            MockRewardItemInfo(Item.NONE, RaidRewardItemCategoryType.ITEM),
+            MockRewardItemInfo(
+                Item.NONE,
+                RaidRewardItemCategoryType.GEM,
+                num=3,
+                subject_type=RaidRewardItemSubjectType.HOST,
+            ),
+        )
+    )
+    assert table.rewards(Species.PIKACHU, TeraType.NORMAL) == (
+        (Item.RARE_CANDY, 2, RaidRewardItemSubjectType.ALL, SandwichLevel.NONE),
+        (
+            Item.NORMAL_TERA_SHARD,
+            3,
+            RaidRewardItemSubjectType.HOST,
+            SandwichLevel.NONE,
+        ),
+    )
+
+
+def test_lottery_reward_table():
+    """Lottery selection should match walking the table linearly"""
+    reward_items = (
+        MockRewardItemInfo(Item.RARE_CANDY, rate=5),
+        MockRewardItemInfo(Item.PP_UP, rate=0),
+        MockRewardItemInfo(Item.NONE, RaidRewardItemCategoryType.ITEM, rate=3),
+        MockRewardItemInfo(Item.NONE, RaidRewardItemCategoryType.GEM, rate=7),
+        MockRewardItemInfo(Item.NUGGET, rate=1),
+    )
+    table = CompiledLotteryRewardTable(reward_items)
+    assert table.lot_sum == 16
+    outputs = table.outputs(Species.PIKACHU, TeraType.FIRE)
+    for item_rand in range(table.lot_sum):
+        remaining = item_rand
+        for index, item_info in enumerate(reward_items):
+            if remaining < item_info.rate:
+                break
+            remaining -= item_info.rate
+        assert table.select(item_rand) == index
+    assert [outputs[table.select(item_rand)] for item_rand in (0, 5, 8, 15)] == [
+        (Item.RARE_CANDY, 1),
+        None,
+        (Item.FIRE_TERA_SHARD, 1),
+        (Item.NUGGET, 1),
+    ]
@@ -0,0 +1,99 @@
+"""Test pseudorandom number generators"""
+# pylint: disable=import-error,protected-access
+import numpy as np
+from .context import (
+    SCXorshift32,
+    Xoroshiro128Plus,
+    Xoroshiro128PlusBatch,
+    decrypt_into,
+)
+
+SEEDS = (0x0, 0x1, 0x11223344, 0x88776655, 0xDEADBEEF, 0xFFFFFFFF)
+
+
+def test_xoroshiro_known_values():
+    """Xoroshiro128Plus should match known outputs"""
+    rng = Xoroshiro128Plus(0xDEADBEEF)
+    assert [rng.next() for _ in range(3)] == [
+        0x82A2B176014B294A,
+        0xB924778C1BDB0373,
+        0xB31EA2E48059C15D,
+    ]
+    assert [
+        rng.rand(maximum) for maximum in (2, 3, 6, 18, 25, 32, 100, 0x80, 0x81)
+    ] == [1, 0, 0, 3, 18, 7, 92, 118, 110]
+
+
+def test_xoroshiro_masks():
+    """Precomputed masks should match computed masks"""
+    for maximum in range(1, 0x200):
+        assert Xoroshiro128Plus.get_mask(maximum) == int(
+            Xoroshiro128PlusBatch.get_mask(maximum)
+        )
+    for maximum, mask in Xoroshiro128Plus._MASKS.items():
+        assert Xoroshiro128Plus.get_mask(maximum) == mask
+
+
+def test_xorshift_known_values():
+    """SCXorshift32 should match known outputs"""
+    rng = SCXorshift32(0xCAAC8800)
+    assert [rng.next() for _ in range(6)] == [0xD9, 0x5C, 0xD3, 0xB7, 0x81, 0xDE]
+    assert rng.next_32() == 0xB06EB74E
+    rng = SCXorshift32(0xE3E89BD1)
+    assert [rng.next_32() for _ in range(3)] == [0x3C0E879C, 0x6C05A185, 0x8FE47FB7]
+
+
+def test_batch_next_matches_scalar():
+    """Batched next() should match the scalar implementation lane by lane"""
+    batch_rng = Xoroshiro128PlusBatch(np.array(SEEDS))
+    scalar_rngs = [Xoroshiro128Plus(seed) for seed in SEEDS]
+    for _ in range(10):
+        assert batch_rng.next().tolist() == [rng.next() for rng in scalar_rngs]
+
+
+def test_batch_rand_matches_scalar():
+    """Batched rand() should match the scalar implementation, including rejections"""
+    batch_rng = Xoroshiro128PlusBatch(np.array(SEEDS))
+    scalar_rngs = [Xoroshiro128Plus(seed) for seed in SEEDS]
+    for maximum in (0xFFFFFFFF, 100, 18, 6, 3, 25, 0x81, 0x80, 2, 32):
+        assert batch_rng.rand(maximum).tolist() == [
+            rng.rand(maximum) for rng in scalar_rngs
+        ]
+
+
+def test_batch_rand_active_lanes():
+    """Lanes outside of the active mask should not be advanced"""
+    batch_rng = Xoroshiro128PlusBatch(np.array(SEEDS))
+    scalar_rngs = [Xoroshiro128Plus(seed) for seed in SEEDS]
+    active = np.array([True, False, True, False, True, False])
+    result = batch_rng.rand(6, active)
+    for lane, rng in enumerate(scalar_rngs):
+        if active[lane]:
+            assert result[lane] == rng.rand(6)
+        else:
+            assert result[lane] == 0
+    assert batch_rng.rand(100).tolist() == [rng.rand(100) for rng in scalar_rngs]
+
+
+def test_xorshift_keystream():
+    """Keystreams should match byte by byte generation from any counter"""
+    for key in (0xCAAC8800, 0xE3E89BD1, 0x0):
+        for skip in range(5):
+            for size in (0, 1, 3, 4, 5, 0x101):
+                rng = SCXorshift32(key)
+                expected_rng = SCXorshift32(key)
+                for _ in range(skip):
+                    rng.next()
+                    expected_rng.next()
+                assert rng.keystream(size) == bytes(
+                    expected_rng.next() for _ in range(size)
+                )
+                assert rng.next_32() == expected_rng.next_32()
+
+
+def test_decrypt_into():
+    """decrypt_into should XOR a whole block with its key's keystream"""
+    block = bytearray(range(256)) * 3
+    decrypt_into(block, 0xE3E89BD1)
+    rng = SCXorshift32(0xE3E89BD1)
+    assert block == bytearray(byte ^ rng.next() for byte in bytearray(range(256)) * 3)
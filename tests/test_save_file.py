@@ -0,0 +1,124 @@
+"""Test save file decryption"""
+# pylint: disable=import-error
+import random
+import struct
+from .context import SaveFile9, MappedSaveFile9, SCTypeCode, decrypt_into
+
+
+def encrypt_block(key: int, block_type: SCTypeCode, payload: bytes = b"") -> bytes:
+    """Encrypt a single save block"""
+    data = bytearray(bytes((block_type,)) + payload)
+    decrypt_into(data, key)
+    return key.to_bytes(4, "little") + data
+
+
+def build_save(blocks: list[bytes]) -> bytearray:
+    """Build an encrypted save from encrypted blocks"""
+    save_data = bytearray(b"".join(blocks) + bytes(0x20))
+    SaveFile9.xor_static_pad_reference(save_data, len(save_data) - 0x20)
+    return save_data
+
+
+def test_xor_static_pad_matches_reference():
+    """Vectorized static xorpad should match the byte by byte loop"""
+    rand = random.Random(0x9)
+    for size in (0, 1, 0x7F, 0x80, 0x81, 0x1000, 0x12345):
+        data = bytearray(rand.randbytes(size + 0x20))
+        expected = bytearray(data)
+        SaveFile9.xor_static_pad(data, size)
+        SaveFile9.xor_static_pad_reference(expected, size)
+        assert data == expected
+
+
+def test_decrypt_main_keeps_footer():
+    """decrypt_main should leave the 0x20 byte footer untouched"""
+    data = bytearray(range(256)) * 4
+    save_file = SaveFile9(bytearray(data))
+    expected = bytearray(data)
+    SaveFile9.xor_static_pad_reference(expected, len(data) - 0x20)
+    assert save_file.save_data == expected
+    assert save_file.save_data[-0x20:] == data[-0x20:]
+
+
+def build_test_save() -> bytearray:
+    """Build an encrypted save with one block of several types"""
+    object_payload = bytes(range(0x40))
+    return build_save(
+        [
+            encrypt_block(0x1111, SCTypeCode.BOOL_TRUE),
+            encrypt_block(
+                0x2222,
+                SCTypeCode.OBJECT,
+                len(object_payload).to_bytes(4, "little") + object_payload,
+            ),
+            encrypt_block(
+                0x3333,
+                SCTypeCode.ARRAY,
+                (3).to_bytes(4, "little") + bytes((SCTypeCode.U16,)) + bytes(range(6)),
+            ),
+            encrypt_block(0x1234, SCTypeCode.BOOL_FALSE),
+            encrypt_block(0x4444, SCTypeCode.U32, (0xDEADBEEF).to_bytes(4, "little")),
+            encrypt_block(
+                0x5555,
+                SCTypeCode.ARRAY,
+                (2).to_bytes(4, "little")
+                + bytes((SCTypeCode.DOUBLE,))
+                + struct.pack("<2d", 1.5, -2.25),
+            ),
+            encrypt_block(
+                0x6666,
+                SCTypeCode.ARRAY,
+                (3).to_bytes(4, "little")
+                + bytes((SCTypeCode.BOOL_ARRAY,))
+                + b"\x01\x02\x02",
+            ),
+        ]
+    )
+
+
+def test_block_directory():
+    """Blocks should be found by walking the block stream"""
+    object_payload = bytes(range(0x40))
+    save_file = SaveFile9(build_test_save())
+    assert list(save_file.block_directory) == [
+        0x1111,
+        0x2222,
+        0x3333,
+        0x1234,
+        0x4444,
+        0x5555,
+        0x6666,
+    ]
+    assert save_file.block_directory[0x2222].block_type == SCTypeCode.OBJECT
+    assert save_file.block_directory[0x2222].size == 4 + len(object_payload)
+    assert save_file.block_directory[0x3333].size == 5 + 6
+    assert save_file.read_block(0x1111) is True
+    assert save_file.read_block(0x2222) == object_payload
+    assert save_file.read_block(0x1234) is False
+
+
+def test_mapped_save_file(tmp_path):
+    """Mapped saves should read the same blocks as in memory saves"""
+    save_data = build_test_save()
+    (tmp_path / "main").write_bytes(save_data)
+    save_file = SaveFile9(bytearray(save_data))
+    with MappedSaveFile9(str(tmp_path / "main")) as mapped_save_file:
+        assert mapped_save_file.block_directory == save_file.block_directory
+        for key in (0x1111, 0x2222, 0x1234):
+            assert mapped_save_file.read_block(key) == save_file.read_block(key)
+        assert mapped_save_file.read_block(0x2222) is mapped_save_file.read_block(
+            0x2222
+        )
+        for ofs in (0, 3, 0x7F, 0x80, len(save_data) - 0x30):
+            assert mapped_save_file.read_range(ofs, 0x40) == save_file.read_range(
+                ofs, 0x40
+            )
+
+
+def test_read_block_values():
+    """Value and array blocks should be decoded by their type"""
+    save_file = SaveFile9(build_test_save())
+    assert save_file.read_block(0x4444) == 0xDEADBEEF
+    assert save_file.read_block(0x3333).tolist() == [0x0100, 0x0302, 0x0504]
+    assert save_file.read_block(0x5555).tolist() == [1.5, -2.25]
+    assert save_file.read_block(0x6666) == [b"\x01", b"\x02", b"\x02"]
@@ -0,0 +1,309 @@
+"""Test RaidReader against the sys-botbase emulator"""
+# pylint: disable=import-error
+import random
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from .context import (
+    NXReader,
+    RaidReader,
+    SaveFile9,
+    SCTypeCode,
+    StoryProgress,
+    Game,
+    SysBotEmulator,
+    SysBotServer,
+    build_memory_image,
+    emulated_usb_endpoints,
+    SessionReplay,
+    ReplayError,
+)
+from .test_save_file import encrypt_block, build_save
+
+
+def encrypt_object(key: int, payload: bytes) -> bytes:
+    """Encrypt an object save block"""
+    return encrypt_block(
+        key, SCTypeCode.OBJECT, len(payload).to_bytes(4, "little") + payload
+    )
+
+
+def build_emulator() -> tuple[SysBotEmulator, dict]:
+    """Build an emulator from a synthetic save and tables"""
+    rand = random.Random(0x22)
+    expected = {
+        "my_status": bytes(4) + bytes((Game.VIOLET + 49,)) + bytes(0x57),
+        "fixed_delivery": rand.randbytes(0x30),
+        "raid_block": rand.randbytes(0x910),
+        "raid_binaries": tuple(
+            rand.randbytes(size) for size in RaidReader.RAID_BINARY_SIZES
+        ),
+        "item_binaries": (rand.randbytes(0x1CA8), rand.randbytes(0x3AC8)),
+    }
+    flags = (SCTypeCode.BOOL_TRUE,) * 3 + (SCTypeCode.BOOL_FALSE,)
+    save_file = SaveFile9(
+        build_save(
+            [
+                *(
+                    encrypt_block(key, flag)
+                    for (_, key), flag in zip(
+                        RaidReader.DIFFICULTY_FLAG_LOCATIONS, flags
+                    )
+                ),
+                encrypt_object(RaidReader.MY_STATUS_LOCATION[1], expected["my_status"]),
+                encrypt_object(
+                    RaidReader.BCAT_RAID_FIXED_REWARD_LOCATION[1],
+                    expected["fixed_delivery"],
+                ),
+                encrypt_object(SaveFile9.RAID_BLOCK_LOCATION, expected["raid_block"]),
+            ]
+        )
+    )
+    memory = build_memory_image(
+        save_file, expected["raid_binaries"], expected["item_binaries"]
+    )
+    return SysBotEmulator(memory, seed=0x22), expected
+
+
+def connect_reader(*args, **kwargs) -> RaidReader:
+    """Connect a RaidReader without reading startup data"""
+    reader = RaidReader.__new__(RaidReader)
+    NXReader.__init__(reader, *args, **kwargs)
+    reader.read_safety = False
+    reader._save_block_offsets = None  # pylint: disable=protected-access
+    return reader
+
+
+def check_reader(reader: RaidReader, expected: dict) -> None:
+    """Read every emulated region through reader"""
+    assert reader.read_raid_binaries() == list(expected["raid_binaries"])
+    assert reader.read_raid_item_binaries() == expected["item_binaries"]
+    assert reader.read_save_block_objects(
+        (RaidReader.MY_STATUS_LOCATION, RaidReader.BCAT_RAID_FIXED_REWARD_LOCATION)
+    ) == [expected["my_status"], expected["fixed_delivery"]]
+    assert reader.read_story_progess() == StoryProgress.FIVE_STAR_UNLOCKED
+    assert reader.read_game_version() == Game.VIOLET
+    assert (
+        reader.read_pointer(*RaidReader.RAID_BLOCK_PTR)[:0x910]
+        == expected["raid_block"]
+    )
+
+
+def test_emulator_socket():
+    """RaidReader should read the memory image over tcp"""
+    emulator, expected = build_emulator()
+    with SysBotServer(emulator, port=0) as server:
+        server.start()
+        reader = connect_reader("127.0.0.1", server.port)
+        check_reader(reader, expected)
+        reader.multi_peek = False
+        reader.clear_pointer_cache()
+        check_reader(reader, expected)
+        assert "peekAbsoluteMulti" in " ".join(emulator.commands)
+        reader.socket.close()
+        server.shutdown()
+
+
+def test_emulator_usb():
+    """RaidReader should read the memory image over emulated usb"""
+    emulator, expected = build_emulator()
+    reader = connect_reader(
+        usb_connection=True, usb_endpoints=emulated_usb_endpoints(emulator)
+    )
+    check_reader(reader, expected)
+
+
+def test_emulator_without_multi_peek():
+    """Builds without multi peeks should be detected and read without them"""
+    emulator, expected = build_emulator()
+    emulator.multi_peek = False
+    reader = connect_reader(
+        usb_connection=True, usb_endpoints=emulated_usb_endpoints(emulator)
+    )
+    assert not reader.multi_peek
+    check_reader(reader, expected)
+    with SysBotServer(emulator, port=0) as server:
+        server.start()
+        reader = connect_reader("127.0.0.1", server.port)
+        assert not reader.multi_peek
+        check_reader(reader, expected)
+        reader.socket.close()
+        server.shutdown()
+    probes = [command for command in emulator.commands if "Multi" in command]
+    assert probes == ["peekMainMulti 0x0 0x4"] * 2
+
+
+def test_emulator_truncated_response():
+    """Truncated responses should be resynchronized rather than time out"""
+    emulator, expected = build_emulator()
+    emulator.fault_rate = 1
+    emulator.faults = ("truncate",)
+    emulator.max_faults = 1
+    with SysBotServer(emulator, port=0) as server:
+        server.start()
+        reader = connect_reader("127.0.0.1", server.port)
+        check_reader(reader, expected)
+        assert emulator.fault_count == 1
+        reader.socket.close()
+        server.shutdown()
+
+
+def test_emulator_fault_limits():
+    """Faults should stay within max_faults across clients and skip usb"""
+    emulator, expected = build_emulator()
+    emulator.fault_rate = 1
+    emulator.faults = ("stale",)
+    reader = connect_reader(
+        usb_connection=True, usb_endpoints=emulated_usb_endpoints(emulator)
+    )
+    check_reader(reader, expected)
+    assert emulator.fault_count == 0
+    emulator.max_faults = 2
+    with SysBotServer(emulator, port=0) as server:
+        server.start()
+        readers = [connect_reader("127.0.0.1", server.port) for _ in range(3)]
+        with ThreadPoolExecutor() as executor:
+            for future in [
+                executor.submit(check_reader, reader, expected) for reader in readers
+            ]:
+                future.result()
+        assert emulator.fault_count == 2
+        for reader in readers:
+            reader.socket.close()
+        server.shutdown()
+
+
+def test_emulator_moved_save_block():
+    """Moved save blocks should be found with a single key table scan"""
+    emulator, expected = build_emulator()
+    base = emulator.memory.build_pointer(RaidReader.SAVE_BLOCK_PTR)
+    # shift my status as a game update would
+    ofs, _ = RaidReader.MY_STATUS_LOCATION
+    entry = emulator.memory.read(base + ofs, 0x10)
+    emulator.memory.write(base + ofs, bytes(0x10))
+    emulator.memory.write(base + ofs + 0x100, entry)
+    reader = connect_reader(
+        usb_connection=True, usb_endpoints=emulated_usb_endpoints(emulator)
+    )
+    assert reader.read_save_block_objects(
+        (RaidReader.MY_STATUS_LOCATION, RaidReader.BCAT_RAID_FIXED_REWARD_LOCATION)
+    ) == [expected["my_status"], expected["fixed_delivery"]]
+    assert reader.read_my_status().game == Game.VIOLET
+    table_reads = [
+        command
+        for command in emulator.commands
+        if command.endswith(f"0x{RaidReader.SAVE_BLOCK_TABLE_SIZE:X}")
+    ]
+    # scanned once and cached for the session
+    assert len(table_reads) == 1
+    # the mismatched key from the batch is not read again before the scan
+    table_read = emulator.commands.index(table_reads[0])
+    assert emulator.commands[table_read - 2].startswith("peekAbsoluteMulti")
+    assert len(emulator.commands) < 16
+
+
+def move_pointer_target(memory, pointer: str, size: int) -> int:
+    """Move the data pointer points at like a restarted game, zeroing the
+    old copy, and return the new address"""
+    chain, offset = NXReader.parse_pointer(pointer)
+    node = memory.solve(chain)
+    old_address = memory.read_u64(node)
+    data = memory.read(old_address + offset, size)
+    memory.write(old_address + offset, bytes(size))
+    new_address = memory.allocate(memory.NODE_SIZE)
+    memory.write_u64(node, new_address)
+    memory.write(new_address + offset, data)
+    return new_address + offset
+
+
+def test_emulator_game_restart():
+    """Pointers that went stale should be resolved again"""
+    emulator, expected = build_emulator()
+    memory = emulator.memory
+    raid_block = bytearray(0x910)
+    raid_block[:0x10] = struct.pack("<QQ", 0x1234, 0x4321)
+    # first raid is enabled
+    raid_block[0x10] = 1
+    raid_pointer = RaidReader.RAID_BLOCK_PTR[0]
+    memory.write(memory.build_pointer(raid_pointer), raid_block)
+    reader = connect_reader(
+        usb_connection=True, usb_endpoints=emulated_usb_endpoints(emulator)
+    )
+    assert reader.read_raid_block().current_seed == 0x1234
+
+    address = move_pointer_target(memory, raid_pointer, 0x910)
+    commands = len(emulator.commands)
+    assert reader.read_raid_block_seeds() == (0x1234, 0x4321)
+    # the zero seed probe only resolves the raid block chain again
+    assert [
+        command
+        for command in emulator.commands[commands:]
+        if command.startswith("pointerAll")
+    ] == ["pointerAll 0x43A77C8 0x160 0x0"]
+    assert reader.resolve_pointer(raid_pointer) == address
+
+    address = move_pointer_target(memory, raid_pointer, 0x910)
+    assert reader.read_raid_block().current_seed == 0x1234
+    assert reader.resolve_pointer(raid_pointer) == address
+
+    location = RaidReader.MY_STATUS_LOCATION
+    assert reader.read_save_block_objects((location,)) == [expected["my_status"]]
+    move_pointer_target(
+        memory,
+        f"[{RaidReader.SAVE_BLOCK_PTR}+{location[0] + 8:X}]",
+        5 + len(expected["my_status"]),
+    )
+    assert reader.read_save_block_objects((location,)) == [expected["my_status"]]
+
+
+def test_emulator_date_skip():
+    """clickSeq should reseed raids when advancing the date"""
+    emulator, expected = build_emulator()
+    emulator.advance_date = True
+    last_seed, _ = struct.unpack("<QQ", expected["raid_block"][:0x10])
+    reader = connect_reader(
+        usb_connection=True, usb_endpoints=emulated_usb_endpoints(emulator)
+    )
+    assert not reader.wait_for_raid_block_change(last_seed)
+    reader.send_command("clickSeq A,W100,B")
+    assert reader.wait_until_clickseq_done(1)
+    assert reader.wait_for_raid_block_change(last_seed)
+    raid_block = reader.read_pointer(*RaidReader.RAID_BLOCK_PTR)[:0x910]
+    assert raid_block[:0x10] != expected["raid_block"][:0x10]
+    assert reader.read_raid_block_seeds() == struct.unpack("<QQ", raid_block[:0x10])
+    # first raid keeps its location but not its seed
+    assert raid_block[0x10:0x20] == expected["raid_block"][0x10:0x20]
+    assert raid_block[0x20:0x24] != expected["raid_block"][0x20:0x24]
+
+
+def test_record_and_replay(tmp_path):
+    """Recorded sessions should replay the same reads offline"""
+    emulator, expected = build_emulator()
+    path = str(tmp_path / "session.nxrs")
+    with SysBotServer(emulator, port=0) as server:
+        server.start()
+        reader = connect_reader("127.0.0.1", server.port)
+        reader.start_recording(path)
+        check_reader(reader, expected)
+        # a corrupted response forces a recorded resync
+        emulator.fault_rate = 1
+        emulator.faults = ("corrupt",)
+        emulator.max_faults = 1
+        assert reader.read_absolute(0x1000, 4) == bytes(4)
+        reader.send_command("clickSeq A,W50")
+        assert reader.wait_until_clickseq_done(1)
+        reader.stop_recording()
+        reader.socket.close()
+        server.shutdown()
+
+    replay = SessionReplay(path)
+    reader = connect_reader(replay=replay)
+    check_reader(reader, expected)
+    assert reader.read_absolute(0x1000, 4) == bytes(4)
+    reader.send_command("clickSeq A,W50")
+    assert reader.wait_until_clickseq_done(1)
+    assert replay.finished
+    try:
+        reader.read_absolute(0x1000, 4)
+        assert False, "Reads past the recording should fail"
+    except ReplayError:
+        pass